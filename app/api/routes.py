@@ -1,19 +1,136 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Body, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime
 from typing import List, Optional
-from ..database.base import DatabaseHandler
+from ..database.base import DatabaseHandler, MAX_BATCH_IDS
+from ..database.queries import SORT_PATTERN
+from ..utils.profiling import ProfiledRoute
+from ..utils.events import ArticleHub
+from .warmup import WarmCache
+from ..utils.export import EXPORT_CHUNK_SIZE, EXPORT_MEDIA_TYPES, encode_batch, encode_csv
 
-router = APIRouter()
+def init_routes(db_handler: DatabaseHandler, hub: Optional[ArticleHub] = None,
+                warm_cache: Optional[WarmCache] = None) -> APIRouter:
+    # A fresh router per call, so several handlers can be mounted side by side
+    router = APIRouter(route_class=ProfiledRoute)
 
-def init_routes(db_handler: DatabaseHandler) -> APIRouter:
-    
     @router.get("/articles")
     async def list_articles(
         skip: int = Query(default=0, ge=0),
-        limit: int = Query(default=10, ge=1, le=100)
+        limit: int = Query(default=10, ge=1, le=100),
+        include_duplicates: bool = Query(default=False),
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        source: Optional[List[str]] = Query(default=None),
+        category: Optional[List[str]] = Query(default=None),
+        sentiment: Optional[List[str]] = Query(default=None),
+        sort_by: str = Query(default="date", pattern=SORT_PATTERN),
+        order: str = Query(default="desc", pattern="^(asc|desc)$")
     ):
-        articles = await db_handler.get_articles(skip=skip, limit=limit)
+        plain = (since is None and until is None and not (source or category or sentiment)
+                 and sort_by == "date" and order == "desc")
+        if warm_cache is not None and plain:
+            cached = warm_cache.response(WarmCache.list_key(skip, limit, include_duplicates), "articles")
+            if cached is not None:
+                return cached
+        articles = await db_handler.get_articles(
+            skip=skip, limit=limit, include_duplicates=include_duplicates,
+            since=since, until=until,
+            filters={"source": source, "category": category, "sentiment": sentiment},
+            sort_by=sort_by, order=order
+        )
         return {"articles": articles, "skip": skip, "limit": limit}
 
+    @router.get("/stats/facets")
+    async def facet_counts():
+        return await db_handler.get_facet_counts()
+
+    @router.get("/scraper/nodes")
+    async def scraper_nodes():
+        nodes = await db_handler.get_live_nodes()
+        return {"nodes": nodes, "count": len(nodes)}
+
+    @router.get("/stories/{story_id}")
+    async def get_story(story_id: str):
+        articles = await db_handler.get_story(story_id)
+        if not articles:
+            raise HTTPException(status_code=404, detail="Story not found")
+        return {"story_id": story_id, "articles": articles}
+
+    @router.get("/articles/export")
+    async def export_articles(
+        format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        source: Optional[str] = None,
+        after: Optional[str] = Query(default=None, description="Checkpoint to resume after")
+    ):
+        rows = db_handler.iter_articles(since=since, until=until, source=source, after=after)
+        try:
+            # Pull the first row eagerly so a bad checkpoint is a 400, not a broken stream
+            first = await anext(rows, None)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        async def stream():
+            if format == "csv":
+                yield encode_csv([], header=True)
+            if first is None:
+                return
+            batch = [first]
+            async for row in rows:
+                batch.append(row)
+                if len(batch) >= EXPORT_CHUNK_SIZE:
+                    yield encode_batch(format, batch)
+                    batch = []
+            if batch:
+                yield encode_batch(format, batch)
+
+        return StreamingResponse(stream(), media_type=EXPORT_MEDIA_TYPES[format])
+
+    @router.post("/articles/batch")
+    async def get_articles_batch(
+        ids: List[str] = Body(..., embed=True, min_length=1, max_length=MAX_BATCH_IDS)
+    ):
+        articles = await db_handler.get_articles_by_ids(ids)
+        missing = [article_id for article_id, article in zip(ids, articles) if article is None]
+        return {"articles": articles, "missing": missing}
+
+    if hub is not None:
+        @router.get("/articles/stream")
+        async def stream_articles(
+            source: Optional[List[str]] = Query(default=None),
+            category: Optional[List[str]] = Query(default=None),
+            q: Optional[str] = Query(default=None, description="Keyword in title or snippet"),
+            last_event_id: Optional[str] = Header(default=None)
+        ):
+            subscription = hub.subscribe(last_event_id, source=source, category=category, q=q)
+
+            async def stream():
+                try:
+                    async for chunk in subscription.stream():
+                        yield chunk
+                finally:
+                    hub.unsubscribe(subscription)
+
+            return StreamingResponse(stream(), media_type="text/event-stream",
+                                     headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    # Declared before /articles/{article_id}, which would otherwise capture "search"
+    @router.get("/articles/search")
+    async def search_articles(
+        q: str = Query(..., min_length=1),
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ):
+        if warm_cache is not None and since is None and until is None:
+            warm_cache.record_search(q)
+            cached = warm_cache.response(WarmCache.search_key(q), "search")
+            if cached is not None:
+                return cached
+        articles = await db_handler.search_articles(q, since=since, until=until)
+        return {"articles": articles, "query": q}
+
     @router.get("/articles/{article_id}")
     async def get_article(article_id: str):
         article = await db_handler.get_article(article_id)
@@ -21,10 +138,5 @@ def init_routes(db_handler: DatabaseHandler) -> APIRouter:
             raise HTTPException(status_code=404, detail="Article not found")
         return article
 
-    @router.get("/articles/search")
-    async def search_articles(q: str = Query(..., min_length=1)):
-        articles = await db_handler.search_articles(q)
-        return {"articles": articles, "query": q}
-
     return router
 
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Dict, Hashable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from ..database.base import DatabaseHandler
+from ..utils.metrics import WARM_CACHE_REQUESTS
+
+# Route defaults for /articles, which is what the front page asks for
+DEFAULT_PAGE_SIZE = 10
+DEFAULT_INCLUDE_DUPLICATES = False
+# Searches counted before older counts are halved, so "popular" means recently popular
+SEARCH_WINDOW = 1000
+# New articles trigger a re-warm, but in-place updates from revalidation do not;
+# past this age the warmed set is bypassed and rebuilt in the background
+DEFAULT_TTL_SECONDS = 300
+
+logger = logging.getLogger(__name__)
+
+
+class WarmCache:
+    """Pre-serialized responses for the first list pages and the most popular searches.
+
+    warm() rebuilds the whole set from the database and swaps it in at once; it
+    runs at startup, whenever new articles land and once the set is older than
+    ttl_seconds. Requests that match a fresh warmed key are answered with the
+    stored bytes, everything else goes to the handler.
+    """
+
+    def __init__(self, db_handler: DatabaseHandler, list_pages: int = 3, top_searches: int = 5,
+                 page_size: int = DEFAULT_PAGE_SIZE, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.db_handler = db_handler
+        self.list_pages = list_pages
+        self.top_searches = top_searches
+        self.page_size = page_size
+        self.ttl_seconds = ttl_seconds
+        self._responses: Dict[Hashable, bytes] = {}
+        self._searches: Counter = Counter()
+        self._lock = asyncio.Lock()
+        self._refresh: Optional[asyncio.Task] = None
+        self.warmed_at: Optional[float] = None
+
+    @staticmethod
+    def list_key(skip: int, limit: int, include_duplicates: bool) -> Tuple:
+        return ("articles", skip, limit, include_duplicates)
+
+    @staticmethod
+    def search_key(query: str) -> Tuple:
+        return ("search", query)
+
+    def response(self, key: Hashable, endpoint: str) -> Optional[Response]:
+        body = self._responses.get(key)
+        if body is not None and time.time() - self.warmed_at >= self.ttl_seconds:
+            body = None
+            self._schedule_refresh()
+        WARM_CACHE_REQUESTS.inc(endpoint=endpoint, result="hit" if body is not None else "miss")
+        return Response(content=body, media_type="application/json") if body is not None else None
+
+    def record_search(self, query: str):
+        self._searches[query] += 1
+        if sum(self._searches.values()) > SEARCH_WINDOW:
+            self._searches = Counter({q: n // 2 for q, n in self._searches.items() if n > 1})
+
+    def _schedule_refresh(self):
+        if not self._lock.locked() and (self._refresh is None or self._refresh.done()):
+            self._refresh = asyncio.get_running_loop().create_task(self.warm())
+
+    async def warm(self):
+        """Recompute every warmed response; on failure the previous set stays in place"""
+        async with self._lock:
+            start = time.perf_counter()
+            responses = {}
+            try:
+                for page in range(self.list_pages):
+                    skip = page * self.page_size
+                    articles = await self.db_handler.get_articles(
+                        skip=skip, limit=self.page_size, include_duplicates=DEFAULT_INCLUDE_DUPLICATES
+                    )
+                    responses[self.list_key(skip, self.page_size, DEFAULT_INCLUDE_DUPLICATES)] = _serialize(
+                        {"articles": articles, "skip": skip, "limit": self.page_size}
+                    )
+                for query, _ in self._searches.most_common(self.top_searches):
+                    articles = await self.db_handler.search_articles(query)
+                    responses[self.search_key(query)] = _serialize({"articles": articles, "query": query})
+            except Exception as e:
+                logger.error("Warm-up failed, keeping previous responses: %s", e)
+                return
+            self._responses = responses
+            self.warmed_at = time.time()
+            logger.info("Warmed %d responses in %.2fs", len(responses), time.perf_counter() - start)
+
+
+def _serialize(payload: Dict) -> bytes:
+    # The same encoding FastAPI applies to a returned dict
+    return JSONResponse(jsonable_encoder(payload)).body
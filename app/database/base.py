@@ -1,5 +1,12 @@
+import time
+import functools
+import inspect
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, TypedDict
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Dict, Tuple, TypedDict
+from ..utils.metrics import DB_OPERATION_SECONDS
+from ..utils.profiling import record_db
+from ..utils.compression import ContentCodec
 
 class Article(TypedDict):
     id: str
@@ -14,24 +21,184 @@ class Article(TypedDict):
     sentiment: str
     sentimentScore: float
     url: str
+    story_id: str
+    is_duplicate: bool
+
+# Upper bound on ids accepted by a single batch lookup
+MAX_BATCH_IDS = 500
+
+# Internal fields used for near-duplicate detection; never returned by the API
+DEDUP_FIELDS = ('minhash', 'lsh_bands')
+
+# Compressed form of `content`; only single-article reads inflate it back
+COMPRESSED_FIELDS = ('content_z', 'content_codec')
+# What the scraper needs to tell whether a known article has changed
+CRAWL_FIELDS = ('content_hash', 'etag', 'last_modified', 'fetched_at')
+INTERNAL_FIELDS = DEDUP_FIELDS + COMPRESSED_FIELDS + CRAWL_FIELDS
+# Stored fields a re-crawl may replace; id, date, source and sentiment stay put
+REVISABLE_FIELDS = ('title', 'content', 'story_id', 'is_duplicate') + DEDUP_FIELDS + CRAWL_FIELDS
+
+def _timed(handler_name: str, method):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            DB_OPERATION_SECONDS.observe(elapsed, handler=handler_name, method=method.__name__)
+            record_db(elapsed)
+    return wrapper
 
 class DatabaseHandler(ABC):
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Time every public coroutine a backend defines, so /metrics breaks
+        # DB latency down by handler and method without per-method boilerplate
+        for name, attr in list(vars(cls).items()):
+            if not name.startswith('_') and inspect.iscoroutinefunction(attr):
+                setattr(cls, name, _timed(cls.__name__, attr))
+
+    compress_content: bool = False
+    content_codec: ContentCodec = ContentCodec()
+
+    async def setup(self) -> None:
+        """Create indexes or other backend state; safe to call more than once"""
+        pass
+
+    def _pack_content(self, article: Dict) -> Dict:
+        """Replace `content` with its compressed form when compressed storage is on"""
+        if not self.compress_content:
+            return article
+        blob, codec = self.content_codec.compress(article.get('content') or '')
+        packed = {k: v for k, v in article.items() if k != 'content'}
+        packed.update(content_z=blob, content_codec=codec)
+        return packed
+
+    def _unpack_content(self, article: Dict) -> Dict:
+        """Restore `content` on an article read with its compressed fields"""
+        blob = article.pop('content_z', None)
+        codec = article.pop('content_codec', None)
+        if blob and codec:
+            article['content'] = self.content_codec.decompress(blob, codec)
+        return article
+
+    def _revised_fields(self, article: Dict) -> Dict:
+        """The fields update_article writes, with derived ones recomputed"""
+        fields = {k: article[k] for k in REVISABLE_FIELDS if k in article}
+        fields['snippet'] = article['content'][:150] + "..."
+        fields['sourceUrl'] = article['content'][:100] + "..."
+        return fields
+
     @abstractmethod
     async def save_article(self, article: Dict) -> str:
         pass
 
+    @abstractmethod
+    async def update_article(self, article_id: str, article: Dict) -> bool:
+        """Replace a re-crawled article's content; False when the id is unknown"""
+        pass
+
+    @abstractmethod
+    async def touch_crawl_state(self, article_id: str, etag: Optional[str], last_modified: Optional[str],
+                                fetched_at: datetime) -> bool:
+        """Record a revalidation that found the article unchanged; False when the id is unknown"""
+        pass
+
+    @abstractmethod
+    async def get_crawl_state(self, url: str) -> Optional[Dict]:
+        """id, story_id, is_duplicate, date and CRAWL_FIELDS of the article at url, or None"""
+        pass
+
     @abstractmethod
     async def get_article(self, article_id: str) -> Optional[Article]:
         pass
 
     @abstractmethod
-    async def get_articles(self, skip: int = 0, limit: int = 10) -> List[Article]:
+    async def get_articles_by_ids(self, article_ids: List[str]) -> List[Optional[Article]]:
+        """Fetch many articles in one query, in request order; misses are None"""
+        pass
+
+    @abstractmethod
+    async def get_articles(self, skip: int = 0, limit: int = 10,
+                           include_duplicates: bool = True,
+                           since: Optional[datetime] = None,
+                           until: Optional[datetime] = None,
+                           filters: Optional[Dict[str, List[str]]] = None,
+                           sort_by: str = 'date', order: str = 'desc') -> List[Article]:
+        """Newest first by default; `since` is inclusive and `until` exclusive.
+
+        `filters` maps FILTER_FIELDS to accepted values and `sort_by` is one of
+        SORT_FIELDS (see queries.py); anything else raises ValueError.
+        """
         pass
 
     @abstractmethod
-    async def search_articles(self, query: str) -> List[Article]:
+    async def search_articles(self, query: str,
+                              since: Optional[datetime] = None,
+                              until: Optional[datetime] = None) -> List[Article]:
         pass
 
     @abstractmethod
     async def url_exists(self, url: str) -> bool:
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def iter_articles(self, since: Optional[datetime] = None,
+                      until: Optional[datetime] = None,
+                      source: Optional[str] = None,
+                      after: Optional[str] = None) -> AsyncIterator[Tuple[str, Article]]:
+        """Stream (checkpoint, article) pairs in storage order.
+
+        Passing a checkpoint back as `after` resumes right after that article.
+        """
+        pass
+
+    @abstractmethod
+    async def get_latest_checkpoint(self) -> Optional[str]:
+        """Checkpoint of the newest stored article, or None when there are none"""
+        pass
+
+    def rewind_checkpoint(self, checkpoint: Optional[str], seconds: float) -> Optional[str]:
+        """A checkpoint about `seconds` before this one.
+
+        Only backends whose checkpoints can be committed out of order need one;
+        tailing re-reads from there and skips what it has already seen.
+        """
+        return checkpoint
+
+    @abstractmethod
+    async def get_facet_counts(self) -> Dict:
+        """Return {"total": n, "facets": {facet: {value: count}}} without scanning articles"""
+        pass
+
+    @abstractmethod
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """Take or renew a named lease; False while another owner holds it"""
+        pass
+
+    @abstractmethod
+    async def release_lease(self, name: str, owner: str) -> None:
+        pass
+
+    @abstractmethod
+    async def heartbeat_node(self, node_id: str, status: Dict, ttl_seconds: float) -> None:
+        """Register or refresh a scraper node; it drops out after ttl_seconds of silence"""
+        pass
+
+    @abstractmethod
+    async def get_live_nodes(self) -> List[Dict]:
+        pass
+
+    @abstractmethod
+    async def remove_node(self, node_id: str) -> None:
+        pass
+
+    @abstractmethod
+    async def find_story_candidates(self, bands: List[str]) -> List[Dict]:
+        """Return articles sharing any LSH band, with `story_id` and `minhash`"""
+        pass
+
+    @abstractmethod
+    async def get_story(self, story_id: str) -> List[Article]:
+        pass
@@ -1,13 +1,44 @@
+import asyncio
+import base64
 import csv
 import os
+import json
+import time
+import fcntl
 import uuid
 import random
-from typing import List, Optional, Dict
-from .base import DatabaseHandler
+import shutil
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator, List, Optional, Dict, Tuple
+from .base import DatabaseHandler, COMPRESSED_FIELDS, CRAWL_FIELDS, DEDUP_FIELDS, INTERNAL_FIELDS
+from ..utils.facets import FACET_FIELDS, FacetCounter
+from ..utils.dates import format_iso
+from ..utils.compression import ContentCodec
+from ..utils.article_store import FLOAT_FIELDS, CompactArticleStore
+from .queries import check_sort, clean_filters
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('-inf')
 
 class CSVHandler(DatabaseHandler):
-    def __init__(self, csv_path: str):
+    def __init__(self, csv_path: str, compress_content: bool = False,
+                 content_codec: Optional[ContentCodec] = None):
         self.csv_path = csv_path
+        self.compress_content = compress_content
+        self.content_codec = content_codec or ContentCodec()
+        self._band_index: Optional[Dict[str, List[Dict]]] = None
+        self._facets: Optional[FacetCounter] = None
+        # The store the facet counts were taken from; a reload means a recount
+        self._facets_store: Optional[CompactArticleStore] = None
+        # Read-side copy of the file, reloaded when its (mtime, size) changes
+        self._store: Optional[CompactArticleStore] = None
+        self._store_signature: Optional[Tuple[int, int]] = None
         self._ensure_csv_exists()
 
     def _ensure_csv_exists(self):
@@ -17,7 +48,7 @@ class CSVHandler(DatabaseHandler):
                 writer = csv.DictWriter(f, fieldnames=[
                     'id', 'title', 'content', 'snippet', 'source', 'category',
                     'date', 'author', 'sourceUrl', 'sentiment', 'sentimentScore',
-                    'url'
+                    'url', 'story_id', 'is_duplicate', 'minhash', 'lsh_bands'
                 ])
                 writer.writeheader()
 
@@ -32,45 +63,308 @@ class CSVHandler(DatabaseHandler):
 
     async def save_article(self, article: Dict) -> str:
         sentiment, score = self._generate_random_sentiment()
+        published = article['published_date']
+        if isinstance(published, datetime):
+            published = format_iso(published)
         enhanced_article = {
             **article,
             'id': str(uuid.uuid4()),
             'snippet': article['content'][:150] + "...",
             'source': article['source_website'],
             'category': 'General',
-            'date': article['published_date'],
+            'date': published,
+            'published_date': published,
             'author': 'Unknown',
             'sourceUrl': self._generate_ai_summary(article['content']),
             'sentiment': sentiment,
             'sentimentScore': score
         }
+        enhanced_article = self._encode(enhanced_article)
+        signature = self._signature()
         articles = self._read_csv()
         articles.append(enhanced_article)
         self._write_csv(articles)
+        if self._store is not None and signature == self._store_signature:
+            self._store.append(enhanced_article)
+            self._store_signature = self._signature()
+        else:
+            self._store = None
+        self._index_bands(enhanced_article)
+        if self._facets is not None and self._facets_store is self._store:
+            self._facets.add(enhanced_article)
         return enhanced_article['id']
 
-    async def get_article(self, article_id: str) -> Optional[Dict]:
-        articles = self._read_csv()
-        for article in articles:
-            if article['id'] == article_id:
-                return article
-        return None
+    async def update_article(self, article_id: str, article: Dict) -> bool:
+        fields = self._encode(self._revised_fields(article))
 
-    async def get_articles(self, skip: int = 0, limit: int = 10) -> List[Dict]:
-        articles = self._read_csv()
-        return articles[skip:skip + limit]
+        def update(stored):
+            # Blank whichever form of the content the new one replaces
+            for field in ('content',) + COMPRESSED_FIELDS:
+                if field in stored:
+                    stored[field] = ''
+            stored.update(fields)
+        return self._update_row(article_id, update)
+
+    async def touch_crawl_state(self, article_id: str, etag: Optional[str], last_modified: Optional[str],
+                                fetched_at: datetime) -> bool:
+        fields = {'etag': etag, 'last_modified': last_modified, 'fetched_at': format_iso(fetched_at)}
+        return self._update_row(article_id, lambda stored: stored.update(fields))
 
-    async def search_articles(self, query: str) -> List[Dict]:
+    def _update_row(self, article_id: str, update) -> bool:
         articles = self._read_csv()
+        for stored in articles:
+            if stored.get('id') == article_id:
+                update(stored)
+                break
+        else:
+            return False
+        self._write_csv(articles)
+        # Rows changed in place, so the read store and band index start over
+        self._store = None
+        self._band_index = None
+        return True
+
+    async def get_crawl_state(self, url: str) -> Optional[Dict]:
+        store = self._articles()
+        row = store.index_of('url', url)
+        if row is None:
+            return None
+        state = {field: store.get(row, field) or None for field in ('id', 'story_id', 'date') + CRAWL_FIELDS}
+        state['is_duplicate'] = store.get(row, 'is_duplicate') == 'True'
+        return state
+
+    async def get_article(self, article_id: str) -> Optional[Dict]:
+        store = self._articles()
+        row = store.index_of('id', article_id)
+        return self._detail(store.materialize(row)) if row is not None else None
+
+    async def get_articles_by_ids(self, article_ids: List[str]) -> List[Optional[Dict]]:
+        store = self._articles()
+        rows = {article_id: store.index_of('id', article_id) for article_id in set(article_ids)}
+        found = {
+            article_id: self._detail(store.materialize(row))
+            for article_id, row in rows.items() if row is not None
+        }
+        return [found.get(article_id) for article_id in article_ids]
+
+    async def get_articles(self, skip: int = 0, limit: int = 10,
+                           include_duplicates: bool = True,
+                           since: Optional[datetime] = None,
+                           until: Optional[datetime] = None,
+                           filters: Optional[Dict[str, List[str]]] = None,
+                           sort_by: str = 'date', order: str = 'desc') -> List[Dict]:
+        check_sort(sort_by, order)
+        filters = clean_filters(filters)
+        store = self._articles()
+        rows = store.newest_first(since, until)
+        for field, values in filters.items():
+            wanted = set(values)
+            rows = [row for row in rows if store.get(row, field) in wanted]
+        if not include_duplicates:
+            rows = [row for row in rows if store.get(row, 'is_duplicate') != 'True']
+        if sort_by != 'date':
+            # Stable, so ties stay newest first
+            rows = sorted(rows, key=lambda row: _number(store.get(row, sort_by)), reverse=order == 'desc')
+        elif order == 'asc':
+            rows = rows[::-1]
+        return [self._public(store.materialize(row)) for row in rows[skip:skip + limit]]
+
+    async def search_articles(self, query: str,
+                              since: Optional[datetime] = None,
+                              until: Optional[datetime] = None) -> List[Dict]:
+        store = self._articles()
         query = query.lower()
         return [
-            article for article in articles
-            if query in article['title'].lower() or query in article['content'].lower()
+            self._public(store.materialize(row)) for row in store.newest_first(since, until)
+            if query in (store.get(row, 'title') or '').lower()
+            or query in (store.get(row, 'content') or '').lower()
+            or query in (store.get(row, 'snippet') or '').lower()
         ]
 
     async def url_exists(self, url: str) -> bool:
-        articles = self._read_csv()
-        return any(article['url'] == url for article in articles)
+        return self._articles().contains('url', url)
+
+    async def iter_articles(self, since: Optional[datetime] = None,
+                            until: Optional[datetime] = None,
+                            source: Optional[str] = None,
+                            after: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        # Rows are append-only, so the row number doubles as a checkpoint
+        if after and not after.isdigit():
+            raise ValueError(f"Invalid checkpoint: {after}")
+        start = int(after) if after else 0
+        since_key = format_iso(since) if since else None
+        until_key = format_iso(until) if until else None
+        if after is not None:
+            # Tailing polls often; the in-memory copy only rereads the file when
+            # it changed, and does that on a worker thread
+            store = await asyncio.to_thread(self._articles)
+            rows = ((row + 1, store.materialize(row)) for row in range(start, len(store)))
+        else:
+            # A full export streams the file instead of loading it all
+            rows = self._stream_rows()
+        for row_number, article in rows:
+            if row_number <= start:
+                continue
+            if source and article.get('source') != source:
+                continue
+            if since_key and article.get('date', '') < since_key:
+                continue
+            if until_key and article.get('date', '') >= until_key:
+                continue
+            yield str(row_number), self._detail(article)
+
+    def _stream_rows(self) -> Iterator[Tuple[int, Dict]]:
+        with open(self.csv_path, 'r', newline='') as f:
+            for row_number, article in enumerate(csv.DictReader(f), start=1):
+                # Same types as rows served from the in-memory store
+                for field in FLOAT_FIELDS:
+                    if article.get(field):
+                        try:
+                            article[field] = float(article[field])
+                        except ValueError:
+                            pass
+                yield row_number, article
+
+    async def get_latest_checkpoint(self) -> Optional[str]:
+        count = len(self._articles())
+        return str(count) if count else None
+
+    async def get_facet_counts(self) -> Dict:
+        store = self._articles()
+        if self._facets is None or self._facets_store is not store:
+            # Recounted whenever the store reloads because another process wrote
+            # the file; our own saves keep both current without a reload
+            self._facets = FacetCounter()
+            self._facets.add_all(
+                {field: store.get(row, field) for field in FACET_FIELDS + ('date',)}
+                for row in range(len(store))
+            )
+            self._facets_store = store
+        return self._facets.as_dict()
+
+    async def _locked_json(self, filename: str, update) -> Dict:
+        """Read-modify-write a small JSON file next to the CSV under an exclusive flock
+
+        flock() blocks until the other process lets go, so it runs on a worker
+        thread instead of stalling the event loop.
+        """
+        return await asyncio.to_thread(self._update_json_file, filename, update)
+
+    def _update_json_file(self, filename: str, update) -> Dict:
+        path = os.path.join(os.path.dirname(self.csv_path) or ".", filename)
+        with open(path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            raw = f.read()
+            data = json.loads(raw) if raw else {}
+            now = time.time()
+            data = {k: v for k, v in data.items() if v['expires_at'] > now}
+            result = update(data, now)
+            f.seek(0)
+            f.truncate()
+            json.dump(data, f)
+            return result if result is not None else data
+
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        # Same semantics as the Mongo leases collection, for processes on this host
+        def update(leases, now):
+            lease = leases.get(name)
+            if lease and lease['owner'] != owner:
+                return False
+            leases[name] = {'owner': owner, 'expires_at': now + ttl_seconds}
+            return True
+        return await self._locked_json('.leases.json', update)
+
+    async def release_lease(self, name: str, owner: str) -> None:
+        def update(leases, now):
+            if leases.get(name, {}).get('owner') == owner:
+                del leases[name]
+        await self._locked_json('.leases.json', update)
+
+    async def heartbeat_node(self, node_id: str, status: Dict, ttl_seconds: float) -> None:
+        def update(nodes, now):
+            nodes[node_id] = {**status, 'heartbeat_at': now, 'expires_at': now + ttl_seconds}
+        await self._locked_json('.scraper_nodes.json', update)
+
+    async def get_live_nodes(self) -> List[Dict]:
+        nodes = await self._locked_json('.scraper_nodes.json', lambda nodes, now: None)
+        return [
+            {'node_id': node_id, **node,
+             'heartbeat_at': datetime.fromtimestamp(node['heartbeat_at'], timezone.utc),
+             'expires_at': datetime.fromtimestamp(node['expires_at'], timezone.utc)}
+            for node_id, node in sorted(nodes.items())
+        ]
+
+    async def remove_node(self, node_id: str) -> None:
+        def update(nodes, now):
+            nodes.pop(node_id, None)
+        await self._locked_json('.scraper_nodes.json', update)
+
+    async def find_story_candidates(self, bands: List[str]) -> List[Dict]:
+        if self._band_index is None:
+            self._band_index = defaultdict(list)
+            for article in self._read_csv():
+                self._index_bands(article)
+        seen, candidates = set(), []
+        for band in bands:
+            for candidate in self._band_index.get(band, ()):
+                if id(candidate) not in seen:
+                    seen.add(id(candidate))
+                    candidates.append(candidate)
+        return candidates
+
+    async def get_story(self, story_id: str) -> List[Dict]:
+        store = self._articles()
+        return [self._public(store.materialize(row)) for row in store.rows_where('story_id', story_id)]
+
+    def _index_bands(self, article: Dict):
+        if self._band_index is None or not article.get('lsh_bands'):
+            return
+        candidate = {
+            'story_id': article.get('story_id'),
+            'minhash': [int(h) for h in article.get('minhash', '').split()]
+        }
+        for band in article['lsh_bands'].split():
+            self._band_index[band].append(candidate)
+
+    def _encode(self, article: Dict) -> Dict:
+        """The article as CSV cells: lists space-joined, compressed content base64"""
+        encoded = {
+            **article,
+            'minhash': " ".join(map(str, article.get('minhash', []))),
+            'lsh_bands': " ".join(article.get('lsh_bands', []))
+        }
+        if isinstance(encoded.get('fetched_at'), datetime):
+            encoded['fetched_at'] = format_iso(encoded['fetched_at'])
+        encoded = self._pack_content(encoded)
+        if 'content_z' in encoded:
+            encoded['content_z'] = base64.b64encode(encoded['content_z']).decode('ascii')
+        return encoded
+
+    def _public(self, article: Dict) -> Dict:
+        return {k: v for k, v in article.items() if k not in INTERNAL_FIELDS}
+
+    def _detail(self, article: Dict) -> Dict:
+        return self._public(self._unpack_content(article))
+
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.csv_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _articles(self) -> CompactArticleStore:
+        """The CSV held column-wise in memory; rereads the file only after another writer changed it"""
+        signature = self._signature()
+        if self._store is None or signature != self._store_signature:
+            store = CompactArticleStore(skip_fields=DEDUP_FIELDS)
+            if signature is not None:
+                # Stream rows straight in rather than holding every dict at once
+                with open(self.csv_path, 'r', newline='') as f:
+                    store.extend(csv.DictReader(f))
+            self._store, self._store_signature = store, signature
+        return self._store
 
     def _read_csv(self) -> List[Dict]:
         if not os.path.exists(self.csv_path):
@@ -80,8 +374,21 @@ class CSVHandler(DatabaseHandler):
 
     def _write_csv(self, articles: List[Dict]):
         if articles:
-            fieldnames = articles[0].keys()
-            with open(self.csv_path, 'w', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(articles)
\ No newline at end of file
+            # Union of keys so rows written before a new column existed still fit
+            fieldnames = list(dict.fromkeys(key for article in articles for key in article))
+            # Write a sibling file and swap it in, so a reader part-way through
+            # an export keeps the old inode instead of seeing a half-written file
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.csv_path) or ".",
+                                             prefix=".articles-", suffix=".csv.tmp")
+            try:
+                with os.fdopen(fd, 'w', newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=fieldnames)
+                    writer.writeheader()
+                    writer.writerows(articles)
+                if os.path.exists(self.csv_path):
+                    # mkstemp creates the file 0600; keep whatever the CSV had
+                    shutil.copymode(self.csv_path, temp_path)
+                os.replace(temp_path, self.csv_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
@@ -0,0 +1,24 @@
+from typing import Dict
+from .base import DatabaseHandler
+from .csv_handler import CSVHandler
+from .mongodb_handler import MongoDBHandler
+from .sqlite_handler import SQLiteHandler
+from ..utils.compression import ContentCodec, DEFAULT_DICTIONARY_DIR
+
+def create_db_handler(app_config: Dict) -> DatabaseHandler:
+    """Pick the storage backend from app_config.json's `environment`"""
+    # Dictionaries are loaded even with compression off so stored blobs stay readable
+    compression = {
+        'compress_content': app_config.get('compress_content', False),
+        'content_codec': ContentCodec.load(
+            app_config.get('content_dictionary_dir', DEFAULT_DICTIONARY_DIR))
+    }
+    if app_config['environment'] == 'development':
+        return CSVHandler(app_config['csv_path'], **compression)
+    if app_config['environment'] == 'sqlite':
+        return SQLiteHandler(app_config.get('sqlite_path', 'data/articles.db'), **compression)
+    return MongoDBHandler(
+        app_config['mongodb_uri'],
+        app_config['database_name'],
+        **compression
+    )
@@ -1,14 +1,61 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
-from typing import List, Optional, Dict
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional, Dict, Tuple
 import random
-from .base import DatabaseHandler
+from .base import DatabaseHandler, COMPRESSED_FIELDS, CRAWL_FIELDS, DEDUP_FIELDS, INTERNAL_FIELDS
+from ..utils.facets import FacetCounter, facet_values
+from ..utils.dates import to_utc
+from ..utils.profiling import PROFILING_ENABLED, SlowQueryListener
+from ..utils.compression import ContentCodec
+from .queries import QUERY_INDEXES, check_sort, clean_filters
+
+# Keep the MinHash signature, band keys and crawl state out of API responses,
+# and leave compressed content on the server for everything but single-article reads
+PUBLIC_PROJECTION = {field: 0 for field in INTERNAL_FIELDS}
+DETAIL_PROJECTION = {field: 0 for field in DEDUP_FIELDS + CRAWL_FIELDS}
+CRAWL_STATE_PROJECTION = {"story_id": 1, "is_duplicate": 1, "date": 1, **{f: 1 for f in CRAWL_FIELDS}}
+
+
+def _date_range(since: Optional[datetime], until: Optional[datetime]) -> Dict:
+    query = {}
+    if since:
+        query["$gte"] = to_utc(since)
+    if until:
+        query["$lt"] = to_utc(until)
+    return {"date": query} if query else {}
 
 class MongoDBHandler(DatabaseHandler):
-    def __init__(self, mongodb_uri: str, database_name: str):
-        self.client = AsyncIOMotorClient(mongodb_uri)
+    def __init__(self, mongodb_uri: str, database_name: str,
+                 compress_content: bool = False, content_codec: Optional[ContentCodec] = None):
+        listeners = []
+        if PROFILING_ENABLED:
+            # Slow commands are explained on Motor's underlying sync client
+            listeners.append(SlowQueryListener(lambda: self.client.delegate))
+        self.client = AsyncIOMotorClient(mongodb_uri, event_listeners=listeners)
         self.db = self.client[database_name]
         self.collection = self.db.articles
+        # Materialized facet counts, one document per facet/value pair
+        self.stats = self.db.article_stats
+        self.leases = self.db.leases
+        self.nodes = self.db.scraper_nodes
+        self.compress_content = compress_content
+        self.content_codec = content_codec or ContentCodec()
+
+    async def setup(self) -> None:
+        await self.collection.create_index("url")
+        # One compound index per filter + sort pair that get_articles accepts
+        for keys in QUERY_INDEXES:
+            await self.collection.create_index(keys)
+        await self.collection.create_index("story_id")
+        # Let Mongo garbage-collect nodes that stopped heartbeating
+        await self.nodes.create_index("expires_at", expireAfterSeconds=3600)
+        # Multikey index so a bucket lookup only touches articles in that bucket
+        await self.collection.create_index("lsh_bands")
+        if await self.stats.estimated_document_count() == 0:
+            await self.rebuild_facet_counts()
 
     def _generate_random_sentiment(self):
         sentiment_options = ["Positive", "Neutral", "Negative"]
@@ -23,40 +70,128 @@ class MongoDBHandler(DatabaseHandler):
     async def save_article(self, article: Dict) -> str:
         # Add the new required fields
         sentiment, score = self._generate_random_sentiment()
-        enhanced_article = {
+        enhanced_article = self._pack_content({
             **article,
             'id': ObjectId().__str__(),  # Use string representation of ObjectId as id
             'snippet': article['content'][:150] + "...",
+            'source': article['source_website'],
+            'date': article['published_date'],
             'category': 'General',  # Default category
             'author': 'Unknown',  # Default author
             'sourceUrl': self._generate_ai_summary(article['content']),
             'sentiment': sentiment,
             'sentimentScore': score
-        }
+        })
         result = await self.collection.insert_one(enhanced_article)
+        await self._increment_facets(enhanced_article)
         return str(result.inserted_id)
 
+    async def update_article(self, article_id: str, article: Dict) -> bool:
+        fields = self._pack_content(self._revised_fields(article))
+        # Drop whichever form of the content the new one replaces
+        stale = ('content',) if 'content_z' in fields else COMPRESSED_FIELDS
+        result = await self.collection.update_one(
+            {"_id": ObjectId(article_id)},
+            {"$set": fields, "$unset": {field: "" for field in stale}}
+        )
+        return result.matched_count > 0
+
+    async def touch_crawl_state(self, article_id: str, etag: Optional[str], last_modified: Optional[str],
+                                fetched_at: datetime) -> bool:
+        result = await self.collection.update_one(
+            {"_id": ObjectId(article_id)},
+            {"$set": {"etag": etag, "last_modified": last_modified, "fetched_at": fetched_at}}
+        )
+        return result.matched_count > 0
+
+    async def get_crawl_state(self, url: str) -> Optional[Dict]:
+        state = await self.collection.find_one({"url": url}, CRAWL_STATE_PROJECTION)
+        if state:
+            state["id"] = str(state.pop("_id"))
+        return state
+
+    async def _increment_facets(self, article: Dict):
+        updates = [
+            UpdateOne(
+                {"_id": f"{facet}:{value}"},
+                {"$inc": {"count": 1}, "$setOnInsert": {"facet": facet, "value": value}},
+                upsert=True
+            )
+            for facet, value in facet_values(article).items()
+        ]
+        updates.append(UpdateOne({"_id": "total"}, {"$inc": {"count": 1}}, upsert=True))
+        await self.stats.bulk_write(updates, ordered=False)
+
+    async def rebuild_facet_counts(self):
+        """Recompute the summary collection from scratch with one pass over articles"""
+        counter = FacetCounter()
+        projection = {"_id": 0, "source": 1, "category": 1, "sentiment": 1, "date": 1}
+        async for article in self.collection.find({}, projection):
+            counter.add(article)
+        await self.stats.delete_many({})
+        docs = [
+            {"_id": f"{facet}:{value}", "facet": facet, "value": value, "count": count}
+            for facet, values in counter.counts.items()
+            for value, count in values.items()
+        ]
+        docs.append({"_id": "total", "count": counter.total})
+        await self.stats.insert_many(docs)
+
     async def get_article(self, article_id: str) -> Optional[Dict]:
-        article = await self.collection.find_one({"_id": ObjectId(article_id)})
+        article = await self.collection.find_one({"_id": ObjectId(article_id)}, DETAIL_PROJECTION)
         if article:
             article["_id"] = str(article["_id"])
+            self._unpack_content(article)
         return article
 
-    async def get_articles(self, skip: int = 0, limit: int = 10) -> List[Dict]:
-        cursor = self.collection.find().skip(skip).limit(limit)
+    async def get_articles_by_ids(self, article_ids: List[str]) -> List[Optional[Dict]]:
+        object_ids = [ObjectId(i) for i in set(article_ids) if ObjectId.is_valid(i)]
+        found = {}
+        if object_ids:
+            async for article in self.collection.find({"_id": {"$in": object_ids}}, DETAIL_PROJECTION):
+                article["_id"] = str(article["_id"])
+                self._unpack_content(article)
+                found[article["_id"]] = article
+        return [found.get(article_id) for article_id in article_ids]
+
+    async def get_articles(self, skip: int = 0, limit: int = 10,
+                           include_duplicates: bool = True,
+                           since: Optional[datetime] = None,
+                           until: Optional[datetime] = None,
+                           filters: Optional[Dict[str, List[str]]] = None,
+                           sort_by: str = 'date', order: str = 'desc') -> List[Dict]:
+        cursor = self._list_cursor(skip, limit, include_duplicates, since, until, filters, sort_by, order)
         articles = []
         async for article in cursor:
             article["_id"] = str(article["_id"])
             articles.append(article)
         return articles
 
-    async def search_articles(self, query: str) -> List[Dict]:
+    def _list_cursor(self, skip: int, limit: int, include_duplicates: bool,
+                     since: Optional[datetime], until: Optional[datetime],
+                     filters: Optional[Dict[str, List[str]]], sort_by: str, order: str):
+        """The cursor behind get_articles, exposed so its plan can be explained"""
+        check_sort(sort_by, order)
+        query = _date_range(since, until)
+        for field, values in clean_filters(filters).items():
+            query[field] = values[0] if len(values) == 1 else {"$in": values}
+        if not include_duplicates:
+            query["is_duplicate"] = {"$ne": True}
+        return (self.collection.find(query, PUBLIC_PROJECTION)
+                .sort(sort_by, -1 if order == "desc" else 1).skip(skip).limit(limit))
+
+    async def search_articles(self, query: str,
+                              since: Optional[datetime] = None,
+                              until: Optional[datetime] = None) -> List[Dict]:
         cursor = self.collection.find({
             "$or": [
                 {"title": {"$regex": query, "$options": "i"}},
-                {"content": {"$regex": query, "$options": "i"}}
-            ]
-        })
+                {"content": {"$regex": query, "$options": "i"}},
+                # Compressed articles have no plain `content` to match
+                {"snippet": {"$regex": query, "$options": "i"}}
+            ],
+            **_date_range(since, until)
+        }, PUBLIC_PROJECTION).sort("date", -1)
         articles = []
         async for article in cursor:
             article["_id"] = str(article["_id"])
@@ -64,4 +199,92 @@ class MongoDBHandler(DatabaseHandler):
         return articles
 
     async def url_exists(self, url: str) -> bool:
-        return await self.collection.count_documents({"url": url}) > 0
\ No newline at end of file
+        return await self.collection.count_documents({"url": url}) > 0
+
+    async def iter_articles(self, since: Optional[datetime] = None,
+                            until: Optional[datetime] = None,
+                            source: Optional[str] = None,
+                            after: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        query = _date_range(since, until)
+        if source:
+            query["source"] = source
+        if after:
+            if not ObjectId.is_valid(after):
+                raise ValueError(f"Invalid checkpoint: {after}")
+            query["_id"] = {"$gt": ObjectId(after)}
+        # Walk the _id index so a checkpoint is simply the last _id seen
+        cursor = self.collection.find(query, DETAIL_PROJECTION).sort("_id", 1).batch_size(500)
+        async for article in cursor:
+            article["_id"] = str(article["_id"])
+            yield article["_id"], self._unpack_content(article)
+
+    async def get_latest_checkpoint(self) -> Optional[str]:
+        latest = await self.collection.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        return str(latest["_id"]) if latest else None
+
+    def rewind_checkpoint(self, checkpoint: Optional[str], seconds: float) -> Optional[str]:
+        # _ids carry the writing node's clock, so another node's insert can land
+        # below an _id already seen
+        if not checkpoint or not ObjectId.is_valid(checkpoint):
+            return checkpoint
+        generated = ObjectId(checkpoint).generation_time
+        return str(ObjectId.from_datetime(generated - timedelta(seconds=seconds)))
+
+    async def get_facet_counts(self) -> Dict:
+        facets: Dict[str, Dict[str, int]] = {}
+        total = 0
+        async for doc in self.stats.find():
+            if doc["_id"] == "total":
+                total = doc["count"]
+            else:
+                facets.setdefault(doc["facet"], {})[doc["value"]] = doc["count"]
+        return {"total": total, "facets": facets}
+
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            # Matches only if we already own it or it has expired; otherwise the
+            # upsert collides on _id and someone else is the holder
+            lease = await self.leases.find_one_and_update(
+                {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return False
+        return lease is not None and lease["owner"] == owner
+
+    async def release_lease(self, name: str, owner: str) -> None:
+        await self.leases.delete_one({"_id": name, "owner": owner})
+
+    async def heartbeat_node(self, node_id: str, status: Dict, ttl_seconds: float) -> None:
+        now = datetime.now(timezone.utc)
+        await self.nodes.update_one(
+            {"_id": node_id},
+            {"$set": {**status, "heartbeat_at": now,
+                      "expires_at": now + timedelta(seconds=ttl_seconds)}},
+            upsert=True
+        )
+
+    async def get_live_nodes(self) -> List[Dict]:
+        cursor = self.nodes.find({"expires_at": {"$gt": datetime.now(timezone.utc)}}).sort("_id", 1)
+        return [{"node_id": node.pop("_id"), **node} async for node in cursor]
+
+    async def remove_node(self, node_id: str) -> None:
+        await self.nodes.delete_one({"_id": node_id})
+
+    async def find_story_candidates(self, bands: List[str]) -> List[Dict]:
+        cursor = self.collection.find(
+            {"lsh_bands": {"$in": bands}},
+            {"_id": 0, "story_id": 1, "minhash": 1}
+        ).limit(100)
+        return [candidate async for candidate in cursor]
+
+    async def get_story(self, story_id: str) -> List[Dict]:
+        cursor = self.collection.find({"story_id": story_id}, PUBLIC_PROJECTION)
+        articles = []
+        async for article in cursor:
+            article["_id"] = str(article["_id"])
+            articles.append(article)
+        return articles
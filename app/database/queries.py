@@ -0,0 +1,43 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Equality filters the list endpoints accept; several values for one field mean "any of"
+FILTER_FIELDS = ('source', 'category', 'sentiment')
+# Only fields with an index to walk; anything else would sort every match in memory
+SORT_FIELDS = ('date', 'sentimentScore')
+SORT_ORDERS = ('asc', 'desc')
+SORT_PATTERN = f"^({'|'.join(SORT_FIELDS)})$"
+
+# Equality field first, then the sort key, so every filter + sort pair reads
+# one index in order and stops after skip + limit entries
+QUERY_INDEXES: List[List[Tuple[str, int]]] = (
+    [[(sort, -1)] for sort in SORT_FIELDS]
+    + [[(field, 1), (sort, -1)] for field in FILTER_FIELDS for sort in SORT_FIELDS]
+)
+
+
+def clean_filters(filters: Optional[Dict[str, Optional[List[str]]]]) -> Dict[str, List[str]]:
+    """Drop empty filters; ValueError for a field without an index"""
+    cleaned = {}
+    for field, values in (filters or {}).items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Cannot filter on {field}; use one of {', '.join(FILTER_FIELDS)}")
+        if values:
+            cleaned[field] = list(values)
+    return cleaned
+
+
+def check_sort(sort_by: str, order: str):
+    if sort_by not in SORT_FIELDS:
+        raise ValueError(f"Cannot sort by {sort_by}; use one of {', '.join(SORT_FIELDS)}")
+    if order not in SORT_ORDERS:
+        raise ValueError(f"Sort order must be asc or desc, not {order}")
+
+
+def supported_queries() -> Iterator[Tuple[Dict[str, List[str]], str, str]]:
+    """(filters, sort_by, order) for each combination QUERY_INDEXES is meant to serve"""
+    for sort_by in SORT_FIELDS:
+        for order in SORT_ORDERS:
+            yield {}, sort_by, order
+            for field in FILTER_FIELDS:
+                yield {field: ["x"]}, sort_by, order
+                yield {field: ["x", "y"]}, sort_by, order
@@ -0,0 +1,493 @@
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Dict, Tuple
+from .base import DatabaseHandler, INTERNAL_FIELDS
+from ..utils.facets import facet_values
+from ..utils.dates import format_iso
+from ..utils.compression import ContentCodec
+from .queries import QUERY_INDEXES, check_sort, clean_filters
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    url TEXT,
+    date TEXT,
+    source TEXT,
+    story_id TEXT,
+    is_duplicate INTEGER NOT NULL DEFAULT 0,
+    minhash TEXT,
+    content TEXT,
+    content_z BLOB,
+    content_codec TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_url ON articles (url);
+CREATE INDEX IF NOT EXISTS articles_date ON articles (date DESC);
+CREATE INDEX IF NOT EXISTS articles_story ON articles (story_id);
+CREATE TABLE IF NOT EXISTS article_bands (
+    band TEXT NOT NULL,
+    article_rowid INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS article_bands_band ON article_bands (band);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5 (
+    title, body, content='', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS crawl_state (
+    article_rowid INTEGER PRIMARY KEY,
+    content_hash TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at TEXT
+);
+CREATE TABLE IF NOT EXISTS facet_counts (
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (facet, value)
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scraper_nodes (
+    node_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Rows fetched per round trip by iter_articles
+ITER_PAGE_SIZE = 500
+
+# How get_articles addresses each filter and sort field; the indexes are
+# declared on the same expressions, which is what lets SQLite use them
+FIELD_SQL = {
+    'date': "date",
+    'source': "source",
+    'category': "json_extract(data, '$.category')",
+    'sentiment': "json_extract(data, '$.sentiment')",
+    'sentimentScore': "json_extract(data, '$.sentimentScore')",
+}
+
+
+def _query_indexes() -> str:
+    statements = []
+    for keys in QUERY_INDEXES:
+        name = "articles_" + "_".join(field for field, _ in keys)
+        columns = ", ".join(f"{FIELD_SQL[field]}{' DESC' if direction < 0 else ''}" for field, direction in keys)
+        statements.append(f"CREATE INDEX IF NOT EXISTS {name} ON articles ({columns});")
+    return "\n".join(statements)
+
+
+def _fts_query(query: str) -> str:
+    """Quote every term so user input is never parsed as FTS5 syntax"""
+    # Prefix matching keeps "ransom" finding "ransomware", as substring search does
+    terms = ['"%s"*' % term.replace('"', '""') for term in query.split()]
+    return " ".join(terms)
+
+
+def _date_clause(since: Optional[datetime], until: Optional[datetime],
+                 column: str = "date") -> Tuple[str, List]:
+    clauses, params = [], []
+    if since:
+        clauses.append(f"{column} >= ?")
+        params.append(format_iso(since))
+    if until:
+        clauses.append(f"{column} < ?")
+        params.append(format_iso(until))
+    return " AND ".join(clauses), params
+
+
+def _where(*clauses: str) -> str:
+    clauses = [c for c in clauses if c]
+    return f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+
+def _save_crawl_state(conn: sqlite3.Connection, rowid: int, article: Dict):
+    fetched = article.get('fetched_at')
+    if isinstance(fetched, datetime):
+        fetched = format_iso(fetched)
+    conn.execute(
+        "INSERT OR REPLACE INTO crawl_state (article_rowid, content_hash, etag, last_modified, fetched_at)"
+        " VALUES (?, ?, ?, ?, ?)",
+        (rowid, article.get('content_hash'), article.get('etag'), article.get('last_modified'), fetched)
+    )
+
+
+class SQLiteHandler(DatabaseHandler):
+    def __init__(self, sqlite_path: str, compress_content: bool = False,
+                 content_codec: Optional[ContentCodec] = None):
+        self.sqlite_path = sqlite_path
+        self.compress_content = compress_content
+        self.content_codec = content_codec or ContentCodec()
+        # sqlite3 connections are not shareable across threads, so each
+        # to_thread worker keeps its own; WAL lets them read concurrently
+        self._local = threading.local()
+        if os.path.dirname(sqlite_path):
+            os.makedirs(os.path.dirname(sqlite_path), exist_ok=True)
+        self._connection().executescript(SCHEMA + _query_indexes())
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.sqlite_path, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    async def _run(self, fn, *args):
+        return await asyncio.to_thread(lambda: fn(self._connection(), *args))
+
+    def _write(self, conn: sqlite3.Connection, fn, *args):
+        """Run fn in one write transaction; IMMEDIATE avoids lock upgrades failing mid-transaction"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def _generate_random_sentiment(self):
+        sentiment_options = ["Positive", "Neutral", "Negative"]
+        sentiment = random.choice(sentiment_options)
+        score = round(random.uniform(-1, 1), 2)
+        return sentiment, score
+
+    def _generate_ai_summary(self, content: str):
+        return content[:100] + "..."
+
+    async def save_article(self, article: Dict) -> str:
+        sentiment, score = self._generate_random_sentiment()
+        published = article['published_date']
+        if isinstance(published, datetime):
+            published = format_iso(published)
+        enhanced_article = {
+            **article,
+            'id': str(uuid.uuid4()),
+            'snippet': article['content'][:150] + "...",
+            'source': article['source_website'],
+            'category': 'General',
+            'date': published,
+            'published_date': published,
+            'author': 'Unknown',
+            'sourceUrl': self._generate_ai_summary(article['content']),
+            'sentiment': sentiment,
+            'sentimentScore': score
+        }
+        stored = self._pack_content(enhanced_article)
+        data = {k: v for k, v in stored.items() if k != 'content' and k not in INTERNAL_FIELDS}
+
+        def insert(conn):
+            cursor = conn.execute(
+                "INSERT INTO articles (id, url, date, source, story_id, is_duplicate, minhash,"
+                " content, content_z, content_codec, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (stored['id'], stored.get('url'), stored['date'], stored['source'],
+                 stored.get('story_id'), int(bool(stored.get('is_duplicate'))),
+                 " ".join(map(str, stored.get('minhash', []))),
+                 stored.get('content'), stored.get('content_z'), stored.get('content_codec'),
+                 json.dumps(data, default=str))
+            )
+            rowid = cursor.lastrowid
+            conn.executemany("INSERT INTO article_bands (band, article_rowid) VALUES (?, ?)",
+                             [(band, rowid) for band in stored.get('lsh_bands', [])])
+            # Index the plain text even when only the compressed form is stored
+            conn.execute("INSERT INTO articles_fts (rowid, title, body) VALUES (?, ?, ?)",
+                         (rowid, enhanced_article.get('title', ''), enhanced_article['content']))
+            _save_crawl_state(conn, rowid, enhanced_article)
+            conn.executemany(
+                "INSERT INTO facet_counts (facet, value, count) VALUES (?, ?, 1)"
+                " ON CONFLICT (facet, value) DO UPDATE SET count = count + 1",
+                list(facet_values(enhanced_article).items())
+            )
+
+        await self._run(self._write, insert)
+        return enhanced_article['id']
+
+    async def update_article(self, article_id: str, article: Dict) -> bool:
+        fields = self._revised_fields(article)
+        stored = self._pack_content(fields)
+
+        def update(conn):
+            row = conn.execute(
+                "SELECT rowid, data, content, content_z, content_codec FROM articles WHERE id = ?",
+                (article_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            rowid, previous = row['rowid'], self._detail(row)
+            data = json.loads(row['data'])
+            data.update({k: v for k, v in stored.items() if k != 'content' and k not in INTERNAL_FIELDS})
+            conn.execute(
+                "UPDATE articles SET story_id = ?, is_duplicate = ?, minhash = ?, content = ?,"
+                " content_z = ?, content_codec = ?, data = ? WHERE rowid = ?",
+                (stored.get('story_id'), int(bool(stored.get('is_duplicate'))),
+                 " ".join(map(str, stored.get('minhash', []))),
+                 stored.get('content'), stored.get('content_z'), stored.get('content_codec'),
+                 json.dumps(data, default=str), rowid)
+            )
+            conn.execute("DELETE FROM article_bands WHERE article_rowid = ?", (rowid,))
+            conn.executemany("INSERT INTO article_bands (band, article_rowid) VALUES (?, ?)",
+                             [(band, rowid) for band in stored.get('lsh_bands', [])])
+            # A contentless FTS table can only forget a row given the text it indexed
+            conn.execute("INSERT INTO articles_fts (articles_fts, rowid, title, body) VALUES ('delete', ?, ?, ?)",
+                         (rowid, previous.get('title', ''), previous.get('content', '')))
+            conn.execute("INSERT INTO articles_fts (rowid, title, body) VALUES (?, ?, ?)",
+                         (rowid, fields.get('title', ''), fields['content']))
+            _save_crawl_state(conn, rowid, fields)
+            return True
+
+        return await self._run(self._write, update)
+
+    async def touch_crawl_state(self, article_id: str, etag: Optional[str], last_modified: Optional[str],
+                                fetched_at: datetime) -> bool:
+        def touch(conn):
+            # Upsert: articles saved before crawl_state existed have no row yet
+            return conn.execute(
+                "INSERT INTO crawl_state (article_rowid, etag, last_modified, fetched_at)"
+                " SELECT rowid, ?, ?, ? FROM articles WHERE id = ?"
+                " ON CONFLICT (article_rowid) DO UPDATE SET etag = excluded.etag,"
+                " last_modified = excluded.last_modified, fetched_at = excluded.fetched_at",
+                (etag, last_modified, format_iso(fetched_at), article_id)
+            ).rowcount > 0
+
+        return await self._run(self._write, touch)
+
+    async def get_crawl_state(self, url: str) -> Optional[Dict]:
+        def query(conn):
+            return conn.execute(
+                "SELECT a.id, a.story_id, a.is_duplicate, a.date, c.content_hash, c.etag,"
+                " c.last_modified, c.fetched_at FROM articles a"
+                " LEFT JOIN crawl_state c ON c.article_rowid = a.rowid WHERE a.url = ? LIMIT 1",
+                (url,)
+            ).fetchone()
+        row = await self._run(query)
+        if row is None:
+            return None
+        state = dict(row)
+        state['is_duplicate'] = bool(state['is_duplicate'])
+        return state
+
+    def _public(self, row: sqlite3.Row) -> Dict:
+        article = json.loads(row['data'])
+        # NULL when stored compressed; like the other backends, lists then omit it
+        if row['content'] is not None:
+            article['content'] = row['content']
+        return article
+
+    def _detail(self, row: sqlite3.Row) -> Dict:
+        article = self._public(row)
+        article['content_z'] = row['content_z']
+        article['content_codec'] = row['content_codec']
+        return self._unpack_content(article)
+
+    async def get_article(self, article_id: str) -> Optional[Dict]:
+        def query(conn):
+            return conn.execute(
+                "SELECT data, content, content_z, content_codec FROM articles WHERE id = ?",
+                (article_id,)
+            ).fetchone()
+        row = await self._run(query)
+        return self._detail(row) if row else None
+
+    async def get_articles_by_ids(self, article_ids: List[str]) -> List[Optional[Dict]]:
+        wanted = list(set(article_ids))
+
+        def query(conn):
+            placeholders = ", ".join("?" * len(wanted))
+            return conn.execute(
+                f"SELECT id, data, content, content_z, content_codec FROM articles"
+                f" WHERE id IN ({placeholders})", wanted
+            ).fetchall()
+        rows = await self._run(query) if wanted else []
+        found = {row['id']: self._detail(row) for row in rows}
+        return [found.get(article_id) for article_id in article_ids]
+
+    async def get_articles(self, skip: int = 0, limit: int = 10,
+                           include_duplicates: bool = True,
+                           since: Optional[datetime] = None,
+                           until: Optional[datetime] = None,
+                           filters: Optional[Dict[str, List[str]]] = None,
+                           sort_by: str = 'date', order: str = 'desc') -> List[Dict]:
+        sql, params = self._list_sql(skip, limit, include_duplicates, since, until, filters, sort_by, order)
+
+        def query(conn):
+            return conn.execute(sql, params).fetchall()
+        return [self._public(row) for row in await self._run(query)]
+
+    def _list_sql(self, skip: int, limit: int, include_duplicates: bool,
+                  since: Optional[datetime], until: Optional[datetime],
+                  filters: Optional[Dict[str, List[str]]], sort_by: str, order: str) -> Tuple[str, List]:
+        """The statement behind get_articles, exposed so its plan can be explained.
+
+        One filter drives the walk down its (field, sort) index; the date range and
+        any other filters are checked row by row, with a unary + so the planner
+        cannot pick their index and sort in memory instead. Several values for the
+        driving filter become one walk each, merged in sort order by UNION ALL, so
+        no query reads more than skip + limit entries per value.
+        """
+        check_sort(sort_by, order)
+        filters = sorted(clean_filters(filters).items(), key=lambda item: len(item[1]))
+        # The date range shares an index only with the date sort
+        date_clause, residual_params = _date_clause(since, until, "date" if sort_by == 'date' else "+date")
+        residual = [date_clause, "" if include_duplicates else "is_duplicate = 0"]
+        for field, values in filters[1:]:
+            residual.append(f"+{FIELD_SQL[field]} IN ({', '.join('?' * len(values))})")
+            residual_params += values
+
+        driving, values = filters[0] if filters else (None, [None])
+        arms, params = [], []
+        for value in values:
+            clauses = residual + ([f"{FIELD_SQL[driving]} = ?"] if driving else [])
+            arms.append(f"SELECT data, content, {FIELD_SQL[sort_by]} AS sort_key FROM articles {_where(*clauses)}")
+            params += residual_params + ([value] if driving else [])
+        sql = " UNION ALL ".join(arms) + f" ORDER BY sort_key {order.upper()} LIMIT ? OFFSET ?"
+        return sql, [*params, limit, skip]
+
+    async def search_articles(self, query: str,
+                              since: Optional[datetime] = None,
+                              until: Optional[datetime] = None) -> List[Dict]:
+        match = _fts_query(query)
+        if not match:
+            return []
+        date_clause, params = _date_clause(since, until)
+
+        def search(conn):
+            return conn.execute(
+                "SELECT data, content FROM articles WHERE rowid IN"
+                " (SELECT rowid FROM articles_fts WHERE articles_fts MATCH ?)"
+                f"{' AND ' + date_clause if date_clause else ''} ORDER BY date DESC",
+                (match, *params)
+            ).fetchall()
+        return [self._public(row) for row in await self._run(search)]
+
+    async def url_exists(self, url: str) -> bool:
+        def query(conn):
+            return conn.execute("SELECT 1 FROM articles WHERE url = ? LIMIT 1", (url,)).fetchone()
+        return await self._run(query) is not None
+
+    async def iter_articles(self, since: Optional[datetime] = None,
+                            until: Optional[datetime] = None,
+                            source: Optional[str] = None,
+                            after: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        # rowid only grows, so the last one seen is the checkpoint
+        if after and not after.isdigit():
+            raise ValueError(f"Invalid checkpoint: {after}")
+        last = int(after) if after else 0
+        date_clause, params = _date_clause(since, until)
+        source_clause = "source = ?" if source else ""
+        params += [source] if source else []
+
+        def page(conn, last):
+            return conn.execute(
+                "SELECT rowid, data, content, content_z, content_codec FROM articles"
+                f" {_where('rowid > ?', date_clause, source_clause)} ORDER BY rowid LIMIT ?",
+                (last, *params, ITER_PAGE_SIZE)
+            ).fetchall()
+        while True:
+            rows = await self._run(page, last)
+            for row in rows:
+                last = row['rowid']
+                yield str(last), self._detail(row)
+            if len(rows) < ITER_PAGE_SIZE:
+                return
+
+    async def get_latest_checkpoint(self) -> Optional[str]:
+        def query(conn):
+            return conn.execute("SELECT max(rowid) FROM articles").fetchone()[0]
+        latest = await self._run(query)
+        return str(latest) if latest is not None else None
+
+    async def get_facet_counts(self) -> Dict:
+        def query(conn):
+            return conn.execute("SELECT facet, value, count FROM facet_counts").fetchall()
+        facets: Dict[str, Dict[str, int]] = {}
+        for row in await self._run(query):
+            facets.setdefault(row['facet'], {})[row['value']] = row['count']
+        # Every article lands in exactly one source bucket
+        total = sum(facets.get('source', {}).values())
+        return {"total": total, "facets": facets}
+
+    async def acquire_lease(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        def upsert(conn):
+            now = time.time()
+            # The update only applies if we already hold the lease or it has expired
+            cursor = conn.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (name) DO UPDATE SET owner = excluded.owner,"
+                " expires_at = excluded.expires_at"
+                " WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+                (name, owner, now + ttl_seconds, now)
+            )
+            return cursor.rowcount > 0
+        return await self._run(upsert)
+
+    async def release_lease(self, name: str, owner: str) -> None:
+        def delete(conn):
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+        await self._run(delete)
+
+    async def heartbeat_node(self, node_id: str, status: Dict, ttl_seconds: float) -> None:
+        def upsert(conn):
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO scraper_nodes (node_id, status, heartbeat_at, expires_at)"
+                " VALUES (?, ?, ?, ?)",
+                (node_id, json.dumps(status, default=str), now, now + ttl_seconds)
+            )
+            conn.execute("DELETE FROM scraper_nodes WHERE expires_at < ?", (now - 3600,))
+        await self._run(self._write, upsert)
+
+    async def get_live_nodes(self) -> List[Dict]:
+        def query(conn):
+            return conn.execute(
+                "SELECT * FROM scraper_nodes WHERE expires_at > ? ORDER BY node_id", (time.time(),)
+            ).fetchall()
+        return [
+            {'node_id': row['node_id'], **json.loads(row['status']),
+             'heartbeat_at': datetime.fromtimestamp(row['heartbeat_at'], timezone.utc),
+             'expires_at': datetime.fromtimestamp(row['expires_at'], timezone.utc)}
+            for row in await self._run(query)
+        ]
+
+    async def remove_node(self, node_id: str) -> None:
+        def delete(conn):
+            conn.execute("DELETE FROM scraper_nodes WHERE node_id = ?", (node_id,))
+        await self._run(delete)
+
+    async def find_story_candidates(self, bands: List[str]) -> List[Dict]:
+        if not bands:
+            return []
+
+        def query(conn):
+            placeholders = ", ".join("?" * len(bands))
+            return conn.execute(
+                "SELECT story_id, minhash FROM articles WHERE rowid IN"
+                f" (SELECT article_rowid FROM article_bands WHERE band IN ({placeholders}))"
+                " LIMIT 100", bands
+            ).fetchall()
+        return [
+            {'story_id': row['story_id'], 'minhash': [int(h) for h in (row['minhash'] or '').split()]}
+            for row in await self._run(query)
+        ]
+
+    async def get_story(self, story_id: str) -> List[Dict]:
+        def query(conn):
+            return conn.execute(
+                "SELECT data, content FROM articles WHERE story_id = ? ORDER BY rowid", (story_id,)
+            ).fetchall()
+        return [self._public(row) for row in await self._run(query)]
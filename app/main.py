@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pymongo import MongoClient
 from pymongo.errors import PyMongoError, OperationFailure
 from dotenv import load_dotenv
@@ -9,12 +9,15 @@ from typing import List, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 import logging
+from bson import ObjectId
 from fastapi.encoders import jsonable_encoder
+from app.utils.export import EXPORT_CHUNK_SIZE, EXPORT_MEDIA_TYPES, encode_batch, encode_csv
+from app.utils.metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware
+from app.utils.profiling import PROFILING_ENABLED, ProfiledRoute, ProfilingMiddleware, SlowQueryListener
+from app.utils.logging_setup import setup_logging
+from app.database.queries import QUERY_INDEXES, SORT_PATTERN
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+setup_logging(console=True)
 logger = logging.getLogger(__name__)
 
 load_dotenv()
@@ -24,6 +27,8 @@ app = FastAPI(
     description="API for retrieving security news articles",
     version="1.0.0"
 )
+# Times endpoint bodies so Server-Timing can separate handler from serialization
+app.router.route_class = ProfiledRoute
 
 origins = [
     "http://localhost:3000",     
@@ -40,6 +45,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
 
 # MongoDB connection with error handling
 try:
@@ -47,11 +55,17 @@ try:
     if not mongo_url:
         raise ValueError("MONGODB_URL not found in .env file")
     
-    client = MongoClient(mongo_url)
+    # With profiling on, time every command for Server-Timing and explain slow ones
+    listeners = [SlowQueryListener(lambda: client, record_request_time=True)] if PROFILING_ENABLED else []
+    client = MongoClient(mongo_url, event_listeners=listeners)
     # Test the connection
     client.admin.command('ping')
     db = client['security_news']
     collection = db['articles']
+    collection.create_index("id")
+    # One compound index per filter + sort pair /articles accepts
+    for keys in QUERY_INDEXES:
+        collection.create_index(keys)
     logger.info("Successfully connected to MongoDB")
 except PyMongoError as e:
     logger.error(f"Failed to connect to MongoDB: {e}")
@@ -90,6 +104,23 @@ class Article(BaseModel):
             }
         }
 
+class BatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=500,
+                           description="Article IDs to fetch, at most 500")
+
+class BatchResponse(BaseModel):
+    articles: List[Optional[Article]] = Field(..., description="Articles in request order, null when not found")
+    missing: List[str] = Field(..., description="Requested IDs that were not found")
+
+def date_filter(since: Optional[datetime], until: Optional[datetime]) -> dict:
+    """Build a range filter on the indexed `date` field"""
+    date_range = {}
+    if since:
+        date_range["$gte"] = since
+    if until:
+        date_range["$lt"] = until
+    return {"date": date_range} if date_range else {}
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"Global exception: {exc}", exc_info=True)
@@ -112,13 +143,22 @@ async def root():
 async def get_all_articles(
     skip: int = Query(0, ge=0, description="Number of articles to skip"),
     limit: int = Query(10, ge=1, le=100, description="Number of articles to return"),
-    sort_by: str = Query("date", description="Field to sort by"),
-    order: str = Query("desc", description="Sort order (asc or desc)")
+    sort_by: str = Query("date", pattern=SORT_PATTERN, description="Field to sort by: date or sentimentScore"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Sort order (asc or desc)"),
+    since: Optional[datetime] = Query(None, description="Only articles published at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only articles published before this time"),
+    source: Optional[List[str]] = Query(None, description="Only these sources"),
+    category: Optional[List[str]] = Query(None, description="Only these categories"),
+    sentiment: Optional[List[str]] = Query(None, description="Only these sentiments")
 ):
-    """Get all articles with pagination and sorting"""
+    """Get articles with filtering, pagination and sorting on indexed fields"""
     try:
-        sort_direction = -1 if order.lower() == "desc" else 1
-        articles = list(collection.find({})
+        sort_direction = -1 if order == "desc" else 1
+        query = date_filter(since, until)
+        for field, values in (("source", source), ("category", category), ("sentiment", sentiment)):
+            if values:
+                query[field] = values[0] if len(values) == 1 else {"$in": values}
+        articles = list(collection.find(query)
                        .sort(sort_by, sort_direction)
                        .skip(skip)
                        .limit(limit))
@@ -134,27 +174,63 @@ async def get_all_articles(
         logger.error(f"Error fetching articles: {e}")
         raise HTTPException(status_code=500, detail="Error fetching articles")
 
-@app.get("/articles/{article_id}", response_model=Article)
-async def get_article_by_id(article_id: str):
-    """Get a specific article by its ID"""
+@app.get("/articles/export")
+async def export_articles(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    since: Optional[datetime] = Query(None, description="Only articles published at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only articles published before this time"),
+    source: Optional[str] = Query(None, description="Only articles from this source"),
+    after: Optional[str] = Query(None, description="Checkpoint to resume after")
+):
+    """Stream every matching article as NDJSON or CSV"""
+    query = date_filter(since, until)
+    if source:
+        query["source"] = source
+    if after:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Invalid checkpoint")
+        query["_id"] = {"$gt": ObjectId(after)}
+
+    def stream():
+        # Sync generator: Starlette iterates it in the threadpool, one batch at a time
+        if format == "csv":
+            yield encode_csv([], header=True)
+        batch = []
+        for article in collection.find(query).sort("_id", 1).batch_size(500):
+            article['_id'] = str(article['_id'])
+            batch.append((article['_id'], article))
+            if len(batch) >= EXPORT_CHUNK_SIZE:
+                yield encode_batch(format, batch)
+                batch = []
+        if batch:
+            yield encode_batch(format, batch)
+
+    return StreamingResponse(stream(), media_type=EXPORT_MEDIA_TYPES[format])
+
+@app.post("/articles/batch", response_model=BatchResponse)
+async def get_articles_batch(request: BatchRequest):
+    """Get many articles by ID in a single indexed query"""
     try:
-        article = collection.find_one({"id": article_id})
-        if not article:
-            raise HTTPException(status_code=404, 
-                              detail=f"Article {article_id} not found")
-        article['_id'] = str(article['_id'])
-        return article
+        found = {}
+        for article in collection.find({"id": {"$in": list(set(request.ids))}}):
+            article['_id'] = str(article['_id'])
+            found[article['id']] = article
+        articles = [found.get(article_id) for article_id in request.ids]
+        missing = [article_id for article_id in request.ids if article_id not in found]
+        return {"articles": articles, "missing": missing}
     except Exception as e:
-        logger.error(f"Error fetching article {article_id}: {e}")
-        raise HTTPException(status_code=500, 
-                          detail=f"Error fetching article {article_id}")
+        logger.error(f"Error fetching article batch: {e}")
+        raise HTTPException(status_code=500, detail="Error fetching articles")
 
+# Declared before /articles/{article_id}, which would otherwise capture "search"
 @app.get("/articles/search", response_model=List[Article])
 async def search_articles(
     query: str = Query(..., min_length=1, description="Search query"),
     field: str = Query("title", description="Field to search in"),
     skip: int = Query(0, ge=0, description="Number of articles to skip"),
-    limit: int = Query(10, ge=1, le=100, description="Number of articles to return")
+    limit: int = Query(10, ge=1, le=100, description="Number of articles to return"),
+    since: Optional[datetime] = Query(None, description="Only articles published at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only articles published before this time")
 ):
     """Search articles by title, content, or snippet"""
     valid_fields = ["title", "content", "snippet"]
@@ -166,8 +242,8 @@ async def search_articles(
     
     try:
         articles = list(collection.find(
-            {field: {"$regex": query, "$options": "i"}}
-        ).skip(skip).limit(limit))
+            {field: {"$regex": query, "$options": "i"}, **date_filter(since, until)}
+        ).sort("date", -1).skip(skip).limit(limit))
         
         if not articles:
             raise HTTPException(
@@ -183,6 +259,21 @@ async def search_articles(
         logger.error(f"Error searching articles: {e}")
         raise HTTPException(status_code=500, detail="Error searching articles")
 
+@app.get("/articles/{article_id}", response_model=Article)
+async def get_article_by_id(article_id: str):
+    """Get a specific article by its ID"""
+    try:
+        article = collection.find_one({"id": article_id})
+        if not article:
+            raise HTTPException(status_code=404, 
+                              detail=f"Article {article_id} not found")
+        article['_id'] = str(article['_id'])
+        return article
+    except Exception as e:
+        logger.error(f"Error fetching article {article_id}: {e}")
+        raise HTTPException(status_code=500, 
+                          detail=f"Error fetching article {article_id}")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -205,6 +296,11 @@ async def health_check():
             }
         )
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.on_event("startup")
 async def startup_event():
     """Startup events"""
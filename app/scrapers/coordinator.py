@@ -0,0 +1,132 @@
+import time
+import asyncio
+import hashlib
+import logging
+from bisect import bisect
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from ..database.base import DatabaseHandler
+from .news_scraper import NewsScraper
+
+SOURCE_LEASE_PREFIX = "source:"
+
+logger = logging.getLogger(__name__)
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent hash ring; adding or removing a node only moves ~1/N of the keys"""
+
+    def __init__(self, nodes: Iterable[str], vnodes: int = 64):
+        self._points = sorted(
+            (_ring_hash(f"{node}#{i}"), node) for node in nodes for i in range(vnodes)
+        )
+        self._hashes = [point for point, _ in self._points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect(self._hashes, _ring_hash(key)) % len(self._points)
+        return self._points[index][1]
+
+
+class ShardCoordinator:
+    """Crawl only the sources this node owns on the ring of live scraper nodes.
+
+    Ownership comes from consistent hashing over nodes with a fresh heartbeat, so
+    sources rebalance as nodes come and go. Each crawl is additionally guarded by
+    a per-source lease whose expiry is the source's next due time, so a source is
+    crawled once per interval even while nodes disagree about membership; a new
+    owner simply picks it up when the previous owner's lease runs out.
+    """
+
+    def __init__(self, scraper: NewsScraper, db_handler: DatabaseHandler, node_id: str,
+                 interval_seconds: float, heartbeat_ttl: float = 60):
+        self.scraper = scraper
+        self.db_handler = db_handler
+        self.node_id = node_id
+        self.interval = interval_seconds
+        self.heartbeat_ttl = heartbeat_ttl
+        self.owned: List[str] = []
+        self.current: Optional[str] = None
+        self.last_crawled: Dict[str, str] = {}
+        self.crawls = 0
+        self._next_due: Dict[str, float] = {}
+
+    def status(self) -> Dict:
+        return {
+            "sources": self.owned,
+            "current": self.current,
+            "last_crawled": self.last_crawled,
+            "crawls": self.crawls,
+        }
+
+    async def heartbeat(self):
+        await self.db_handler.heartbeat_node(self.node_id, self.status(), self.heartbeat_ttl)
+
+    async def rebalance(self) -> List[str]:
+        nodes = [node['node_id'] for node in await self.db_handler.get_live_nodes()]
+        if self.node_id not in nodes:
+            nodes.append(self.node_id)
+        ring = HashRing(nodes)
+        owned = [name for name in self.scraper.config if ring.owner(name) == self.node_id]
+        for name in set(self.owned) - set(owned):
+            self._next_due.pop(name, None)
+        if owned != self.owned:
+            logger.info("Node %s owns %d/%d sources across %d nodes",
+                        self.node_id, len(owned), len(self.scraper.config), len(nodes))
+        self.owned = owned
+        return owned
+
+    async def crawl_due_sources(self):
+        crawled = False
+        for name in list(self.owned):
+            if time.monotonic() < self._next_due.get(name, 0):
+                continue
+            lease = SOURCE_LEASE_PREFIX + name
+            # Held for a full interval: covers the crawl and keeps the source
+            # fresh-until, so a node that takes over waits until it is due again
+            if not await self.db_handler.acquire_lease(lease, self.node_id, self.interval):
+                continue
+            self.current = name
+            try:
+                await self.scraper.scrape_website(name, self.scraper.config[name])
+            finally:
+                self.current = None
+            await self.db_handler.acquire_lease(lease, self.node_id, self.interval)
+            self._next_due[name] = time.monotonic() + self.interval
+            self.last_crawled[name] = datetime.now(timezone.utc).isoformat()
+            self.crawls += 1
+            crawled = True
+            # Membership may have changed during a long crawl
+            await self.rebalance()
+        if crawled:
+            await self.scraper.notify_run_complete()
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.error("Heartbeat failed for node %s: %s", self.node_id, e)
+            await asyncio.sleep(self.heartbeat_ttl / 3)
+
+    async def run(self):
+        await self.heartbeat()
+        heartbeats = asyncio.create_task(self._heartbeat_loop())
+        try:
+            while True:
+                try:
+                    await self.rebalance()
+                    await self.crawl_due_sources()
+                except Exception as e:
+                    logger.error("Error in sharded crawl on node %s: %s", self.node_id, e)
+                await asyncio.sleep(self.heartbeat_ttl / 3)
+        finally:
+            heartbeats.cancel()
+            # Source leases are left to expire at their due time
+            await self.db_handler.remove_node(self.node_id)
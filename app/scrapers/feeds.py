@@ -0,0 +1,77 @@
+import xml.etree.ElementTree as ET
+from typing import Dict, List
+
+FEED_CONTENT_TYPES = (
+    "application/rss+xml", "application/atom+xml", "application/xml",
+    "text/xml", "application/rdf+xml",
+)
+
+# Items keyed by the local tag name, whatever namespace the feed uses
+_ENTRY_TAGS = {'item', 'entry', 'url'}
+_DATE_TAGS = ('pubDate', 'published', 'updated', 'date', 'publication_date', 'lastmod')
+_CONTENT_TAGS = ('encoded', 'content')
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _text(element: ET.Element) -> str:
+    return (element.text or "").strip()
+
+
+class FeedParser:
+    """Incremental RSS 2.0 / Atom / news sitemap parser.
+
+    Bytes are fed as they arrive and each item is reduced to a small dict and
+    dropped from the tree, so memory stays flat however long the feed is.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=('end',))
+        self.entries: List[Dict] = []
+
+    def feed(self, data: bytes):
+        self._parser.feed(data)
+        self._drain()
+
+    def close(self) -> List[Dict]:
+        self._parser.close()
+        self._drain()
+        return self.entries
+
+    def _drain(self):
+        for _, element in self._parser.read_events():
+            if _local(element.tag) in _ENTRY_TAGS:
+                entry = self._entry(element)
+                if entry.get('url'):
+                    self.entries.append(entry)
+                element.clear()
+
+    def _entry(self, element: ET.Element) -> Dict:
+        entry: Dict[str, str] = {}
+        for child in element.iter():
+            name = _local(child.tag)
+            if name == 'link':
+                # Atom puts the URL in href; prefer the alternate (article) link
+                href = child.get('href')
+                if href and child.get('rel', 'alternate') == 'alternate':
+                    entry.setdefault('url', href)
+                elif _text(child):
+                    entry.setdefault('url', _text(child))
+            elif name == 'loc':
+                entry.setdefault('url', _text(child))
+            elif name == 'title' and _text(child):
+                entry.setdefault('title', _text(child))
+            elif name in _DATE_TAGS and _text(child):
+                entry.setdefault('published', _text(child))
+            elif name in ('creator', 'name') and _text(child):
+                entry.setdefault('author', _text(child))
+            elif name == 'category':
+                term = child.get('term') or _text(child)
+                if term:
+                    entry.setdefault('category', term)
+            elif name in _CONTENT_TAGS and _text(child):
+                # content:encoded / atom:content carry the full body, unlike summaries
+                entry.setdefault('content', child.text)
+        return entry
@@ -1,107 +1,372 @@
 import aiohttp
 import asyncio
+import codecs
 import json
 import logging
+import xml.etree.ElementTree as ET
 from bs4 import BeautifulSoup
-from datetime import datetime
-from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
 from ..database.base import DatabaseHandler
-
-logging.basicConfig(
-    filename='logs/scraper.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+from ..utils.dedup import StoryDeduplicator
+from ..utils.dates import DateParser
+from ..utils.events import ArticleHub
+from ..utils.revalidation import REVALIDATION_SCHEDULE, content_fingerprint, revalidation_due
+from .partial_html import SNIFF_BYTES, FragmentExtractor, sniff_charset, supports
+from .feeds import FEED_CONTENT_TYPES, FeedParser
+from ..utils.metrics import (
+    SCRAPER_ARTICLES, SCRAPER_BYTES, SCRAPER_FETCH_SECONDS,
+    SCRAPER_PARSE_SECONDS, SCRAPER_SOURCE_SECONDS
 )
 
+# Per-site `max_body_bytes` in scraper_config.json overrides this
+DEFAULT_MAX_BODY_BYTES = 2 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+ARTICLE_FIELDS = ('title', 'content', 'date', 'author', 'category')
+# Article field -> feed entry key that can stand in for its selector
+FEED_FIELDS = {'title': 'title', 'content': 'content', 'date': 'published',
+               'author': 'author', 'category': 'category'}
+
+logger = logging.getLogger(__name__)
+
+
+def _decoder(charset: Optional[str]):
+    try:
+        return codecs.getincrementaldecoder(charset or 'utf-8')(errors='replace')
+    except LookupError:
+        return codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+
 class NewsScraper:
-    def __init__(self, config_path: str, db_handler: DatabaseHandler):
+    def __init__(self, config_path: str, db_handler: DatabaseHandler,
+                 max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+                 hub: Optional[ArticleHub] = None,
+                 on_run_complete: Optional[Callable[[], Awaitable]] = None):
         self.config = self._load_config(config_path)
         self.db_handler = db_handler
+        # Set when the API shares this process, so saves reach SSE clients at once
+        self.hub = hub
+        # Likewise, so the API can re-warm its cached pages after each crawl
+        self.on_run_complete = on_run_complete
+        self.max_body_bytes = max_body_bytes
+        self.deduplicator = StoryDeduplicator(db_handler)
+        self.date_parser = DateParser()
+        # feed_url -> ETag / Last-Modified from the last successful fetch
+        self._feed_validators: Dict[str, Dict] = {}
+        # url -> last revalidation this process made, so a failed touch_crawl_state
+        # does not mean re-fetching the article every run; pruned after each run
+        self._checked: Dict[str, datetime] = {}
 
     def _load_config(self, config_path: str) -> Dict:
         with open(config_path, 'r') as f:
             return json.load(f)
 
-    async def scrape_website(self, site_name: str, site_config: Dict):
-        async with aiohttp.ClientSession() as session:
-            try:
-                base_url = site_config['base_url']
-                selectors = site_config['selectors']
-                
-                # Get article list page
-                async with session.get(base_url) as response:
+    async def _fetch(self, session: aiohttp.ClientSession, url: str, site_name: str,
+                     page: str, extractor: Optional[FragmentExtractor] = None,
+                     validators: Optional[Dict] = None) -> Optional[str]:
+        """Stream a page, stopping at the size cap or once the extractor has everything.
+
+        Without an extractor the decoded body is returned; with one it is fed
+        chunk by chunk and the return value is an empty string on success.
+        `validators` holds the page's ETag / Last-Modified: they are sent as a
+        conditional request, replaced from the response, and a 304 sets
+        `not_modified` and returns None.
+        """
+        max_bytes = self.config.get(site_name, {}).get('max_body_bytes', self.max_body_bytes)
+        headers = {}
+        if validators and validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators and validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        with SCRAPER_FETCH_SECONDS.time(source=site_name, page=page):
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and headers:
+                    validators['not_modified'] = True
+                    # A 304 may carry refreshed validators; keep the old ones otherwise
+                    validators['etag'] = response.headers.get('ETag', validators.get('etag'))
+                    validators['last_modified'] = response.headers.get('Last-Modified', validators.get('last_modified'))
+                    return None
+                if response.status != 200:
+                    if page == "listing":
+                        logger.error("Failed to fetch %s: %s", url, response.status, extra={'source': site_name})
+                    return None
+                if response.content_type not in HTML_CONTENT_TYPES:
+                    logger.warning("Skipping %s: unexpected content type %s", url, response.content_type)
+                    return None
+                if response.content_length and response.content_length > max_bytes:
+                    logger.warning("Skipping %s: %s bytes exceeds %s", url, response.content_length, max_bytes)
+                    return None
+                if validators is not None:
+                    validators['etag'] = response.headers.get('ETag')
+                    validators['last_modified'] = response.headers.get('Last-Modified')
+
+                decoder, head = None, b""
+                parts, size = [], 0
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    if size + len(chunk) > max_bytes:
+                        chunk = chunk[:max_bytes - size]
+                        logger.warning("Truncated %s at %s bytes", url, max_bytes)
+                    size += len(chunk)
+                    if decoder is None:
+                        # Without a charset header, hold the first bytes back to look for <meta charset>
+                        head += chunk
+                        if not response.charset and len(head) < SNIFF_BYTES and size < max_bytes:
+                            continue
+                        decoder = _decoder(response.charset or sniff_charset(head))
+                        chunk, head = head, b""
+                    if self._consume(decoder.decode(chunk), parts, extractor) or size >= max_bytes:
+                        break
+                if head:
+                    # The whole page fit in the sniffing window
+                    self._consume(_decoder(sniff_charset(head)).decode(head, final=True), parts, extractor)
+                SCRAPER_BYTES.inc(size, source=site_name)
+                return "".join(parts)
+
+    @staticmethod
+    def _consume(text: str, parts: List[str], extractor: Optional[FragmentExtractor]) -> bool:
+        """Feed decoded text to the extractor or keep it; True once the extractor has everything"""
+        if extractor is None:
+            parts.append(text)
+            return False
+        extractor.feed(text)
+        return extractor.done
+
+    async def _fetch_feed(self, session: aiohttp.ClientSession, site_name: str,
+                          feed_url: str) -> Optional[List[Dict]]:
+        """Conditionally fetch and stream-parse a feed.
+
+        Returns [] when the feed is unchanged since the last fetch, and None when
+        it is unusable so the caller falls back to the HTML listing.
+        """
+        max_bytes = self.config.get(site_name, {}).get('max_body_bytes', self.max_body_bytes)
+        validators = self._feed_validators.get(feed_url, {})
+        headers = {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        try:
+            with SCRAPER_FETCH_SECONDS.time(source=site_name, page="feed"):
+                async with session.get(feed_url, headers=headers) as response:
+                    if response.status == 304:
+                        return []
                     if response.status != 200:
-                        logging.error(f"Failed to fetch {base_url}: {response.status}")
+                        logger.warning("Feed %s returned %s; using HTML listing", feed_url, response.status)
+                        return None
+                    if response.content_type not in FEED_CONTENT_TYPES:
+                        logger.warning("Feed %s has content type %s; using HTML listing", feed_url, response.content_type)
+                        return None
+
+                    parser = FeedParser()
+                    size, truncated = 0, False
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        if size + len(chunk) > max_bytes:
+                            # Items parsed so far are complete; feeds list newest first
+                            logger.warning("Truncated feed %s at %s bytes", feed_url, max_bytes)
+                            truncated = True
+                            break
+                        size += len(chunk)
+                        parser.feed(chunk)
+                    entries = parser.entries if truncated else parser.close()
+                    SCRAPER_BYTES.inc(size, source=site_name)
+                    self._feed_validators[feed_url] = {
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified')
+                    }
+                    return entries
+        except (aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError) as e:
+            logger.warning("Feed %s unusable (%s); using HTML listing", feed_url, e)
+            return None
+
+    async def _fetch_listing(self, session: aiohttp.ClientSession, site_name: str,
+                             site_config: Dict) -> Optional[List[Dict]]:
+        """Discover article links by CSS-parsing the homepage listing"""
+        selectors = site_config['selectors']
+        html = await self._fetch(session, site_config['base_url'], site_name, "listing")
+        if html is None:
+            return None
+
+        with SCRAPER_PARSE_SECONDS.time(source=site_name, page="listing"):
+            soup = BeautifulSoup(html, 'html.parser')
+            article_list = soup.select(selectors['article_list'])
+
+        entries = []
+        for article_element in article_list:
+            link_element = article_element.select_one(selectors['article_link'])
+            if link_element and link_element.get('href'):
+                entries.append({'url': link_element.get('href')})
+        return entries
+
+    async def scrape_website(self, site_name: str, site_config: Dict):
+        with SCRAPER_SOURCE_SECONDS.time(source=site_name):
+            async with aiohttp.ClientSession() as session:
+                try:
+                    selectors = site_config['selectors']
+
+                    entries = None
+                    if site_config.get('feed_url'):
+                        entries = await self._fetch_feed(session, site_name, site_config['feed_url'])
+                    if entries is None:
+                        entries = await self._fetch_listing(session, site_name, site_config)
+                    if entries is None:
                         return
-                    
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    article_list = soup.select(selectors['article_list'])
-                    
-                    for article_element in article_list:
-                        try:
-                            link_element = article_element.select_one(selectors['article_link'])
-                            if not link_element:
-                                continue
 
-                            article_url = link_element.get('href')
-                            if not article_url:
-                                continue
+                    for entry in entries:
+                        try:
+                            article_url = entry['url']
+                            SCRAPER_ARTICLES.inc(source=site_name, stage="found")
 
-                            # Check if article already exists
-                            if await self.db_handler.url_exists(article_url):
+                            # Known articles are only re-read when their age says they are due
+                            state = await self.db_handler.get_crawl_state(article_url)
+                            if state is not None:
+                                await self._revalidate(session, entry, state, selectors,
+                                                       site_name, site_config)
                                 continue
+                            SCRAPER_ARTICLES.inc(source=site_name, stage="new")
 
                             # Scrape individual article
                             article_data = await self._scrape_article(
-                                session, article_url, selectors, site_name, site_config
+                                session, article_url, selectors, site_name, site_config, entry
                             )
-                            
+
                             if article_data:
-                                await self.db_handler.save_article(article_data)
-                                logging.info(f"Saved article: {article_data['title']}")
+                                await self.deduplicator.assign_story(article_data)
+                                article_id = await self.db_handler.save_article(article_data)
+                                SCRAPER_ARTICLES.inc(source=site_name, stage="saved")
+                                await self._publish(article_id)
+                                logger.info("Saved article: %s", article_data['title'],
+                                            extra={'source': site_name, 'routine': True})
 
                         except Exception as e:
-                            logging.error(f"Error scraping article: {str(e)}")
+                            logger.error("Error scraping article: %s", e, extra={'source': site_name})
                             continue
 
-            except Exception as e:
-                logging.error(f"Error scraping website {site_name}: {str(e)}")
+                except Exception as e:
+                    logger.error("Error scraping website %s: %s", site_name, e, extra={'source': site_name})
+
+    async def _revalidate(self, session: aiohttp.ClientSession, entry: Dict, state: Dict,
+                          selectors: Dict, site_name: str, site_config: Dict):
+        """Re-ingest a known article if its content changed; an unchanged one costs no write"""
+        url = entry['url']
+        if not revalidation_due(state.get('date'), self._checked.get(url) or state.get('fetched_at')):
+            logger.debug("Skipping known article: %s", url, extra={'source': site_name, 'routine': True})
+            return
+        self._checked[url] = datetime.now(timezone.utc)
+
+        validators = {'etag': state.get('etag'), 'last_modified': state.get('last_modified')}
+        article_data = await self._scrape_article(
+            session, url, selectors, site_name, site_config, entry, validators
+        )
+        if validators.get('not_modified') or (
+                article_data and article_data['content_hash'] == state.get('content_hash')):
+            SCRAPER_ARTICLES.inc(source=site_name, stage="unchanged")
+            logger.debug("Unchanged article: %s", url, extra={'source': site_name, 'routine': True})
+            # Keep the new validators and check time without rewriting the article
+            await self.db_handler.touch_crawl_state(state['id'], validators.get('etag'),
+                                                    validators.get('last_modified'), self._checked[url])
+            return
+        if article_data is None:
+            return
+
+        await self.deduplicator.assign_story(article_data)
+        if article_data['story_id'] == state.get('story_id'):
+            # Matched its own earlier version, which says nothing about being a duplicate
+            article_data['is_duplicate'] = state.get('is_duplicate', False)
+        if await self.db_handler.update_article(state['id'], article_data):
+            SCRAPER_ARTICLES.inc(source=site_name, stage="updated")
+            await self._publish(state['id'])
+            logger.info("Updated article: %s", article_data['title'], extra={'source': site_name})
 
-    async def _scrape_article(self, session: aiohttp.ClientSession, url: str, 
-                            selectors: Dict, site_name: str, site_config: Dict) -> Optional[Dict]:
+    def _prune_checked(self, now: Optional[datetime] = None):
+        # Articles older than the revalidation schedule are never checked again
+        cutoff = (now or datetime.now(timezone.utc)) - REVALIDATION_SCHEDULE[-1][0]
+        self._checked = {url: checked for url, checked in self._checked.items() if checked >= cutoff}
+
+    async def _publish(self, article_id: str):
+        if self.hub is not None:
+            article = await self.db_handler.get_article(article_id)
+            if article:
+                self.hub.publish(article)
+
+    async def _scrape_article(self, session: aiohttp.ClientSession, url: str,
+                              selectors: Dict, site_name: str, site_config: Dict,
+                              entry: Optional[Dict] = None,
+                              validators: Optional[Dict] = None) -> Optional[Dict]:
+        """Build an article from its feed entry, fetching the page only for what the feed lacks"""
+        entry = entry or {}
+        validators = validators if validators is not None else {}
         try:
-            async with session.get(url) as response:
-                if response.status != 200:
-                    return None
-                
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                title = soup.select_one(selectors['title'])
-                content = soup.select_one(selectors['content'])
-                date = soup.select_one(selectors['date'])
-                author = soup.select_one(selectors.get('author'))
-                category = soup.select_one(selectors.get('category'))
-                
-                if not all([title, content]):
+            found = {field: entry[key] for field, key in FEED_FIELDS.items() if entry.get(key)}
+            if 'content' in found:
+                found['content'] = BeautifulSoup(found['content'], 'html.parser').get_text(" ")
+            else:
+                wanted = {
+                    field: selectors[field] for field in ARTICLE_FIELDS
+                    if selectors.get(field) and field not in found
+                }
+                # Simple `tag.class` selectors can be matched while streaming; anything
+                # else needs the whole document in one tree
+                extractor = FragmentExtractor(wanted) if supports(wanted) else None
+                html = await self._fetch(session, url, site_name, "article", extractor, validators)
+                if html is None:
                     return None
 
-                return {
-                    'title': title.text.strip(),
-                    'content': content.text.strip(),
-                    'url': url,
-                    'published_date': date.text.strip() if date else datetime.now().isoformat(),
-                    'source_website': site_name,
-                    'author': author.text.strip() if author else site_config.get('default_author', 'Unknown'),
-                    'category': category.text.strip() if category else site_config.get('default_category', 'General')
-                }
+                with SCRAPER_PARSE_SECONDS.time(source=site_name, page="article"):
+                    if extractor is not None:
+                        extractor.close()
+                        elements = extractor.elements()
+                    else:
+                        soup = BeautifulSoup(html, 'html.parser')
+                        elements = {field: soup.select_one(selector) for field, selector in wanted.items()}
+
+                for field, element in elements.items():
+                    if element is None:
+                        continue
+                    # <time> elements usually carry a machine-readable datetime attribute
+                    value = element.get('datetime') if field == 'date' else None
+                    found[field] = value or element.text.strip()
+
+            if 'title' not in found or 'content' not in found:
+                return None
+
+            raw_date = found.get('date')
+            published = self.date_parser.parse(
+                raw_date,
+                # Feed dates follow RFC 822 / ISO 8601, not the page's display format
+                source=f"{site_name}:feed" if entry.get('published') else site_name,
+                hint=None if entry.get('published') else site_config.get('date_format')
+            )
+
+            title, content = found['title'].strip(), found['content'].strip()
+            return {
+                'title': title,
+                'content': content,
+                'url': url,
+                'published_date': published or datetime.now(timezone.utc),
+                'published_date_raw': raw_date,
+                'source_website': site_name,
+                'author': found.get('author') or site_config.get('default_author', 'Unknown'),
+                'category': found.get('category') or site_config.get('default_category', 'General'),
+                'content_hash': content_fingerprint(title, content),
+                'etag': validators.get('etag'),
+                'last_modified': validators.get('last_modified'),
+                'fetched_at': datetime.now(timezone.utc)
+            }
 
         except Exception as e:
-            logging.error(f"Error scraping article {url}: {str(e)}")
+            logger.error("Error scraping article %s: %s", url, e, extra={'source': site_name})
             return None
 
     async def run_scraper(self):
         for site_name, site_config in self.config.items():
             await self.scrape_website(site_name, site_config)
+        await self.notify_run_complete()
 
+    async def notify_run_complete(self):
+        self._prune_checked()
+        if self.on_run_complete is not None:
+            try:
+                await self.on_run_complete()
+            except Exception as e:
+                logger.error("Post-crawl hook failed: %s", e)
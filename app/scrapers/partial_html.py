@@ -0,0 +1,162 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+_COMPOUND_RE = re.compile(r"^([a-zA-Z][\w-]*)?((?:[.#][\w-]+)*)$")
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "source", "track", "wbr",
+}
+# Browsers look for <meta charset> in the first 1024 bytes only
+SNIFF_BYTES = 1024
+_META_CHARSET_RE = re.compile(rb"""<meta\s[^>]*?charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE)
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+
+def sniff_charset(head: bytes) -> Optional[str]:
+    """Encoding named by a BOM or a <meta charset> / http-equiv tag in the first bytes of a page"""
+    for bom, name in _BOMS:
+        if head.startswith(bom):
+            return name
+    match = _META_CHARSET_RE.search(head[:SNIFF_BYTES])
+    if not match:
+        return None
+    name = match.group(1).decode("ascii")
+    try:
+        codecs.lookup(name)
+    except LookupError:
+        return None
+    return name
+
+
+class CompoundSelector:
+    """A single `tag.class#id` selector, the only shape FragmentExtractor understands"""
+
+    def __init__(self, tag: Optional[str], classes: List[str], element_id: Optional[str]):
+        self.tag = tag.lower() if tag else None
+        self.classes = set(classes)
+        self.element_id = element_id
+
+    @classmethod
+    def parse(cls, selector: str) -> Optional["CompoundSelector"]:
+        match = _COMPOUND_RE.match(selector.strip())
+        if not match or not (match.group(1) or match.group(2)):
+            return None
+        ids = re.findall(r"#([\w-]+)", match.group(2))
+        return cls(match.group(1), re.findall(r"\.([\w-]+)", match.group(2)), ids[0] if ids else None)
+
+    def matches(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> bool:
+        if self.tag and tag != self.tag:
+            return False
+        attributes = dict(attrs)
+        if self.element_id and attributes.get("id") != self.element_id:
+            return False
+        return self.classes <= set((attributes.get("class") or "").split())
+
+
+def supports(selectors: Dict[str, str]) -> bool:
+    return all(CompoundSelector.parse(selector) for selector in selectors.values())
+
+
+class FragmentExtractor(HTMLParser):
+    """Incrementally scan HTML and keep only the source spans of the first element
+    matching each selector, so the caller can stop downloading once all of them
+    have closed and only those fragments ever become BeautifulSoup trees.
+
+    Input is dropped as soon as the parser is past it and no matched element is
+    still open, so memory stays around the size of the fragments, not the page.
+    """
+
+    def __init__(self, selectors: Dict[str, str]):
+        super().__init__()
+        self.selectors = selectors
+        self.specs = {field: CompoundSelector.parse(sel) for field, sel in selectors.items()}
+        # Unconsumed input and open fragments; _buffer[0] is at document offset _buffer_start
+        self._buffer = ""
+        self._buffer_start = 0
+        self._size = 0
+        # Document offset of each line start, from line _first_line on
+        self._line_starts = [0]
+        self._first_line = 1
+        self._spans: Dict[str, List[Optional[int]]] = {}
+        self._open: Dict[str, List] = {}
+        self._fragments: Dict[str, str] = {}
+
+    def feed(self, data: str):
+        base = self._size
+        self._buffer += data
+        self._size += len(data)
+        self._line_starts.extend(base + m.end() for m in re.finditer("\n", data))
+        super().feed(data)
+        self._trim()
+
+    def _trim(self):
+        # HTMLParser holds back an incomplete tag in rawdata; keep that and any open fragment
+        keep_from = min([self._size - len(self.rawdata)] + [self._spans[field][0] for field in self._open])
+        if keep_from > self._buffer_start:
+            self._buffer = self._buffer[keep_from - self._buffer_start:]
+            self._buffer_start = keep_from
+        line = self.getpos()[0]
+        if line > self._first_line:
+            del self._line_starts[:line - self._first_line]
+            self._first_line = line
+
+    def _text(self, start: int, end: int) -> str:
+        return self._buffer[start - self._buffer_start:end - self._buffer_start]
+
+    @property
+    def done(self) -> bool:
+        return len(self._spans) == len(self.specs) and not self._open
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._line_starts[line - self._first_line] + column
+
+    def handle_starttag(self, tag, attrs):
+        for state in self._open.values():
+            if state[0] == tag:
+                state[1] += 1
+        for field, spec in self.specs.items():
+            if field not in self._spans and spec.matches(tag, attrs):
+                start = self._offset()
+                if tag in VOID_ELEMENTS:
+                    self._close(field, start, start + len(self.get_starttag_text() or ""))
+                else:
+                    self._spans[field] = [start, None]
+                    self._open[field] = [tag, 1]
+
+    def handle_startendtag(self, tag, attrs):
+        for field, spec in self.specs.items():
+            if field not in self._spans and spec.matches(tag, attrs):
+                start = self._offset()
+                self._close(field, start, start + len(self.get_starttag_text() or ""))
+
+    def handle_endtag(self, tag):
+        for field, state in list(self._open.items()):
+            if state[0] != tag:
+                continue
+            state[1] -= 1
+            if state[1] == 0:
+                del self._open[field]
+                self._close(field, self._spans[field][0], self._offset() + len(f"</{tag}>"))
+
+    def _close(self, field: str, start: int, end: int):
+        self._spans[field] = [start, end]
+        self._fragments[field] = self._text(start, end)
+
+    def elements(self) -> Dict[str, Optional[object]]:
+        """Parse each captured fragment; unclosed elements run to the end of the input"""
+        found = {}
+        for field, selector in self.selectors.items():
+            span = self._spans.get(field)
+            if span is None:
+                found[field] = None
+                continue
+            fragment = self._fragments.get(field)
+            if fragment is None:
+                fragment = self._text(span[0], self._size)
+            found[field] = BeautifulSoup(fragment, 'html.parser').select_one(selector)
+        return found
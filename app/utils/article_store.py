@@ -0,0 +1,195 @@
+import math
+import time
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from .dates import format_iso, to_utc
+
+# Few distinct values across many rows: stored once, referenced by code
+CATEGORICAL_FIELDS = ('source', 'source_website', 'category', 'sentiment', 'author',
+                      'is_duplicate', 'content_codec')
+# Fixed-width ISO strings, stored as epoch seconds
+DATE_FIELDS = ('date', 'published_date')
+FLOAT_FIELDS = ('sentimentScore',)
+# Text fields looked up by value, so they keep a value -> first row dict
+INDEXED_FIELDS = ('id', 'url')
+
+# Epoch value for an empty date; sorts after every real one when newest first
+MISSING_DATE = -(1 << 63)
+_ISO_FORMAT = "%Y-%m-%dT%H:%M:%S+00:00"
+
+
+def _as_text(value: Any) -> str:
+    """The string the CSV writer would have stored for value"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return format_iso(value)
+    return value if isinstance(value, str) else str(value)
+
+
+class CompactArticleStore:
+    """Articles held column-wise, with a dict built only when a row is read out"""
+
+    def __init__(self, skip_fields: Sequence[str] = ()):
+        self.fields: List[str] = []
+        self._skip = set(skip_fields)
+        self._seen = set()
+        self._count = 0
+        self._text: Dict[str, List[str]] = {}
+        self._codes: Dict[str, array] = {}
+        self._vocab: Dict[str, List[str]] = {}
+        self._vocab_index: Dict[str, Dict[str, int]] = {}
+        self._dates: Dict[str, array] = {}
+        self._floats: Dict[str, array] = {}
+        self._index: Dict[str, Dict[str, int]] = {}
+        # Per-row raw values that did not round-trip through a typed column
+        self._extras: Dict[int, Dict[str, str]] = {}
+        self._putters: Dict[str, Callable[[str], None]] = {}
+        self._getters: Dict[str, Callable[[int], Any]] = {}
+        self._order: Optional[array] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _add_field(self, field: str):
+        n = self._count
+        extras = self._extras
+        if field in CATEGORICAL_FIELDS:
+            vocab = self._vocab[field] = ['']
+            index = self._vocab_index[field] = {'': 0}
+            codes = self._codes[field] = array('I', [0]) * n
+
+            def put(text):
+                code = index.get(text)
+                if code is None:
+                    code = index[text] = len(vocab)
+                    vocab.append(text)
+                codes.append(code)
+
+            def get(i):
+                return vocab[codes[i]]
+        elif field in DATE_FIELDS:
+            dates = self._dates[field] = array('q', [MISSING_DATE]) * n
+
+            def put(text):
+                # format_iso output is exactly 25 characters, so anything else
+                # would not format back to the same string
+                if len(text) == 25 and text[10] == 'T' and text.endswith('+00:00'):
+                    try:
+                        dates.append(int(datetime.fromisoformat(text).timestamp()))
+                        return
+                    except ValueError:
+                        pass
+                if text:
+                    extras.setdefault(self._count, {})[field] = text
+                dates.append(MISSING_DATE)
+
+            def get(i):
+                epoch = dates[i]
+                return '' if epoch == MISSING_DATE else time.strftime(_ISO_FORMAT, time.gmtime(epoch))
+        elif field in FLOAT_FIELDS:
+            floats = self._floats[field] = array('d', [math.nan]) * n
+
+            def put(text):
+                number = math.nan
+                if text:
+                    try:
+                        number = float(text)
+                    except ValueError:
+                        extras.setdefault(self._count, {})[field] = text
+                floats.append(number)
+
+            def get(i):
+                number = floats[i]
+                return '' if number != number else number
+        else:
+            column = self._text[field] = [''] * n
+            put = column.append
+            get = column.__getitem__
+            if field in INDEXED_FIELDS:
+                rows = self._index[field] = {'': 0} if n else {}
+
+                def put(text):
+                    rows.setdefault(text, len(column))
+                    column.append(text)
+        self._putters[field] = put
+        self._getters[field] = get
+        self.fields.append(field)
+
+    def append(self, article: Dict) -> int:
+        if not self._seen.issuperset(article):
+            for field in article:
+                if field not in self._seen:
+                    self._seen.add(field)
+                    if field not in self._skip:
+                        self._add_field(field)
+        for field, put in self._putters.items():
+            value = article.get(field)
+            put(value if value.__class__ is str else _as_text(value))
+        self._count += 1
+        self._order = None
+        return self._count - 1
+
+    def extend(self, articles: Iterable[Dict]):
+        for article in articles:
+            self.append(article)
+
+    def get(self, row: int, field: str) -> Any:
+        extras = self._extras.get(row)
+        if extras and field in extras:
+            return extras[field]
+        getter = self._getters.get(field)
+        return getter(row) if getter else None
+
+    def materialize(self, row: int) -> Dict:
+        """Build the row's dict, in the order fields were first seen"""
+        article = {field: getter(row) for field, getter in self._getters.items()}
+        extras = self._extras.get(row)
+        if extras:
+            article.update(extras)
+        return article
+
+    def index_of(self, field: str, value: str) -> Optional[int]:
+        """First row whose text field equals value"""
+        if field in self._index:
+            return self._index[field].get(value)
+        column = self._text.get(field)
+        try:
+            return column.index(value) if column is not None else None
+        except ValueError:
+            return None
+
+    def contains(self, field: str, value: str) -> bool:
+        if field in self._index:
+            return value in self._index[field]
+        column = self._text.get(field)
+        return column is not None and value in column
+
+    def rows_where(self, field: str, value: str) -> List[int]:
+        if field in self._codes:
+            code = self._vocab_index[field].get(value)
+            codes = self._codes[field]
+            return [] if code is None else [i for i in range(self._count) if codes[i] == code]
+        column = self._text.get(field, ())
+        return [i for i, v in enumerate(column) if v == value]
+
+    def newest_first(self, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None) -> Sequence[int]:
+        """Row numbers by `date` descending; `since` inclusive, `until` exclusive"""
+        dates = self._dates.get('date')
+        if dates is None:
+            return range(self._count)
+        if self._order is None:
+            # Stable, so rows with equal dates keep file order like the CSV sort did
+            self._order = array('q', sorted(range(self._count), key=dates.__getitem__, reverse=True))
+        order = self._order
+        start, stop = 0, len(order)
+        key = lambda i: -dates[i]
+        if until:
+            start = bisect_right(order, -int(to_utc(until).timestamp()), key=key)
+        if since:
+            stop = bisect_right(order, -int(to_utc(since).timestamp()), key=key)
+        return order[start:stop]
@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+# zlib can only reach back 32 KB, so a larger preset dictionary is wasted
+DICTIONARY_SIZE = 32 * 1024
+DEFAULT_DICTIONARY_DIR = "data/zdict"
+CURRENT_FILE = "CURRENT"
+
+
+def dictionary_id(dictionary: bytes) -> str:
+    return hashlib.blake2b(dictionary, digest_size=6).hexdigest()
+
+
+def train_dictionary(samples: Iterable[str], size: int = DICTIONARY_SIZE) -> bytes:
+    """Build a preset dictionary from the phrases shared by the most sample texts"""
+    document_frequency = Counter()
+    for text in samples:
+        words = text.split()
+        phrases = set()
+        for n in (2, 3, 4):
+            phrases.update(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+        document_frequency.update(phrases)
+
+    # Score by bytes saved across the corpus; phrases seen once never pay off
+    ranked = sorted(
+        (phrase for phrase, df in document_frequency.items() if df > 1),
+        key=lambda phrase: document_frequency[phrase] * len(phrase),
+        reverse=True
+    )
+    chosen, total = [], 0
+    for phrase in ranked:
+        encoded = phrase.encode('utf-8') + b" "
+        if total + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        total += len(encoded)
+    # Nearer matches encode cheaper, so the most valuable phrases go last
+    return b"".join(reversed(chosen))
+
+
+class ContentCodec:
+    """zlib compression of article content against versioned preset dictionaries"""
+
+    def __init__(self, dictionaries: Optional[Dict[str, bytes]] = None,
+                 current: Optional[str] = None):
+        self.dictionaries = dictionaries or {}
+        self.current = current
+
+    @classmethod
+    def load(cls, directory: str = DEFAULT_DICTIONARY_DIR) -> "ContentCodec":
+        """Load every dictionary in `directory`; old ones stay readable after retraining"""
+        dictionaries = {}
+        current = None
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if name.endswith(".zdict"):
+                    with open(os.path.join(directory, name), 'rb') as f:
+                        dictionaries[name[:-len(".zdict")]] = f.read()
+            current_path = os.path.join(directory, CURRENT_FILE)
+            if os.path.exists(current_path):
+                with open(current_path) as f:
+                    current = f.read().strip() or None
+        return cls(dictionaries, current if current in dictionaries else None)
+
+    def compress(self, text: str) -> Tuple[bytes, str]:
+        """Return the compressed bytes and the codec tag needed to read them back"""
+        if self.current is None:
+            return zlib.compress(text.encode('utf-8'), 9), "zlib"
+        compressor = zlib.compressobj(9, zdict=self.dictionaries[self.current])
+        blob = compressor.compress(text.encode('utf-8')) + compressor.flush()
+        return blob, f"zlib:{self.current}"
+
+    def decompress(self, blob: Union[bytes, str], codec: str) -> str:
+        if isinstance(blob, str):
+            # CSV rows carry the blob base64-encoded
+            blob = base64.b64decode(blob)
+        name, _, dict_id = codec.partition(":")
+        if name != "zlib":
+            raise ValueError(f"Unknown content codec: {codec}")
+        if not dict_id:
+            return zlib.decompress(blob).decode('utf-8')
+        if dict_id not in self.dictionaries:
+            raise ValueError(f"Missing compression dictionary: {dict_id}")
+        decompressor = zlib.decompressobj(zdict=self.dictionaries[dict_id])
+        return (decompressor.decompress(blob) + decompressor.flush()).decode('utf-8')
+
+
+def save_dictionary(dictionary: bytes, directory: str = DEFAULT_DICTIONARY_DIR) -> str:
+    """Write a dictionary under its content id and make it the one new writes use"""
+    os.makedirs(directory, exist_ok=True)
+    dict_id = dictionary_id(dictionary)
+    with open(os.path.join(directory, f"{dict_id}.zdict"), 'wb') as f:
+        f.write(dictionary)
+    with open(os.path.join(directory, CURRENT_FILE), 'w') as f:
+        f.write(dict_id)
+    return dict_id
+
+
+async def _collect_samples(app_config: Dict, limit: int):
+    from ..database.factory import create_db_handler
+    db_handler = create_db_handler(app_config)
+    samples = []
+    async for _, article in db_handler.iter_articles():
+        if article.get('content'):
+            samples.append(article['content'])
+            if len(samples) >= limit:
+                break
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the shared dictionary for compressed article content")
+    parser.add_argument("--config", default="config/app_config.json")
+    parser.add_argument("--samples", type=int, default=2000, help="articles to train on")
+    parser.add_argument("--size", type=int, default=DICTIONARY_SIZE, help="dictionary size in bytes")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        app_config = json.load(f)
+    samples = asyncio.run(_collect_samples(app_config, args.samples))
+    if not samples:
+        raise SystemExit("No article content to train on")
+
+    directory = app_config.get('content_dictionary_dir', DEFAULT_DICTIONARY_DIR)
+    dictionary = train_dictionary(samples, args.size)
+    dict_id = save_dictionary(dictionary, directory)
+
+    raw = sum(len(s.encode('utf-8')) for s in samples)
+    plain_codec, trained_codec = ContentCodec(), ContentCodec.load(directory)
+    plain = sum(len(plain_codec.compress(s)[0]) for s in samples)
+    trained = sum(len(trained_codec.compress(s)[0]) for s in samples)
+    print(f"dictionary {dict_id}: {len(dictionary)} bytes from {len(samples)} articles")
+    print(f"raw {raw} bytes, zlib {plain / raw:.1%}, zlib+dictionary {trained / raw:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -27,7 +27,8 @@ def connect_to_mongodb():
 def process_date(date_str):
     """Convert date string to datetime object"""
     try:
-        return datetime.strptime(date_str, '%Y-%m-%d')
+        # Handles both plain dates and the full UTC timestamps the scraper now writes
+        return datetime.fromisoformat(date_str)
     except:
         return datetime.now()  # fallback to current date
 
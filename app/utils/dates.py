@@ -0,0 +1,117 @@
+import re
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+# Tried in order when neither the per-source cache nor the config hint matches.
+# Slash dates are left out on purpose: 03/04/2024 is March 4 or 3 April depending
+# on the site, so those sources need a `date_format` hint in scraper_config.json.
+COMMON_FORMATS = [
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S.%f%z",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+    "%B %d, %Y",
+    "%b %d, %Y",
+    "%B %d, %Y %I:%M %p",
+    "%b %d, %Y %I:%M %p",
+    "%d %B %Y",
+    "%d %b %Y",
+    "%A, %B %d, %Y",
+    "%a %d %b %Y",
+]
+
+_RELATIVE_RE = re.compile(
+    r"^(\d+|an?|one)\s+(second|minute|hour|day|week|month|year)s?\s+ago$", re.I
+)
+_RELATIVE_UNITS = {
+    'second': timedelta(seconds=1),
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+    'month': timedelta(days=30),
+    'year': timedelta(days=365),
+}
+_PREFIX_RE = re.compile(r"^(published|posted|updated|last updated)( on)?:?\s*", re.I)
+_ORDINAL_RE = re.compile(r"(\d)(st|nd|rd|th)\b")
+
+
+def to_utc(value: datetime) -> datetime:
+    """Treat naive datetimes as UTC and convert aware ones to UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def format_iso(value: datetime) -> str:
+    """Fixed-width UTC ISO string, so string order matches chronological order"""
+    return to_utc(value).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+
+
+class DateParser:
+    """Parse scraped date strings to UTC, remembering which format each source uses"""
+
+    def __init__(self):
+        self._format_cache: Dict[str, str] = {}
+
+    def parse(self, text: Optional[str], source: Optional[str] = None,
+              hint: Optional[str] = None, now: Optional[datetime] = None) -> Optional[datetime]:
+        if not text:
+            return None
+        text = _ORDINAL_RE.sub(r"\1", _PREFIX_RE.sub("", " ".join(text.split())))
+
+        cached = self._format_cache.get(source) if source else None
+        for fmt in filter(None, (cached, hint)):
+            parsed = self._try_format(text, fmt)
+            if parsed:
+                return parsed
+
+        try:
+            return to_utc(datetime.fromisoformat(text.replace("Z", "+00:00")))
+        except ValueError:
+            pass
+
+        relative = self._parse_relative(text, now or datetime.now(timezone.utc))
+        if relative:
+            return relative
+
+        try:
+            return to_utc(parsedate_to_datetime(text))
+        except (TypeError, ValueError, IndexError):
+            pass
+
+        for fmt in COMMON_FORMATS:
+            parsed = self._try_format(text, fmt)
+            if parsed:
+                if source:
+                    self._format_cache[source] = fmt
+                return parsed
+        return None
+
+    def _try_format(self, text: str, fmt: str) -> Optional[datetime]:
+        try:
+            return to_utc(datetime.strptime(text, fmt))
+        except ValueError:
+            return None
+
+    def _parse_relative(self, text: str, now: datetime) -> Optional[datetime]:
+        lowered = text.lower()
+        if lowered in ("today", "just now"):
+            return now
+        if lowered == "yesterday":
+            return now - timedelta(days=1)
+        match = _RELATIVE_RE.match(text)
+        if not match:
+            return None
+        amount = 1 if match.group(1).lower() in ("a", "an", "one") else int(match.group(1))
+        return now - amount * _RELATIVE_UNITS[match.group(2).lower()]
+
+
+_default_parser = DateParser()
+
+
+def parse_date(text: Optional[str], source: Optional[str] = None,
+               hint: Optional[str] = None) -> Optional[datetime]:
+    """Parse with a shared module-level DateParser"""
+    return _default_parser.parse(text, source=source, hint=hint)
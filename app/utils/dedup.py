@@ -0,0 +1,107 @@
+import re
+import uuid
+import hashlib
+import logging
+from typing import Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 64 permutations split into 16 bands of 4 rows puts the LSH candidate
+# threshold at roughly (1/16) ** (1/4) ~= 0.5 Jaccard similarity.
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+SHINGLE_SIZE = 3
+MAX_TEXT_CHARS = 5000
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"\w+")
+
+
+def _permutations(count: int):
+    """Deterministic (a, b) pairs so signatures stay comparable across runs"""
+    params = []
+    for i in range(count):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], 'big') % _MERSENNE_PRIME or 1
+        b = int.from_bytes(digest[8:], 'big') % _MERSENNE_PRIME
+        params.append((a, b))
+    return params
+
+_PERMUTATIONS = _permutations(NUM_PERMUTATIONS)
+
+
+def _shingles(text: str) -> set:
+    words = _WORD_RE.findall(text.lower()[:MAX_TEXT_CHARS])
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {
+        " ".join(words[i:i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash_signature(text: str) -> List[int]:
+    """Compute a MinHash signature over word shingles of the text"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), 'big')
+        for s in _shingles(text)
+    ]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERMUTATIONS
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def lsh_bands(signature: Sequence[int]) -> List[str]:
+    """Split a signature into band keys; articles sharing a key are candidates"""
+    bands = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(
+            ",".join(map(str, rows)).encode(), digest_size=8
+        ).hexdigest()
+        bands.append(f"{band}:{digest}")
+    return bands
+
+
+def estimate_similarity(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    """Estimate Jaccard similarity from two signatures"""
+    if not sig_a or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class StoryDeduplicator:
+    """Assign scraped articles to story clusters using MinHash + LSH buckets"""
+
+    def __init__(self, db_handler, threshold: float = 0.8):
+        self.db_handler = db_handler
+        self.threshold = threshold
+
+    async def assign_story(self, article: Dict) -> Dict:
+        text = f"{article.get('title', '')} {article.get('content', '')}"
+        signature = minhash_signature(text)
+        bands = lsh_bands(signature)
+
+        best_story, best_score = None, 0.0
+        for candidate in await self.db_handler.find_story_candidates(bands):
+            score = estimate_similarity(signature, candidate.get('minhash') or [])
+            if score > best_score:
+                best_story, best_score = candidate.get('story_id'), score
+
+        if best_story and best_score >= self.threshold:
+            logger.info("Near-duplicate of story %s (%.2f): %s", best_story, best_score, article.get('url'),
+                        extra={'source': article.get('source_website')})
+            article['story_id'] = best_story
+            article['is_duplicate'] = True
+        else:
+            article['story_id'] = uuid.uuid4().hex
+            article['is_duplicate'] = False
+
+        article['minhash'] = signature
+        article['lsh_bands'] = bands
+        return article
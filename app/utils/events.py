@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import uuid
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+# Recent events kept for clients resuming with Last-Event-ID
+REPLAY_BUFFER_SIZE = 1000
+# Undelivered events per client before it is cut loose to reconnect and replay
+CLIENT_QUEUE_SIZE = 100
+KEEPALIVE_SECONDS = 15
+# Fields too heavy or too internal to push to every dashboard
+EVENT_EXCLUDED_FIELDS = ('content', 'content_z', 'content_codec', 'minhash', 'lsh_bands')
+# How far back each tail poll re-reads, for writers whose checkpoints arrive out of order
+TAIL_OVERLAP_SECONDS = 60
+# Checkpoints remembered so the overlap is not published twice
+TAIL_SEEN_LIMIT = 10000
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event: str, data: Dict, event_id: Optional[str] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += [f"event: {event}", f"data: {json.dumps(data, default=str)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    """One client's filtered, bounded view of the hub"""
+
+    def __init__(self, source: Optional[List[str]] = None, category: Optional[List[str]] = None,
+                 q: Optional[str] = None, queue_size: int = CLIENT_QUEUE_SIZE):
+        self.sources = set(source) if source else None
+        self.categories = set(category) if category else None
+        self.keyword = q.lower() if q else None
+        self.queue_size = queue_size
+        # Unbounded on purpose: the size check in offer() leaves room for the end marker
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.reset = False
+        self.closed = False
+
+    def matches(self, article: Dict) -> bool:
+        if self.sources is not None and article.get('source') not in self.sources:
+            return False
+        if self.categories is not None and article.get('category') not in self.categories:
+            return False
+        if self.keyword is not None:
+            text = f"{article.get('title', '')} {article.get('snippet', '')}".lower()
+            return self.keyword in text
+        return True
+
+    def offer(self, event_id: str, article: Dict):
+        if self.closed or not self.matches(article):
+            return
+        if self.queue.qsize() >= self.queue_size:
+            # A slow reader gets disconnected rather than buffering without bound;
+            # it reconnects with Last-Event-ID and replays from the hub's buffer
+            self.closed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait((event_id, article))
+
+    async def stream(self, keepalive: float = KEEPALIVE_SECONDS) -> AsyncIterator[str]:
+        """SSE text for this subscription; ends when the client falls too far behind"""
+        if self.reset:
+            yield format_sse("reset", {"detail": "Last-Event-ID is too old; reload /articles"})
+        while True:
+            try:
+                item = await asyncio.wait_for(self.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if item is None:
+                return
+            event_id, article = item
+            yield format_sse("article", article, event_id)
+
+
+class ArticleHub:
+    """In-process fan-out of newly saved articles to SSE subscribers"""
+
+    def __init__(self, buffer_size: int = REPLAY_BUFFER_SIZE, queue_size: int = CLIENT_QUEUE_SIZE):
+        # Ids are "<instance>-<sequence>"; an id from an earlier process cannot be replayed
+        self.instance = uuid.uuid4().hex[:8]
+        self.queue_size = queue_size
+        self._sequence = 0
+        self._buffer: Deque[Tuple[int, Dict]] = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscription] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, article: Dict) -> str:
+        event = {k: v for k, v in article.items() if k not in EVENT_EXCLUDED_FIELDS}
+        self._sequence += 1
+        self._buffer.append((self._sequence, event))
+        event_id = f"{self.instance}-{self._sequence}"
+        for subscription in list(self._subscribers):
+            subscription.offer(event_id, event)
+            if subscription.closed:
+                self._subscribers.discard(subscription)
+        return event_id
+
+    def subscribe(self, last_event_id: Optional[str] = None, **filters) -> Subscription:
+        subscription = Subscription(queue_size=self.queue_size, **filters)
+        if last_event_id:
+            instance, _, sequence = last_event_id.partition("-")
+            oldest = self._buffer[0][0] if self._buffer else self._sequence + 1
+            if instance != self.instance or not sequence.isdigit() or int(sequence) < oldest - 1:
+                subscription.reset = True
+            else:
+                # Replay bypasses the per-client bound; the buffer already caps it
+                for number, event in self._buffer:
+                    if number > int(sequence) and subscription.matches(event):
+                        subscription.queue.put_nowait((f"{self.instance}-{number}", event))
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+
+async def tail_articles(db_handler, hub: ArticleHub, interval_seconds: float = 5,
+                        on_new: Optional[Callable[[], Awaitable]] = None):
+    """Publish articles another process saved, by polling the backend's export checkpoint.
+
+    Each poll starts a little before the last checkpoint (see rewind_checkpoint)
+    and skips articles already published, so a Mongo insert from a node whose
+    _id sorts below one already seen is still picked up. on_new runs after each
+    poll that found at least one article.
+    """
+    checkpoint: Optional[str] = None
+    started = False
+    seen: "OrderedDict[str, None]" = OrderedDict()
+
+    def first_sighting(key: str) -> bool:
+        if key in seen:
+            return False
+        seen[key] = None
+        if len(seen) > TAIL_SEEN_LIMIT:
+            seen.popitem(last=False)
+        return True
+
+    while True:
+        try:
+            if not started:
+                # Inside the loop, so a database that is down at startup is retried
+                checkpoint = await db_handler.get_latest_checkpoint()
+                if checkpoint is not None:
+                    after = db_handler.rewind_checkpoint(checkpoint, TAIL_OVERLAP_SECONDS)
+                    async for key, _ in db_handler.iter_articles(after=after):
+                        first_sighting(key)
+                started = True
+            else:
+                found = 0
+                after = db_handler.rewind_checkpoint(checkpoint, TAIL_OVERLAP_SECONDS)
+                async for key, article in db_handler.iter_articles(after=after):
+                    # Storage order, so the last key is the newest checkpoint
+                    checkpoint = key
+                    if first_sighting(key):
+                        hub.publish(article)
+                        found += 1
+                if found and on_new is not None:
+                    await on_new()
+        except Exception as e:
+            logger.error("Error tailing new articles: %s", e)
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,40 @@
+import csv
+import io
+import json
+from typing import Dict, Iterable, List, Tuple
+
+EXPORT_FIELDS = [
+    'id', 'title', 'content', 'snippet', 'source', 'category', 'date',
+    'author', 'sourceUrl', 'sentiment', 'sentimentScore', 'url', 'story_id'
+]
+EXPORT_CHUNK_SIZE = 200
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+
+def encode_ndjson(batch: Iterable[Tuple[str, Dict]]) -> str:
+    """Encode (checkpoint, article) pairs as newline-delimited JSON"""
+    return "".join(
+        json.dumps({**article, "checkpoint": checkpoint}, default=str) + "\n"
+        for checkpoint, article in batch
+    )
+
+
+def encode_csv(batch: Iterable[Tuple[str, Dict]], header: bool = False) -> str:
+    """Encode (checkpoint, article) pairs as CSV rows, optionally with a header"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS + ['checkpoint'],
+                            extrasaction='ignore')
+    if header:
+        writer.writeheader()
+    for checkpoint, article in batch:
+        writer.writerow({**article, 'checkpoint': checkpoint})
+    return buffer.getvalue()
+
+
+def encode_batch(export_format: str, batch: List[Tuple[str, Dict]]) -> str:
+    if export_format == "csv":
+        return encode_csv(batch)
+    return encode_ndjson(batch)
@@ -0,0 +1,46 @@
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable
+
+FACET_FIELDS = ('source', 'category', 'sentiment')
+_ISO_DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def article_day(value) -> str:
+    """Bucket a stored date into a YYYY-MM-DD day key"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, str) and _ISO_DAY_RE.match(value):
+        return value[:10]
+    return "unknown"
+
+
+def facet_values(article: Dict) -> Dict[str, str]:
+    """Return the facet bucket each dashboard counter should be bumped in"""
+    values = {field: str(article.get(field) or "unknown") for field in FACET_FIELDS}
+    values['day'] = article_day(article.get('date'))
+    return values
+
+
+class FacetCounter:
+    """In-memory facet counts, updated per saved article"""
+
+    def __init__(self):
+        self.counts: Dict[str, Counter] = defaultdict(Counter)
+        self.total = 0
+
+    def add(self, article: Dict):
+        for facet, value in facet_values(article).items():
+            self.counts[facet][value] += 1
+        self.total += 1
+
+    def add_all(self, articles: Iterable[Dict]):
+        for article in articles:
+            self.add(article)
+
+    def as_dict(self) -> Dict:
+        return {
+            "total": self.total,
+            "facets": {facet: dict(counter) for facet, counter in self.counts.items()}
+        }
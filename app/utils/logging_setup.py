@@ -0,0 +1,147 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import socket
+import time
+from typing import Dict, Optional
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+# Keep one in this many routine records per source and message
+DEFAULT_SAMPLE_EVERY = 10
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# LogRecord attributes passed through to the JSON line when set via `extra`
+EXTRA_FIELDS = ('source', 'url', 'sampled')
+# "process": every process writes and rotates its own file (see process_log_file).
+# "external": all of them append to log_file itself and reopen it once logrotate
+# or similar has moved it; nothing rotates in-process.
+LOG_ROTATIONS = ('process', 'external')
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                    + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in EXTRA_FIELDS:
+            value = record.__dict__.get(field)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RoutineSampler(logging.Filter):
+    """Pass one in `every` records marked routine, per (source, message template)
+
+    Mark a record with `extra={'routine': True, 'source': ...}`. Kept records
+    carry `sampled=every` so the log still says how many they stand for.
+    Anything at WARNING or above is never dropped.
+    """
+
+    def __init__(self, every: int = DEFAULT_SAMPLE_EVERY):
+        super().__init__()
+        self.every = every
+        self._counts: Dict[tuple, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every <= 1 or record.levelno >= logging.WARNING or not record.__dict__.get('routine'):
+            return True
+        key = (record.__dict__.get('source'), record.msg)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+def process_log_file(log_file: str) -> str:
+    """log_file with this host and pid in the name, e.g. logs/scraper.web-1-42.log
+
+    The API and each worker replica share the logs directory; two
+    RotatingFileHandlers on one file rename it out from under each other.
+    """
+    root, ext = os.path.splitext(log_file)
+    return f"{root}.{socket.gethostname()}-{os.getpid()}{ext}"
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock prepare() formats the message on the caller's thread; the
+        # record never leaves the process, so leave that to the listener
+        return record
+
+
+def setup_logging(log_file: Optional[str] = None, level: int = logging.INFO,
+                  console: bool = False, console_formatter: Optional[logging.Formatter] = None,
+                  max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT,
+                  sample_every: int = DEFAULT_SAMPLE_EVERY, rotation: str = 'process'):
+    """Send all logging through a queue to a background writer thread.
+
+    Callers only append a record to the queue; formatting, JSON encoding and
+    file I/O happen on the listener thread. Only the first call takes effect.
+    `rotation` is one of LOG_ROTATIONS.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    handlers = []
+    if rotation not in LOG_ROTATIONS:
+        raise ValueError(f"log rotation must be one of {', '.join(LOG_ROTATIONS)}, not {rotation}")
+    if log_file:
+        directory = os.path.dirname(log_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if rotation == 'external':
+            file_handler = logging.handlers.WatchedFileHandler(log_file, encoding='utf-8')
+        else:
+            file_handler = logging.handlers.RotatingFileHandler(
+                process_log_file(log_file), maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            )
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(console_formatter or logging.Formatter(CONSOLE_FORMAT))
+        handlers.append(console_handler)
+
+    records = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(records)
+    queue_handler.addFilter(RoutineSampler(sample_every))
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued on interpreter exit
+    atexit.register(_listener.stop)
+
+
+def setup_from_config(app_config: Dict, **overrides):
+    """setup_logging() with the `log_*` settings from app_config.json"""
+    options = {
+        'log_file': app_config.get('log_file'),
+        'level': logging.getLevelName(app_config.get('log_level', 'INFO').upper()),
+        'max_bytes': app_config.get('log_max_bytes', DEFAULT_MAX_BYTES),
+        'backup_count': app_config.get('log_backup_count', DEFAULT_BACKUP_COUNT),
+        'sample_every': app_config.get('log_sample_every', DEFAULT_SAMPLE_EVERY),
+        'rotation': app_config.get('log_rotation', 'process'),
+    }
+    options.update(overrides)
+    setup_logging(**options)
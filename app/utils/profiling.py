@@ -0,0 +1,229 @@
+import os
+import sys
+import time
+import inspect
+import logging
+import threading
+import functools
+import hmac
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from pymongo import monitoring
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "").lower() in ("1", "true", "yes")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Requests carrying this value in X-Profile-Token get a sampled stack profile logged
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_INTERVAL = 0.001
+
+
+class RequestTiming:
+    __slots__ = ("start", "db", "db_calls", "handler", "handler_end")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db = 0.0
+        self.db_calls = 0
+        self.handler = 0.0
+        self.handler_end: Optional[float] = None
+
+    def server_timing(self) -> str:
+        now = time.perf_counter()
+        total = now - self.start
+        serialize = now - self.handler_end if self.handler_end else 0.0
+        handler = max(self.handler - self.db, 0.0)
+        return ", ".join([
+            f'db;dur={self.db * 1000:.2f};desc="{self.db_calls} calls"',
+            f"handler;dur={handler * 1000:.2f}",
+            f"serialize;dur={serialize * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ])
+
+
+_current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def record_db(seconds: float):
+    """Attribute DB time to the request being profiled, if any"""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.db += seconds
+        timing.db_calls += 1
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that times the endpoint body, so serialization can be split out"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        is_async = inspect.iscoroutinefunction(endpoint)
+
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args, **kw):
+            timing = _current_timing.get()
+            start = time.perf_counter()
+            try:
+                if is_async:
+                    return await endpoint(*args, **kw)
+                return await run_in_threadpool(endpoint, *args, **kw)
+            finally:
+                if timing is not None:
+                    timing.handler_end = time.perf_counter()
+                    timing.handler += timing.handler_end - start
+
+        super().__init__(path, timed_endpoint, **kwargs)
+
+
+def query_shape(value):
+    """Replace literal values with their type names, keeping operators and field names"""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [query_shape(v) for v in value[:3]]
+    return type(value).__name__
+
+
+def plan_summary(explain: Dict) -> str:
+    """Collapse an explain() winning plan into e.g. 'LIMIT > FETCH > IXSCAN {date: -1}'"""
+    plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    plan = plan.get("queryPlan", plan)
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("keyPattern"):
+            stage += f" {plan['keyPattern']}"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return " > ".join(stages) or "unknown"
+
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Logs Mongo commands slower than SLOW_QUERY_MS with their shape and plan.
+
+    With record_request_time it also feeds command time into the current
+    request's Server-Timing; leave it off where DatabaseHandler already times calls.
+    """
+
+    EXPLAINABLE = ("find", "aggregate", "count", "distinct")
+
+    def __init__(self, sync_client_factory: Optional[Callable] = None,
+                 threshold_ms: float = SLOW_QUERY_MS, record_request_time: bool = False):
+        self.sync_client_factory = sync_client_factory
+        self.threshold_ms = threshold_ms
+        self.record_request_time = record_request_time
+        self._commands: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+
+    def started(self, event):
+        if event.command_name in self.EXPLAINABLE:
+            self._commands[event.request_id] = (event.database_name, event.command)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+    def _finish(self, event):
+        seconds = event.duration_micros / 1e6
+        if self.record_request_time:
+            record_db(seconds)
+        started = self._commands.pop(event.request_id, None)
+        if started is None or seconds * 1000 < self.threshold_ms:
+            return
+        database, command = started
+        shape = {k: query_shape(v) for k, v in command.items()
+                 if k in (event.command_name, "filter", "sort", "pipeline", "query", "projection")}
+        logger.warning("Slow query %.1f ms on %s: %s", seconds * 1000, database, shape)
+        if self.sync_client_factory:
+            threading.Thread(target=self._explain, args=(database, command), daemon=True).start()
+
+    def _explain(self, database: str, command: Dict):
+        try:
+            explainable = {k: v for k, v in command.items() if not k.startswith(("$", "lsid"))}
+            result = self.sync_client_factory()[database].command(
+                "explain", explainable, verbosity="queryPlanner"
+            )
+            logger.warning("Slow query plan on %s.%s: %s", database,
+                           command.get(next(iter(command))), plan_summary(result))
+        except Exception as e:
+            logger.error("Could not explain slow query: %s", e)
+
+
+class StackSampler:
+    """Statistical profiler sampling one thread's stack at a fixed interval"""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < 40:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def report(self, top: int = 15) -> str:
+        """Collapsed stacks (flamegraph.pl input), most frequent first"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common(top))
+
+
+class ProfilingMiddleware:
+    """Adds Server-Timing (db/handler/serialize/total) to every response"""
+
+    def __init__(self, app, profile_token: Optional[str] = PROFILE_TOKEN):
+        self.app = app
+        self.profile_token = profile_token
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if self.profile_token and self._wants_profile(scope):
+                with StackSampler(threading.get_ident()) as sampler:
+                    await self.app(scope, receive, send_wrapper)
+                logger.info("Profile for %s %s (%d samples):\n%s", scope["method"], scope["path"],
+                            sum(sampler.samples.values()), sampler.report())
+            else:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_timing.reset(token)
+
+    def _wants_profile(self, scope) -> bool:
+        for name, value in scope.get("headers", []):
+            if name == b"x-profile-token":
+                # Constant time, so the token cannot be guessed byte by byte from response timings
+                return hmac.compare_digest(value, self.profile_token.encode())
+        return False
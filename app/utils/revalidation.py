@@ -0,0 +1,42 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+
+from .dates import to_utc
+
+# (article younger than, recheck at most every); older articles are left alone
+REVALIDATION_SCHEDULE = (
+    (timedelta(days=1), timedelta(hours=1)),
+    (timedelta(days=7), timedelta(hours=6)),
+    (timedelta(days=30), timedelta(days=1)),
+)
+
+
+def content_fingerprint(title: Optional[str], content: Optional[str]) -> str:
+    """Hash of the text a reader sees, insensitive to whitespace-only changes"""
+    text = " ".join(f"{title or ''}\n{content or ''}".split())
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _as_datetime(value: Union[datetime, str, None]) -> Optional[datetime]:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return to_utc(value) if isinstance(value, datetime) else None
+
+
+def revalidation_due(published: Union[datetime, str, None], last_checked: Union[datetime, str, None],
+                     now: Optional[datetime] = None) -> bool:
+    """Whether an article of this age is due another look since last_checked"""
+    now = now or datetime.now(timezone.utc)
+    published = _as_datetime(published)
+    if published is None:
+        return False
+    age = now - published
+    for younger_than, every in REVALIDATION_SCHEDULE:
+        if age < younger_than:
+            last_checked = _as_datetime(last_checked)
+            return last_checked is None or now - last_checked >= every
+    return False
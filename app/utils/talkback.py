@@ -1,3 +1,8 @@
+"""Standalone talkback.sh scraper.
+
+Run it from the repository root as `python -m app.utils.talkback`; it imports
+helpers from the app package, so `python app/utils/talkback.py` cannot find them.
+"""
 import os
 import csv
 import json
@@ -19,6 +24,8 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from app.utils.logging_setup import setup_logging
+from app.utils.revalidation import content_fingerprint
 
 # Initialize colorama
 init(autoreset=True)
@@ -34,19 +41,16 @@ class ColoredFormatter(logging.Formatter):
         'CRITICAL': Fore.RED + Back.WHITE
     }
 
+    # Emoji indicators
+    LEVEL_EMOJI = {
+        'DEBUG': '🔍',
+        'INFO': '✨',
+        'WARNING': '⚠️',
+        'ERROR': '❌',
+        'CRITICAL': '🚨'
+    }
+
     def format(self, record):
-        # Color the entire line based on log level
-        color = self.COLORS.get(record.levelname, Fore.WHITE)
-        
-        # Add emoji indicators
-        level_emoji = {
-            'DEBUG': '🔍',
-            'INFO': '✨',
-            'WARNING': '⚠️',
-            'ERROR': '❌',
-            'CRITICAL': '🚨'
-        }
-        
         # Special coloring for specific message types
         message = record.getMessage()
         if "Saved" in message:
@@ -59,26 +63,18 @@ class ColoredFormatter(logging.Formatter):
             message = f"{Fore.CYAN}⚙️ {message}{Style.RESET_ALL}"
         
         # Format timestamp
-        timestamp = datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S')
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.created))
         
         # Construct the log line
-        log_line = f"{Fore.WHITE}{timestamp}{Style.RESET_ALL} - {level_emoji.get(record.levelname, '•')} {message}"
+        log_line = f"{Fore.WHITE}{timestamp}{Style.RESET_ALL} - {self.LEVEL_EMOJI.get(record.levelname, '•')} {message}"
         
         return log_line
 
-# Configure logging with custom formatter
+# Colored console plus a rotating JSON-lines file, both written off the scraping thread
+setup_logging(log_file='scraper.log', console=True, console_formatter=ColoredFormatter())
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-# Console handler with custom formatter
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(ColoredFormatter())
-logger.addHandler(console_handler)
-
-# File handler for keeping a log file
-file_handler = logging.FileHandler('scraper.log')
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
+# Per-article messages, sampled by the logging pipeline
+ROUTINE = {'source': 'talkback', 'routine': True}
 
 # Configuration
 TEST_MODE = True
@@ -122,23 +118,23 @@ class ArticleTracker:
 
 def clean_html(text: str) -> str:
     """Remove HTML tags from text using regex."""
-    logger.debug(f"Cleaning HTML from text: {text[:50]}...")
+    logger.debug("Cleaning HTML from text: %.50s...", text)
     cleaned = re.sub(r'<[^>]+>', '', text)
     return cleaned
 
 def truncate_text(text: str, length: int = 100) -> str:
     """Create a snippet by truncating text."""
     if len(text) > length:
-        logger.debug(f"Truncating text from {len(text)} characters to {length}")
+        logger.debug("Truncating text from %d characters to %d", len(text), length)
         return text[:length] + '...'
     return text
 
 def extract_domain_without_tld(url: str) -> str:
     """Extract domain name without TLD from URL."""
-    logger.debug(f"Extracting domain from URL: {url}")
+    logger.debug("Extracting domain from URL: %s", url)
     match = re.search(r'://(?:www\.)?([\w-]+)\.', url)
     result = match.group(1) if match else url
-    logger.debug(f"Extracted domain: {result}")
+    logger.debug("Extracted domain: %s", result)
     return result
 
 def parse_article(card_element, tracker: ArticleTracker) -> Article | None:
@@ -148,22 +144,22 @@ def parse_article(card_element, tracker: ArticleTracker) -> Article | None:
         source_url = link.get('href', '')
         
         if tracker.is_processed(source_url):
-            logger.info(f"Skipping duplicate article: {source_url}")
+            logger.info("Skipping duplicate article: %s", source_url, extra=ROUTINE)
             return None
         
-        logger.info(f"Parsing new article: {source_url}")
+        logger.info("Parsing new article: %s", source_url, extra=ROUTINE)
         
         title_div = link.find('div', {'class': 'card-title'}).find('div')
         title = title_div.get_text(strip=True)
-        logger.debug(f"Extracted title: {title}")
+        logger.debug("Extracted title: %s", title)
         
         content_span = link.find('span', class_='text-body-secondary')
         content = clean_html(content_span.get_text(strip=True)) if content_span else ''
-        logger.debug(f"Extracted content: {content[:50]}...")
+        logger.debug("Extracted content: %.50s...", content)
         
         category_span = link.find('span', class_='badge')
         category = category_span.get('title', '') if category_span else 'Uncategorized'
-        logger.debug(f"Extracted category: {category}")
+        logger.debug("Extracted category: %s", category)
         
         footer = link.find('div', class_='card-footer')
         date_text = footer.find('span', class_='text-secondary').get_text(strip=True)
@@ -181,7 +177,7 @@ def parse_article(card_element, tracker: ArticleTracker) -> Article | None:
             # Format date as ISO string
             date = parsed_date.strftime("%Y-%m-%d")
         except ValueError as e:
-            logger.error(f"Error parsing date {date_text}: {str(e)}")
+            logger.error("Error parsing date %s: %s", date_text, e)
             date = None
             
         source = footer.find('span', class_='text-primary').get_text(strip=True)
@@ -205,11 +201,11 @@ def parse_article(card_element, tracker: ArticleTracker) -> Article | None:
         )
         
         tracker.mark_processed(source_url)
-        logger.info(f"Successfully parsed article: {title}")
+        logger.info("Successfully parsed article: %s", title, extra=ROUTINE)
         return article
     
     except Exception as e:
-        logger.error(f"Error parsing article: {str(e)}")
+        logger.error("Error parsing article: %s", e)
         return None
 
 def save_article_to_csv(article: Article, is_first: bool = False):
@@ -221,9 +217,9 @@ def save_article_to_csv(article: Article, is_first: bool = False):
             if is_first:
                 writer.writeheader()
             writer.writerow(article)
-        logger.info(f"Saved article to CSV: {article['title']}")
+        logger.info("Saved article to CSV: %s", article['title'], extra=ROUTINE)
     except Exception as e:
-        logger.error(f"Error saving to CSV: {str(e)}")
+        logger.error("Error saving to CSV: %s", e)
 
 class MongoDBHandler:
     def __init__(self):
@@ -241,19 +237,30 @@ class MongoDBHandler:
         self.collection.create_index("sourceUrl", unique=True)
         
     def save_article(self, article: Article):
-        """Save a single article to MongoDB with upsert."""
+        """Save a single article to MongoDB with upsert, skipping the write when nothing changed."""
+        content_hash = content_fingerprint(article['title'], article['content'])
+        # id and sentiment are generated afresh on every run; keep the first ones
+        generated = {key: article[key] for key in ('id', 'sentiment', 'sentimentScore')}
+        fields = {key: value for key, value in article.items() if key not in generated}
         try:
+            # A point lookup on the unique sourceUrl index, fetching only the stored
+            # hash, is cheaper than a no-op write
+            existing = self.collection.find_one({"sourceUrl": article["sourceUrl"]},
+                                                {"_id": 0, "content_hash": 1})
+            if existing and existing.get("content_hash") == content_hash:
+                logger.info("Unchanged article in MongoDB: %s", article['title'], extra=ROUTINE)
+                return
             result = self.collection.update_one(
                 {"sourceUrl": article["sourceUrl"]},
-                {"$set": article},
+                {"$set": {**fields, "content_hash": content_hash}, "$setOnInsert": generated},
                 upsert=True
             )
             if result.upserted_id:
-                logger.info(f"Inserted new article to MongoDB: {article['title']}")
+                logger.info("Inserted new article to MongoDB: %s", article['title'], extra=ROUTINE)
             else:
-                logger.info(f"Updated existing article in MongoDB: {article['title']}")
+                logger.info("Updated existing article in MongoDB: %s", article['title'], extra=ROUTINE)
         except Exception as e:
-            logger.error(f"Error saving to MongoDB: {str(e)}")
+            logger.error("Error saving to MongoDB: %s", e)
 
 
 class Article(TypedDict):
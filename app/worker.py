@@ -0,0 +1,140 @@
+"""Standalone scraper worker: `python -m app.worker`.
+
+Run as many copies as you like. In the default "leader" mode a lease in the
+database (or a file lock in CSV mode) makes sure only one of them scrapes at a
+time, and another takes over once the holder stops renewing it. With
+"scraper_mode": "sharded" every worker crawls its own share of the sources.
+
+Scraper metrics are recorded in this process, so with "metrics_port" set the
+worker serves them on http://<host>:<metrics_port>/metrics itself.
+"""
+import os
+import json
+import uuid
+import socket
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from aiohttp import web
+
+from .database.base import DatabaseHandler
+from .database.factory import create_db_handler
+from .scrapers.news_scraper import NewsScraper
+from .scrapers.coordinator import ShardCoordinator
+from .utils.logging_setup import setup_from_config
+from .utils.metrics import REGISTRY, CONTENT_TYPE
+
+LEASE_NAME = "scraper-leader"
+
+logger = logging.getLogger(__name__)
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+async def _keep_lease(db_handler: DatabaseHandler, owner: str, ttl: float,
+                      task: asyncio.Task, lost: asyncio.Event):
+    """Renew the lease while a scrape runs; set `lost` and cancel the scrape if it is lost"""
+    while not task.done():
+        await asyncio.sleep(ttl / 3)
+        if not await db_handler.acquire_lease(LEASE_NAME, owner, ttl):
+            logger.error("Worker %s lost the scraper lease, stopping this cycle", owner)
+            lost.set()
+            task.cancel()
+            return
+
+
+async def run_worker(scraper: NewsScraper, db_handler: DatabaseHandler, app_config: Dict):
+    if app_config.get('scraper_mode', 'leader') == 'sharded':
+        coordinator = ShardCoordinator(
+            scraper, db_handler, worker_id(),
+            interval_seconds=app_config['scraping_interval_minutes'] * 60,
+            heartbeat_ttl=app_config.get('lease_ttl_seconds', 120)
+        )
+        await coordinator.run()
+    else:
+        await run_leader(scraper, db_handler, app_config)
+
+
+async def run_leader(scraper: NewsScraper, db_handler: DatabaseHandler, app_config: Dict):
+    owner = worker_id()
+    interval = app_config['scraping_interval_minutes'] * 60
+    ttl = app_config.get('lease_ttl_seconds', 120)
+    loop = asyncio.get_running_loop()
+    next_run = loop.time()
+    leader = False
+    logger.info("Scraper worker %s started", owner)
+
+    while True:
+        try:
+            is_leader = await db_handler.acquire_lease(LEASE_NAME, owner, ttl)
+            if is_leader != leader:
+                logger.info("Worker %s %s the scraper leader", owner, 'is now' if is_leader else 'is no longer')
+                leader = is_leader
+
+            if leader and loop.time() >= next_run:
+                scrape = asyncio.create_task(scraper.run_scraper())
+                lost = asyncio.Event()
+                keeper = asyncio.create_task(_keep_lease(db_handler, owner, ttl, scrape, lost))
+                try:
+                    await scrape
+                except asyncio.CancelledError:
+                    # Cancelling this worker cancels the scrape too, so only a
+                    # lost lease with no shutdown pending carries on as follower
+                    if not lost.is_set() or asyncio.current_task().cancelling():
+                        raise
+                finally:
+                    keeper.cancel()
+                next_run = loop.time() + interval
+
+            # Followers poll at the same pace the leader renews
+            await asyncio.sleep(ttl / 3)
+        except asyncio.CancelledError:
+            if leader:
+                await db_handler.release_lease(LEASE_NAME, owner)
+            raise
+        except Exception as e:
+            logger.error("Error in scraper worker: %s", e)
+            await asyncio.sleep(60)  # Wait a minute before retrying
+
+
+async def _metrics(request: web.Request) -> web.Response:
+    return web.Response(body=REGISTRY.render().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
+
+
+async def serve_metrics(port: int, host: str = "0.0.0.0") -> Optional[web.AppRunner]:
+    """Expose GET /metrics on its own port; None if the port is taken"""
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        # Another replica on the same host already has it; scrape that one instead
+        logger.warning("Metrics port %s unavailable, not serving /metrics: %s", port, e)
+        await runner.cleanup()
+        return None
+    logger.info("Serving worker metrics on %s:%s/metrics", host, port)
+    return runner
+
+
+async def main():
+    with open('config/app_config.json', 'r') as f:
+        app_config = json.load(f)
+    setup_from_config(app_config)
+    db_handler = create_db_handler(app_config)
+    await db_handler.setup()
+    scraper = NewsScraper('config/scraper_config.json', db_handler)
+    metrics = await serve_metrics(app_config['metrics_port']) if app_config.get('metrics_port') else None
+    try:
+        await run_worker(scraper, db_handler, app_config)
+    finally:
+        if metrics:
+            await metrics.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
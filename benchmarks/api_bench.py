@@ -0,0 +1,199 @@
+"""In-process API load benchmark over a synthetic corpus.
+
+    python -m benchmarks.api_bench --sizes 1000 10000 --concurrency 16 --requests 300
+    python -m benchmarks.api_bench --backend sqlite
+    python -m benchmarks.api_bench --backend mongo --mongodb-uri mongodb://localhost:27017
+    MONGODB_URL=mongodb://localhost:27017 python -m benchmarks.api_bench --backend legacy
+
+mongo and legacy need a running mongod; each run creates and drops a scratch database.
+Every backend and corpus size runs in its own subprocess so peak RSS is per run.
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI
+
+from app.api.routes import init_routes
+from app.database.csv_handler import CSVHandler
+from app.database.mongodb_handler import MongoDBHandler
+from app.database.sqlite_handler import SQLiteHandler
+from app.utils.dates import format_iso
+from benchmarks.common import peak_rss_mb, percentile, print_table, run_in_subprocess
+from benchmarks.corpus import SEARCH_TERMS, generate_corpus
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--backend", choices=["csv", "sqlite", "mongo", "legacy"], action="append",
+                        help="csv/sqlite/mongo drive /api/v1 routes; legacy drives app/main.py (repeatable, default csv)")
+    parser.add_argument("--mongodb-uri", default="mongodb://localhost:27017",
+                        help="Running mongod used by the mongo and legacy backends")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=300, help="Requests per endpoint")
+    return parser.parse_args()
+
+
+class CSVTarget:
+    prefix = "/api/v1"
+
+    async def load(self, corpus):
+        path = os.path.join(tempfile.mkdtemp(prefix="api-bench-"), "articles.csv")
+        self.handler = CSVHandler(path)
+        rows = [{**a, 'date': format_iso(a['date'])} for a in corpus]
+        # One bulk write; save_article would rewrite the file per article
+        self.handler._write_csv(rows)
+        self.ids = [row['id'] for row in rows]
+        self.app = FastAPI()
+        self.app.include_router(init_routes(self.handler), prefix=self.prefix)
+
+    async def cleanup(self):
+        os.remove(self.handler.csv_path)
+
+
+class SQLiteTarget:
+    prefix = "/api/v1"
+
+    async def load(self, corpus):
+        self.directory = tempfile.mkdtemp(prefix="api-bench-")
+        self.handler = SQLiteHandler(os.path.join(self.directory, "articles.db"))
+        # save_article keeps the FTS table, bands and facet counts in step
+        self.ids = [
+            await self.handler.save_article({**a, 'source_website': a['source'], 'published_date': a['date']})
+            for a in corpus
+        ]
+        self.app = FastAPI()
+        self.app.include_router(init_routes(self.handler), prefix=self.prefix)
+
+    async def cleanup(self):
+        shutil.rmtree(self.directory)
+
+
+class MongoTarget:
+    prefix = "/api/v1"
+
+    def __init__(self, uri: str):
+        self.uri = uri
+
+    async def load(self, corpus):
+        self.database = f"bench_{uuid.uuid4().hex[:8]}"
+        self.handler = MongoDBHandler(self.uri, self.database)
+        await self.handler.setup()
+        result = await self.handler.collection.insert_many(corpus)
+        # MongoDBHandler.get_article looks articles up by _id
+        self.ids = [str(i) for i in result.inserted_ids]
+        self.app = FastAPI()
+        self.app.include_router(init_routes(self.handler), prefix=self.prefix)
+
+    async def cleanup(self):
+        await self.handler.client.drop_database(self.database)
+
+
+class LegacyTarget:
+    """app/main.py, pointed at a scratch database instead of security_news"""
+    prefix = ""
+
+    async def load(self, corpus):
+        import app.main as legacy
+        self.legacy = legacy
+        self.database = f"bench_{uuid.uuid4().hex[:8]}"
+        legacy.collection = legacy.client[self.database]['articles']
+        legacy.collection.create_index("id")
+        legacy.collection.create_index([("date", -1)])
+        legacy.collection.insert_many(corpus)
+        self.ids = [a['id'] for a in corpus]
+        self.app = legacy.app
+
+    async def cleanup(self):
+        self.legacy.client.drop_database(self.database)
+
+
+def endpoint_requests(target, rng: random.Random, size: int):
+    prefix = target.prefix
+    search_param = "q" if prefix else "query"
+    return {
+        "list": lambda: f"{prefix}/articles?skip={rng.randrange(max(size - 10, 1))}&limit=10",
+        "get": lambda: f"{prefix}/articles/{rng.choice(target.ids)}",
+        "search": lambda: f"{prefix}/articles/search?{search_param}={rng.choice(SEARCH_TERMS)}",
+    }
+
+
+async def drive(client: httpx.AsyncClient, make_url, total: int, concurrency: int):
+    latencies = []
+    remaining = [total]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            url = make_url()
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 500:
+                raise RuntimeError(f"{url} -> {response.status_code}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+async def run(name: str, size: int, args) -> list:
+    target = make_target(name, args)
+    corpus = list(generate_corpus(size))
+    load_start = time.perf_counter()
+    await target.load(corpus)
+    load_seconds = time.perf_counter() - load_start
+    del corpus
+
+    rows = []
+    rng = random.Random(size)
+    transport = httpx.ASGITransport(app=target.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for endpoint, make_url in endpoint_requests(target, rng, size).items():
+                latencies, elapsed = await drive(client, make_url, args.requests, args.concurrency)
+                rows.append([
+                    name, size, endpoint,
+                    f"{len(latencies) / elapsed:.1f}",
+                    f"{percentile(latencies, 50) * 1000:.2f}",
+                    f"{percentile(latencies, 95) * 1000:.2f}",
+                    f"{percentile(latencies, 99) * 1000:.2f}",
+                    f"{load_seconds:.1f}",
+                    f"{peak_rss_mb():.0f}",
+                ])
+    finally:
+        await target.cleanup()
+    return rows
+
+
+def make_target(name: str, args):
+    targets = {
+        "csv": CSVTarget,
+        "sqlite": SQLiteTarget,
+        "mongo": lambda: MongoTarget(args.mongodb_uri),
+        "legacy": LegacyTarget,
+    }
+    return targets[name]()
+
+
+def main():
+    args = parse_args()
+    rows = []
+    for name in args.backend or ["csv"]:
+        for size in args.sizes:
+            rows.extend(run_in_subprocess(run, name, size, args))
+
+    print(f"concurrency={args.concurrency}, {args.requests} requests per endpoint")
+    print_table(rows, ["backend", "corpus", "endpoint", "req/s", "p50 ms", "p95 ms",
+                       "p99 ms", "load s", "peak RSS MB"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Synthetic article corpus shaped like what the scrapers store"""
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator
+
+from benchmarks.fake_news_farm import WORDS
+
+SOURCES = [
+    "bleepingcomputer", "thehackernews", "krebsonsecurity", "securityweek",
+    "therecord", "securityaffairs", "helpnetsecurity", "darkreading",
+]
+CATEGORIES = ["Security News", "Vulnerabilities", "Malware", "Data Breach", "Policy"]
+SENTIMENTS = ["Positive", "Neutral", "Negative"]
+SEARCH_TERMS = ["ransomware", "exploit", "breach", "phishing", "botnet", "zero-day"]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate_corpus(size: int, seed: int = 7, start: datetime = None) -> Iterator[Dict]:
+    """Yield stored-article dicts; content length is log-normal around ~4 KB"""
+    rng = random.Random(seed)
+    start = start or datetime(2024, 12, 1, tzinfo=timezone.utc)
+    for number in range(size):
+        content = _text(rng, max(int(rng.lognormvariate(6.4, 0.5)), 50))
+        source = rng.choice(SOURCES)
+        url = f"https://{source}.example/{number}"
+        yield {
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'title': _text(rng, rng.randint(6, 14)).capitalize(),
+            'content': content,
+            'snippet': content[:150] + "...",
+            'source': source,
+            'category': rng.choice(CATEGORIES),
+            'date': start - timedelta(minutes=17 * number),
+            'author': "Jane Analyst",
+            'sourceUrl': url,
+            'sentiment': rng.choice(SENTIMENTS),
+            'sentimentScore': round(rng.uniform(-1, 1), 2),
+            'url': url,
+            'story_id': uuid.UUID(int=rng.getrandbits(128)).hex,
+            'is_duplicate': False,
+        }
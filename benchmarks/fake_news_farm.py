@@ -0,0 +1,174 @@
+"""Local HTTP server serving synthetic news sites that match scraper_config.json selectors and feeds"""
+import asyncio
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+from typing import Dict, Optional
+
+from aiohttp import web
+
+WORDS = (
+    "ransomware vulnerability patch exploit attackers researchers malware botnet "
+    "phishing credentials breach zero-day firmware backdoor espionage campaign "
+    "threat actor advisory mitigation disclosure vendor critical remote code "
+    "execution privilege escalation supply chain cloud identity endpoint"
+).split()
+
+_COMPOUND_RE = re.compile(r"^([a-zA-Z0-9]*)((?:[.#][\w-]+)*)$")
+
+
+def render_selector(selector: str, inner: str = "", attrs: str = "") -> str:
+    """Build markup that a CSS selector like 'h4.article_title a' will match"""
+    html = inner
+    parts = selector.split()
+    for depth, part in enumerate(reversed(parts)):
+        match = _COMPOUND_RE.match(part)
+        if not match:
+            raise ValueError(f"Unsupported selector for the fake farm: {selector}")
+        tag = match.group(1) or "div"
+        classes = re.findall(r"\.([\w-]+)", match.group(2))
+        ids = re.findall(r"#([\w-]+)", match.group(2))
+        tag_attrs = []
+        if classes:
+            tag_attrs.append(f'class="{" ".join(classes)}"')
+        if ids:
+            tag_attrs.append(f'id="{ids[0]}"')
+        if depth == 0 and attrs:
+            tag_attrs.append(attrs)
+        open_tag = " ".join([tag] + tag_attrs)
+        html = f"<{open_tag}>{html}</{tag}>"
+    return html
+
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+class FakeNewsFarm:
+    """Serves /<site>/ listing pages, /<site>/feed.xml RSS and /<site>/article/<n> article pages"""
+
+    def __init__(self, scraper_config: Dict, articles_per_source: int = 20,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 page_kb: int = 64, error_rate: float = 0.0, seed: int = 1):
+        self.scraper_config = scraper_config
+        self.articles_per_source = articles_per_source
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.page_kb = page_kb
+        self.error_rate = error_rate
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # url -> perf_counter() when the article page was served
+        self.served_at: Dict[str, float] = {}
+        self.requests = 0
+        self.errors = 0
+        self.base_url = ""
+        self._runner: Optional[web.AppRunner] = None
+
+    def site_config(self) -> Dict:
+        """The scraper config with every base_url and feed_url pointed at this farm"""
+        sites = {}
+        for name, config in self.scraper_config.items():
+            sites[name] = {**config, 'base_url': f"{self.base_url}/{name}/"}
+            if config.get('feed_url'):
+                sites[name]['feed_url'] = f"{self.base_url}/{name}/feed.xml"
+        return sites
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        app = web.Application()
+        app.router.add_get("/{site}/", self._listing)
+        app.router.add_get("/{site}/feed.xml", self._feed)
+        app.router.add_get("/{site}/article/{number}", self._article)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{bound_port}"
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _delay_or_fail(self):
+        self.requests += 1
+        if self.latency_ms or self.jitter_ms:
+            delay = self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+            await asyncio.sleep(max(delay, 0) / 1000)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise web.HTTPInternalServerError()
+
+    async def _listing(self, request: web.Request) -> web.Response:
+        site = request.match_info["site"]
+        config = self.scraper_config.get(site)
+        if not config:
+            raise web.HTTPNotFound()
+        await self._delay_or_fail()
+        selectors = config["selectors"]
+        items = []
+        for number in range(self.articles_per_source):
+            url = f"{self.base_url}/{site}/article/{number}"
+            link = render_selector(selectors["article_link"], f"Headline {site} {number}",
+                                   attrs=f'href="{url}"')
+            items.append(render_selector(selectors["article_list"], link))
+        return web.Response(text=self._page("".join(items)), content_type="text/html")
+
+    async def _feed(self, request: web.Request) -> web.Response:
+        site = request.match_info["site"]
+        if not self.scraper_config.get(site, {}).get('feed_url'):
+            raise web.HTTPNotFound()
+        await self._delay_or_fail()
+        # Content only depends on the site and article count, so it makes a stable validator
+        etag = f'"{site}-{self.articles_per_source}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        items = []
+        for number in range(self.articles_per_source):
+            published = datetime(2024, 11, 15, tzinfo=timezone.utc) - timedelta(hours=number)
+            items.append(
+                f"<item><title>{escape(f'Headline {site} {number}')}</title>"
+                f"<link>{self.base_url}/{site}/article/{number}</link>"
+                f"<pubDate>{format_datetime(published)}</pubDate>"
+                f"<dc:creator>Jane Analyst</dc:creator><category>Vulnerabilities</category></item>"
+            )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f"<channel><title>{site}</title>{''.join(items)}</channel></rss>"
+        )
+        return web.Response(text=body, content_type="application/rss+xml", headers={"ETag": etag})
+
+    async def _article(self, request: web.Request) -> web.Response:
+        site = request.match_info["site"]
+        number = int(request.match_info["number"])
+        config = self.scraper_config.get(site)
+        if not config or number >= self.articles_per_source:
+            raise web.HTTPNotFound()
+        await self._delay_or_fail()
+        selectors = config["selectors"]
+        rng = random.Random(f"{self.seed}:{site}:{number}")
+        published = datetime(2024, 11, 15, tzinfo=timezone.utc) - timedelta(hours=number)
+        paragraphs = "".join(
+            f"<p>{' '.join(_sentence(rng) for _ in range(5))}</p>"
+            for _ in range(max(self.page_kb // 2, 1))
+        )
+        body = "".join([
+            render_selector(selectors["title"], f"{site} story {number}: {_sentence(rng, 8)}"),
+            render_selector(selectors["date"], published.strftime("%B %d, %Y"),
+                            attrs=f'datetime="{published.isoformat()}"'),
+            render_selector(selectors["author"], "Jane Analyst"),
+            render_selector(selectors["category"], "Vulnerabilities"),
+            render_selector(selectors["content"], paragraphs),
+        ])
+        # Pad with inline script the way ad-heavy pages do
+        filler = max(self.page_kb * 1024 - len(body), 0)
+        body += f"<script>var ads = '{'x' * filler}';</script>"
+        self.served_at[str(request.url)] = time.perf_counter()
+        return web.Response(text=self._page(body), content_type="text/html")
+
+    def _page(self, body: str) -> str:
+        return f"<!DOCTYPE html><html><head><title>farm</title></head><body>{body}</body></html>"
@@ -0,0 +1,119 @@
+"""Check that every filter + sort the list endpoints accept is served by an index.
+
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --backend mongo --mongodb-uri mongodb://localhost:27017
+
+Each combination in app.database.queries.supported_queries() is planned with and
+without a date range and with duplicates in and out. Exits non-zero if any of
+them would scan the whole collection / table or sort matches in memory.
+tests/test_query_plans.py runs the same checks.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timezone
+
+from app.database.mongodb_handler import MongoDBHandler
+from app.database.queries import supported_queries
+from app.database.sqlite_handler import SQLiteHandler
+from benchmarks.common import print_table
+from benchmarks.corpus import generate_corpus
+
+SINCE = datetime(2024, 11, 1, tzinfo=timezone.utc)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["sqlite", "mongo"], action="append",
+                        help="Repeatable; defaults to sqlite")
+    parser.add_argument("--mongodb-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--articles", type=int, default=2000,
+                        help="Articles loaded first, so the planner sees realistic statistics")
+    return parser.parse_args()
+
+
+def variants():
+    for filters, sort_by, order in supported_queries():
+        for since in (None, SINCE):
+            for include_duplicates in (True, False):
+                yield filters, sort_by, order, since, include_duplicates
+
+
+def _stages(plan):
+    """Every stage name in a Mongo explain tree"""
+    yield plan.get('stage')
+    for child in [plan.get('inputStage')] + plan.get('inputStages', []):
+        if child:
+            yield from _stages(child)
+
+
+def sqlite_plan_ok(steps) -> bool:
+    # "SCAN articles USING INDEX ..." walks an index; a bare "SCAN articles" reads every
+    # row, and a temp b-tree means every match is sorted before the first is returned
+    scan = any(step.startswith("SCAN articles") and "USING" not in step for step in steps)
+    return not scan and not any("TEMP B-TREE" in step for step in steps)
+
+
+def mongo_plan_ok(stages) -> bool:
+    # SORT is the in-memory sort; SORT_MERGE merges index walks that are already in order
+    return "COLLSCAN" not in stages and "SORT" not in stages
+
+
+async def check_sqlite(corpus):
+    directory = tempfile.mkdtemp(prefix="query-plans-")
+    try:
+        handler = SQLiteHandler(os.path.join(directory, "articles.db"))
+        for a in corpus:
+            await handler.save_article({**a, 'source_website': a['source'], 'published_date': a['date']})
+        conn = handler._connection()
+        for filters, sort_by, order, since, include_duplicates in variants():
+            sql, params = handler._list_sql(0, 10, include_duplicates, since, None, filters, sort_by, order)
+            steps = [row['detail'] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            yield filters, sort_by, order, since, include_duplicates, "; ".join(steps), sqlite_plan_ok(steps)
+    finally:
+        shutil.rmtree(directory)
+
+
+async def check_mongo(corpus, uri: str):
+    database = f"plans_{uuid.uuid4().hex[:8]}"
+    handler = MongoDBHandler(uri, database)
+    try:
+        await handler.setup()
+        await handler.collection.insert_many(corpus)
+        for filters, sort_by, order, since, include_duplicates in variants():
+            cursor = handler._list_cursor(0, 10, include_duplicates, since, None, filters, sort_by, order)
+            plan = (await cursor.explain())['queryPlanner']['winningPlan']
+            plan = plan.get('queryPlan', plan)  # SBE wraps the classic plan
+            stages = list(_stages(plan))
+            yield filters, sort_by, order, since, include_duplicates, " <- ".join(stages), mongo_plan_ok(stages)
+    finally:
+        await handler.client.drop_database(database)
+
+
+async def main():
+    args = parse_args()
+    corpus = list(generate_corpus(args.articles))
+    checks = {
+        "sqlite": lambda: check_sqlite(corpus),
+        "mongo": lambda: check_mongo([dict(a) for a in corpus], args.mongodb_uri),
+    }
+    rows, failures = [], 0
+    for backend in args.backend or ["sqlite"]:
+        async for filters, sort_by, order, since, include_duplicates, plan, ok in checks[backend]():
+            failures += not ok
+            # The full matrix is long; show the plain variant of each query and every failure
+            if not ok or (since is None and include_duplicates):
+                described = ", ".join(f"{k}={'|'.join(v)}" for k, v in filters.items()) or "-"
+                rows.append([backend, described, f"{sort_by} {order}",
+                             "ok" if ok else "FAIL", plan])
+    print_table(rows, ["backend", "filters", "sort", "result", "plan"])
+    print(f"{failures} of the supported queries scan the whole collection or sort in memory")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""Offline crawl benchmark: run NewsScraper against a local fake news farm.
+
+    python -m benchmarks.scraper_bench --articles 20 --latency-ms 20 --page-kb 128
+    python -m benchmarks.scraper_bench --backend mongo --mongodb-uri mongodb://localhost:27017
+
+The mongo backend needs a running mongod; the run uses a scratch database and drops it.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import uuid
+
+from app.database.csv_handler import CSVHandler
+from app.database.mongodb_handler import MongoDBHandler
+from app.scrapers.news_scraper import NewsScraper
+from benchmarks.common import peak_rss_mb, percentile, print_table, run_in_subprocess
+from benchmarks.fake_news_farm import FakeNewsFarm
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default="config/scraper_config.json")
+    parser.add_argument("--sources", type=int, default=0, help="Limit to the first N sources (0 = all)")
+    parser.add_argument("--articles", type=int, default=20, help="Articles per source listing")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--page-kb", type=int, default=64, help="Approximate article page size")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--no-feeds", action="store_true",
+                        help="Ignore feed_url and discover links from HTML listings only")
+    parser.add_argument("--backend", choices=["csv", "mongo"], action="append",
+                        help="Backends to run (repeatable, default csv)")
+    parser.add_argument("--mongodb-uri", default="mongodb://localhost:27017",
+                        help="Running mongod for the mongo backend (not started for you)")
+    return parser.parse_args()
+
+
+def make_handler(backend: str, args, workdir: str):
+    if backend == "mongo":
+        database = f"bench_{uuid.uuid4().hex[:8]}"
+        return MongoDBHandler(args.mongodb_uri, database), database
+    return CSVHandler(os.path.join(workdir, "articles.csv")), None
+
+
+async def run_backend(backend: str, args, scraper_config) -> list:
+    farm = FakeNewsFarm(scraper_config, articles_per_source=args.articles,
+                        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        page_kb=args.page_kb, error_rate=args.error_rate)
+    await farm.start()
+    workdir = tempfile.mkdtemp(prefix="scraper-bench-")
+    handler, database = make_handler(backend, args, workdir)
+    await handler.setup()
+
+    latencies = []
+    save_article = handler.save_article
+
+    async def timed_save(article):
+        result = await save_article(article)
+        served = farm.served_at.get(article['url'])
+        if served is not None:
+            latencies.append(time.perf_counter() - served)
+        return result
+
+    handler.save_article = timed_save
+
+    config_path = os.path.join(workdir, "scraper_config.json")
+    with open(config_path, "w") as f:
+        json.dump(farm.site_config(), f)
+
+    try:
+        scraper = NewsScraper(config_path, handler)
+        start = time.perf_counter()
+        await scraper.run_scraper()
+        elapsed = time.perf_counter() - start
+    finally:
+        await farm.stop()
+        if database:
+            await handler.client.drop_database(database)
+
+    saved = len(latencies)
+    return [
+        backend,
+        saved,
+        f"{elapsed:.2f}",
+        f"{saved / elapsed:.1f}" if elapsed else "-",
+        f"{percentile(latencies, 50) * 1000:.1f}",
+        f"{percentile(latencies, 99) * 1000:.1f}",
+        f"{farm.errors}/{farm.requests}",
+        f"{peak_rss_mb():.1f}",
+    ]
+
+
+def main():
+    args = parse_args()
+    with open(args.config) as f:
+        scraper_config = json.load(f)
+    if args.sources:
+        scraper_config = dict(list(scraper_config.items())[:args.sources])
+    if args.no_feeds:
+        scraper_config = {
+            name: {k: v for k, v in config.items() if k != 'feed_url'}
+            for name, config in scraper_config.items()
+        }
+
+    rows = []
+    for backend in args.backend or ["csv"]:
+        rows.append(run_in_subprocess(run_backend, backend, args, scraper_config))
+
+    print(f"{len(scraper_config)} sources x {args.articles} articles, "
+          f"{args.page_kb} KB pages, {args.latency_ms} ms latency, {args.error_rate:.0%} errors, "
+          f"{'HTML listings only' if args.no_feeds else 'feeds where configured'}")
+    # Each backend runs in its own process; its peak RSS includes the in-process farm
+    print_table(rows, ["backend", "saved", "seconds", "articles/s",
+                       "p50 fetch->save ms", "p99 fetch->save ms", "errors", "peak RSS MB"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Memory and read throughput of CompactArticleStore against plain CSV row dicts.
+
+    python -m benchmarks.store_bench --sizes 10000 100000
+    python -m benchmarks.store_bench --sizes 50000 --with-content
+"""
+import argparse
+import csv
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from app.database.base import DEDUP_FIELDS
+from app.utils.article_store import CompactArticleStore
+from app.utils.dates import format_iso
+from benchmarks.common import print_table
+from benchmarks.corpus import SOURCES, generate_corpus
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--with-content", action="store_true",
+                        help="Keep full article bodies; by default only metadata is compared")
+    parser.add_argument("--requests", type=int, default=2000, help="List pages per measurement")
+    return parser.parse_args()
+
+
+def write_corpus(size: int, with_content: bool) -> str:
+    path = os.path.join(tempfile.mkdtemp(prefix="store-bench-"), "articles.csv")
+    rows = (
+        {**a, 'date': format_iso(a['date']), 'published_date': format_iso(a['date']),
+         'source_website': a['source'], 'content': a['content'] if with_content else ''}
+        for a in generate_corpus(size)
+    )
+    with open(path, 'w', newline='') as f:
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+    return path
+
+
+def measure_load(path: str, build):
+    """Time one load, then repeat it under tracemalloc, which would skew the timing"""
+    gc.collect()
+    start = time.perf_counter()
+    with open(path, 'r', newline='') as f:
+        build(csv.DictReader(f))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    with open(path, 'r', newline='') as f:
+        loaded = build(csv.DictReader(f))
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return loaded, elapsed, size
+
+
+def dict_page(rows, skip: int):
+    # What CSVHandler.get_articles did per request before the compact store
+    rows.sort(key=lambda a: a.get('date', ''), reverse=True)
+    return [{k: v for k, v in a.items() if k not in DEDUP_FIELDS} for a in rows[skip:skip + 10]]
+
+
+def store_page(store, skip: int):
+    return [store.materialize(row) for row in store.newest_first()[skip:skip + 10]]
+
+
+def dict_source_scan(rows, source: str):
+    return [{k: v for k, v in a.items() if k not in DEDUP_FIELDS} for a in rows if a['source'] == source]
+
+
+def store_source_scan(store, source: str):
+    return [store.materialize(row) for row in store.rows_where('source', source)]
+
+
+def timed(fn, arguments):
+    start = time.perf_counter()
+    for argument in arguments:
+        fn(argument)
+    return len(arguments) / (time.perf_counter() - start)
+
+
+def main():
+    args = parse_args()
+    table = []
+    for size in args.sizes:
+        path = write_corpus(size, args.with_content)
+        rng = random.Random(size)
+        skips = [rng.randrange(max(size - 10, 1)) for _ in range(args.requests)]
+        sources = [rng.choice(SOURCES) for _ in range(20)]
+
+        rows, dict_load, dict_bytes = measure_load(path, list)
+        dict_pages = timed(lambda skip: dict_page(rows, skip), skips[:max(args.requests // 20, 1)])
+        dict_scans = timed(lambda source: dict_source_scan(rows, source), sources)
+        start = time.perf_counter()
+        for row in rows:
+            {k: v for k, v in row.items() if k not in DEDUP_FIELDS}
+        dict_all = size / (time.perf_counter() - start)
+        del rows
+
+        def build(reader):
+            store = CompactArticleStore(skip_fields=DEDUP_FIELDS)
+            store.extend(reader)
+            return store
+        store, store_load, store_bytes = measure_load(path, build)
+        store_pages = timed(lambda skip: store_page(store, skip), skips)
+        store_scans = timed(lambda source: store_source_scan(store, source), sources)
+        start = time.perf_counter()
+        for row in range(size):
+            store.materialize(row)
+        store_all = size / (time.perf_counter() - start)
+        del store
+        os.remove(path)
+
+        for name, load, used, pages, scans, materialized in (
+            ("dicts", dict_load, dict_bytes, dict_pages, dict_scans, dict_all),
+            ("compact", store_load, store_bytes, store_pages, store_scans, store_all),
+        ):
+            table.append([
+                name, size, f"{used / 2 ** 20:.1f}", f"{used / size:.0f}", f"{load:.2f}",
+                f"{pages:.0f}", f"{scans:.1f}", f"{materialized:.0f}",
+            ])
+
+    print(f"content {'included' if args.with_content else 'blanked'}")
+    print_table(table, ["layout", "articles", "MB", "bytes/article", "load s",
+                        "pages/s", "source scans/s", "rows materialized/s"])
+
+
+if __name__ == "__main__":
+    main()
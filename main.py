@@ -1,24 +1,33 @@
 import json
 import asyncio
-import logging
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.scrapers.news_scraper import NewsScraper
 from app.api.routes import init_routes
-from app.database.mongodb_handler import MongoDBHandler
-from app.database.csv_handler import CSVHandler
+from app.api.warmup import WarmCache
+from app.database.factory import create_db_handler
+from app.utils.metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware
+from app.utils.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from app.utils.events import ArticleHub, tail_articles
+from app.utils.logging_setup import setup_from_config
+from app.worker import run_worker
 
 # Load configuration
 with open('config/app_config.json', 'r') as f:
     app_config = json.load(f)
 
+setup_from_config(app_config)
 # Initialize database handler based on environment
-if app_config['environment'] == 'development':
-    db_handler = CSVHandler(app_config['csv_path'])
-else:
-    db_handler = MongoDBHandler(
-        app_config['mongodb_uri'],
-        app_config['database_name']
-    )
+db_handler = create_db_handler(app_config)
+# Fan-out of new articles to /articles/stream subscribers
+hub = ArticleHub()
+# Front pages and top searches, pre-serialized at startup and after new data
+warm_cache = WarmCache(
+    db_handler,
+    list_pages=app_config.get('warm_list_pages', 3),
+    top_searches=app_config.get('warm_top_searches', 5),
+    ttl_seconds=app_config.get('warm_ttl_seconds', 300)
+)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -27,26 +36,32 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# Initialize routes
-app.include_router(init_routes(db_handler), prefix="/api/v1")
+app.add_middleware(MetricsMiddleware)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
 
-# Initialize scraper
-scraper = NewsScraper('config/scraper_config.json', db_handler)
+# Initialize routes
+app.include_router(init_routes(db_handler, hub, warm_cache), prefix="/api/v1")
 
-# Schedule scraping task
-async def schedule_scraping():
-    while True:
-        try:
-            await scraper.run_scraper()
-            await asyncio.sleep(app_config['scraping_interval_minutes'] * 60)
-        except Exception as e:
-            logging.error(f"Error in scheduled scraping: {str(e)}")
-            await asyncio.sleep(60)  # Wait a minute before retrying
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
 
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(schedule_scraping())
+    await db_handler.setup()
+    await warm_cache.warm()
+    # Scraping normally runs in `python -m app.worker`; embedding it still goes
+    # through the leader lease, so extra API workers never multiply the crawl
+    if app_config.get('embedded_scraper', False):
+        scraper = NewsScraper('config/scraper_config.json', db_handler, hub=hub,
+                              on_run_complete=warm_cache.warm)
+        asyncio.create_task(run_worker(scraper, db_handler, app_config))
+    else:
+        # The worker saves in another process; pick its articles up from the store
+        asyncio.create_task(tail_articles(db_handler, hub, app_config.get('event_poll_seconds', 5),
+                                          on_new=warm_cache.warm))
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
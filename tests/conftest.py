@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.routes import init_routes
+from app.database.csv_handler import CSVHandler
+from app.database.sqlite_handler import SQLiteHandler
+
+BACKENDS = ["csv", "sqlite", "mongo"]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_mongo_handler():
+    """MongoDBHandler over mongomock-motor; skipped when it is not installed"""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    import app.database.mongodb_handler as mongodb_handler
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    original = mongodb_handler.AsyncIOMotorClient
+    mongodb_handler.AsyncIOMotorClient = lambda *args, **kwargs: client
+    try:
+        handler = mongodb_handler.MongoDBHandler("mongodb://mock", "test")
+    finally:
+        mongodb_handler.AsyncIOMotorClient = original
+
+    # mongomock-motor has no bulk_write; replay the upserts one by one
+    async def bulk_write(requests, ordered=True):
+        for request in requests:
+            await handler.stats.update_one(request._filter, request._doc, upsert=request._upsert)
+    handler.stats.bulk_write = bulk_write
+    return handler
+
+
+def make_handler(backend: str, path, **kwargs):
+    if backend == "csv":
+        return CSVHandler(str(path / "articles.csv"), **kwargs)
+    if backend == "sqlite":
+        return SQLiteHandler(str(path / "articles.db"), **kwargs)
+    handler = make_mongo_handler()
+    handler.compress_content = kwargs.get("compress_content", False)
+    if kwargs.get("content_codec"):
+        handler.content_codec = kwargs["content_codec"]
+    return handler
+
+
+@pytest.fixture(params=BACKENDS)
+def handler(request, tmp_path):
+    db_handler = make_handler(request.param, tmp_path)
+    run(db_handler.setup())
+    return db_handler
+
+
+def api_client(db_handler, **kwargs) -> httpx.AsyncClient:
+    """An in-process client for the /api/v1 routes over db_handler"""
+    app = FastAPI()
+    app.include_router(init_routes(db_handler, **kwargs), prefix="/api/v1")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def scraped(number: int, title: str = None, content: str = None, **extra):
+    """An article dict as NewsScraper hands it to save_article"""
+    return {
+        'title': title or f"Article {number}",
+        'content': content or f"Body of article {number} " * 20,
+        'url': f"https://news.example/{number}",
+        'published_date': datetime(2024, 11, 1, 12, number % 60, tzinfo=timezone.utc),
+        'source_website': "example",
+        'author': "Unknown",
+        'category': "General",
+        **extra,
+    }
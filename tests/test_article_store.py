@@ -0,0 +1,26 @@
+from app.utils.article_store import CompactArticleStore
+
+
+def test_id_and_url_lookups_return_the_first_matching_row():
+    store = CompactArticleStore()
+    store.append({'title': 'no id yet'})
+    store.append({'id': 'a', 'url': 'https://news.example/1', 'title': 'first'})
+    store.append({'id': 'b', 'url': 'https://news.example/1', 'title': 'repost'})
+
+    assert store.index_of('id', 'a') == 1
+    assert store.index_of('id', 'b') == 2
+    assert store.index_of('url', 'https://news.example/1') == 1
+    assert store.index_of('id', 'missing') is None
+    # Rows from before the field appeared read back as ''
+    assert store.index_of('id', '') == 0
+    assert store.contains('url', 'https://news.example/1')
+    assert not store.contains('url', 'https://news.example/2')
+
+
+def test_unindexed_fields_still_match():
+    store = CompactArticleStore()
+    store.extend({'id': str(n), 'title': f"t{n % 3}"} for n in range(9))
+    assert store.index_of('title', 't2') == 2
+    assert store.contains('title', 't1')
+    assert store.rows_where('title', 't0') == [0, 3, 6]
+    assert store.index_of('nonexistent', 'x') is None
@@ -0,0 +1,57 @@
+from app.database.base import MAX_BATCH_IDS
+
+from .conftest import api_client, run, scraped
+
+# Well-formed for every backend, including Mongo ObjectIds, but never issued
+UNKNOWN_ID = "0" * 24
+
+
+def save(handler, count):
+    return [run(handler.save_article(scraped(n))) for n in range(count)]
+
+
+def titles(articles):
+    return [article['title'] if article else None for article in articles]
+
+
+def test_articles_come_back_in_request_order(handler):
+    ids = save(handler, 4)
+    wanted = [ids[2], ids[0], ids[3]]
+    assert titles(run(handler.get_articles_by_ids(wanted))) == ["Article 2", "Article 0", "Article 3"]
+
+
+def test_duplicate_ids_repeat_the_article(handler):
+    ids = save(handler, 2)
+    found = run(handler.get_articles_by_ids([ids[1], ids[0], ids[1]]))
+    assert titles(found) == ["Article 1", "Article 0", "Article 1"]
+
+
+def test_missing_ids_are_none(handler):
+    ids = save(handler, 2)
+    found = run(handler.get_articles_by_ids([UNKNOWN_ID, ids[1], "not-an-id"]))
+    assert titles(found) == [None, "Article 1", None]
+    assert run(handler.get_articles_by_ids([UNKNOWN_ID])) == [None]
+
+
+def test_batch_route(handler):
+    ids = save(handler, 3)
+
+    async def post(client, body):
+        return await client.post("/api/v1/articles/batch", json=body)
+
+    async def scenario():
+        async with api_client(handler) as client:
+            found = await post(client, {"ids": [ids[2], UNKNOWN_ID, ids[0], ids[2]]})
+            at_cap = await post(client, {"ids": [ids[0]] * MAX_BATCH_IDS})
+            over_cap = await post(client, {"ids": [ids[0]] * (MAX_BATCH_IDS + 1)})
+            empty = await post(client, {"ids": []})
+        return found, at_cap, over_cap, empty
+
+    found, at_cap, over_cap, empty = run(scenario())
+    assert found.status_code == 200
+    assert titles(found.json()['articles']) == ["Article 2", None, "Article 0", "Article 2"]
+    assert found.json()['missing'] == [UNKNOWN_ID]
+    assert at_cap.status_code == 200
+    assert len(at_cap.json()['articles']) == MAX_BATCH_IDS
+    assert over_cap.status_code == 422
+    assert empty.status_code == 422
@@ -0,0 +1,89 @@
+import base64
+
+import pytest
+
+from app.utils.compression import ContentCodec, DICTIONARY_SIZE, save_dictionary, train_dictionary
+
+from .conftest import BACKENDS, make_handler, run, scraped
+
+SAMPLES = [
+    f"Researchers disclosed a critical vulnerability in the widely used library, tracked as CVE-2024-{n:04d}. "
+    "Attackers could exploit the flaw to execute arbitrary code on affected systems. "
+    "Vendors have released patches and administrators are urged to update immediately."
+    for n in range(50)
+]
+
+
+def test_train_dictionary_is_deterministic_and_bounded():
+    dictionary = train_dictionary(SAMPLES)
+    assert dictionary == train_dictionary(SAMPLES)
+    assert 0 < len(dictionary) <= DICTIONARY_SIZE
+    assert train_dictionary(SAMPLES, size=64) and len(train_dictionary(SAMPLES, size=64)) <= 64
+
+
+def test_round_trip_without_dictionary():
+    codec = ContentCodec()
+    blob, tag = codec.compress(SAMPLES[0])
+    assert tag == "zlib"
+    assert codec.decompress(blob, tag) == SAMPLES[0]
+    assert codec.decompress(base64.b64encode(blob).decode('ascii'), tag) == SAMPLES[0]
+
+
+def test_round_trip_with_dictionary_is_smaller(tmp_path):
+    dict_id = save_dictionary(train_dictionary(SAMPLES), str(tmp_path))
+    codec = ContentCodec.load(str(tmp_path))
+    assert codec.current == dict_id
+    text = SAMPLES[7] + " Unicode survives: café, Привет, 漏洞."
+    blob, tag = codec.compress(text)
+    assert tag == f"zlib:{dict_id}"
+    assert codec.decompress(blob, tag) == text
+    assert len(blob) < len(ContentCodec().compress(text)[0])
+
+
+def test_old_dictionaries_stay_readable_after_retraining(tmp_path):
+    save_dictionary(train_dictionary(SAMPLES[:10]), str(tmp_path))
+    blob, tag = ContentCodec.load(str(tmp_path)).compress(SAMPLES[3])
+    save_dictionary(train_dictionary(SAMPLES[10:] + ["a different corpus entirely " * 5] * 3), str(tmp_path))
+    codec = ContentCodec.load(str(tmp_path))
+    assert codec.current != tag.partition(":")[2]
+    assert codec.decompress(blob, tag) == SAMPLES[3]
+
+
+def test_missing_dictionary_and_unknown_codec_raise():
+    blob, _ = ContentCodec().compress("text")
+    with pytest.raises(ValueError):
+        ContentCodec().decompress(blob, "zlib:0123456789ab")
+    with pytest.raises(ValueError):
+        ContentCodec().decompress(blob, "lz4")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_compressed_content_round_trips_through_backend(backend, tmp_path):
+    save_dictionary(train_dictionary(SAMPLES), str(tmp_path / "zdict"))
+    handler = make_handler(backend, tmp_path, compress_content=True,
+                           content_codec=ContentCodec.load(str(tmp_path / "zdict")))
+    run(handler.setup())
+    ids = [run(handler.save_article(scraped(n, content=SAMPLES[n]))) for n in range(5)]
+
+    for n, article_id in enumerate(ids):
+        article = run(handler.get_article(article_id))
+        assert article['content'] == SAMPLES[n]
+        assert 'content_z' not in article and 'content_codec' not in article
+    assert [a['content'] for a in run(handler.get_articles_by_ids(ids))] == SAMPLES[:5]
+    # Mongo's public `id` is not the _id save_article returns, so match on url
+    assert [a['url'] for a in run(handler.search_articles("CVE-2024-0003"))] == ["https://news.example/3"]
+
+    if backend != "mongo":
+        # A fresh handler over the same file decodes what the first one wrote
+        reopened = make_handler(backend, tmp_path, content_codec=ContentCodec.load(str(tmp_path / "zdict")))
+        run(reopened.setup())
+        assert run(reopened.get_article(ids[2]))['content'] == SAMPLES[2]
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_content_is_not_stored_as_plain_text(backend, tmp_path):
+    handler = make_handler(backend, tmp_path, compress_content=True)
+    run(handler.setup())
+    run(handler.save_article(scraped(1, content=SAMPLES[1])))
+    raw = b"".join(path.read_bytes() for path in tmp_path.iterdir() if path.is_file())
+    assert b"administrators are urged" not in raw
@@ -0,0 +1,102 @@
+import asyncio
+from collections import Counter
+
+from app.scrapers.coordinator import HashRing, ShardCoordinator
+
+from .conftest import run
+
+KEYS = [f"source-{n}" for n in range(2000)]
+SOURCES = {f"source-{n}": {"base_url": f"https://site{n}.example"} for n in range(24)}
+
+
+def owners(ring):
+    return {key: ring.owner(key) for key in KEYS}
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    before = owners(HashRing(["a", "b", "c"]))
+    after = owners(HashRing(["a", "b", "c", "d"]))
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert moved
+    assert all(after[key] == "d" for key in moved)
+    # Roughly its fair quarter; 64 vnodes keep the skew modest
+    assert len(KEYS) / 8 < len(moved) < len(KEYS) / 2.5
+
+
+def test_removing_a_node_only_moves_its_keys():
+    before = owners(HashRing(["a", "b", "c", "d"]))
+    after = owners(HashRing(["a", "b", "d"]))
+    moved = {key for key in KEYS if before[key] != after[key]}
+    assert moved == {key for key in KEYS if before[key] == "c"}
+    assert "c" not in after.values()
+
+
+def test_ring_is_stable_and_order_independent():
+    assert owners(HashRing(["a", "b", "c"])) == owners(HashRing(["c", "a", "b"]))
+    assert HashRing([]).owner("anything") is None
+    assert set(owners(HashRing(["solo"])).values()) == {"solo"}
+
+
+class RecordingScraper:
+    def __init__(self, crawls: Counter):
+        self.config = SOURCES
+        self.crawls = crawls
+
+    async def scrape_website(self, name, config):
+        self.crawls[name] += 1
+        # Yield so the other coordinator runs mid-crawl
+        await asyncio.sleep(0.01)
+
+    async def notify_run_complete(self):
+        pass
+
+
+def coordinators(handler, crawls):
+    return [ShardCoordinator(RecordingScraper(crawls), handler, node, interval_seconds=60, heartbeat_ttl=30)
+            for node in ("node-a", "node-b")]
+
+
+def test_shared_database_never_crawls_a_source_twice(handler):
+    async def scenario():
+        crawls = Counter()
+        first, second = coordinators(handler, crawls)
+        # The first node rebalances before the second joins, so it still
+        # believes it owns everything while the second takes its share
+        await first.heartbeat()
+        await first.rebalance()
+        assert first.owned == list(SOURCES)
+        await second.heartbeat()
+        await second.rebalance()
+        assert 0 < len(second.owned) < len(SOURCES)
+
+        await asyncio.gather(first.crawl_due_sources(), second.crawl_due_sources())
+        assert set(crawls) == set(SOURCES)
+        assert set(crawls.values()) == {1}
+        # After rebalancing mid-crawl, the nodes split the sources between them
+        assert not set(first.owned) & set(second.owned)
+        assert set(first.owned) | set(second.owned) == set(SOURCES)
+
+        # Leases last a full interval, so nothing is due again yet
+        await asyncio.gather(first.crawl_due_sources(), second.crawl_due_sources())
+        assert set(crawls.values()) == {1}
+
+    run(scenario())
+
+
+def test_running_coordinators_split_the_sources(handler):
+    async def scenario():
+        crawls = Counter()
+        nodes = coordinators(handler, crawls)
+        for node in nodes:
+            node.heartbeat_ttl = 0.15
+        tasks = [asyncio.create_task(node.run()) for node in nodes]
+        await asyncio.sleep(0.6)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert set(crawls) == set(SOURCES)
+        assert set(crawls.values()) == {1}
+        assert nodes[0].crawls and nodes[1].crawls
+        assert await handler.get_live_nodes() == []
+
+    run(scenario())
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.utils.dates import DateParser, format_iso, to_utc
+
+from .conftest import make_handler, run, scraped
+
+NOW = datetime(2024, 11, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def test_iso_and_rfc822_are_normalised_to_utc():
+    parser = DateParser()
+    assert parser.parse("2024-11-01T10:00:00+02:00") == datetime(2024, 11, 1, 8, 0, tzinfo=timezone.utc)
+    assert parser.parse("2024-11-01T10:00:00Z") == datetime(2024, 11, 1, 10, 0, tzinfo=timezone.utc)
+    assert parser.parse("Fri, 01 Nov 2024 10:00:00 -0500") == datetime(2024, 11, 1, 15, 0, tzinfo=timezone.utc)
+
+
+def test_display_formats_with_prefixes_and_ordinals():
+    parser = DateParser()
+    assert parser.parse("Published on: November 1st, 2024") == datetime(2024, 11, 1, tzinfo=timezone.utc)
+    assert parser.parse("  Nov  3,   2024 ") == datetime(2024, 11, 3, tzinfo=timezone.utc)
+
+
+def test_relative_dates():
+    parser = DateParser()
+    assert parser.parse("3 hours ago", now=NOW) == NOW - timedelta(hours=3)
+    assert parser.parse("an hour ago", now=NOW) == NOW - timedelta(hours=1)
+    assert parser.parse("yesterday", now=NOW) == NOW - timedelta(days=1)
+
+
+def test_slash_dates_need_a_hint():
+    parser = DateParser()
+    assert parser.parse("03/04/2024") is None
+    assert parser.parse("03/04/2024", hint="%d/%m/%Y") == datetime(2024, 4, 3, tzinfo=timezone.utc)
+    assert parser.parse("03/04/2024", hint="%m/%d/%Y") == datetime(2024, 3, 4, tzinfo=timezone.utc)
+
+
+def test_format_is_remembered_per_source():
+    parser = DateParser()
+    parser.parse("1 November 2024", source="site")
+    assert parser._format_cache["site"] == "%d %B %Y"
+    assert parser.parse("2 November 2024", source="site") == datetime(2024, 11, 2, tzinfo=timezone.utc)
+
+
+def test_unparseable_and_empty():
+    parser = DateParser()
+    assert parser.parse("") is None
+    assert parser.parse(None) is None
+    assert parser.parse("sometime soon") is None
+
+
+def test_format_iso_is_fixed_width_utc():
+    assert format_iso(datetime(2024, 1, 2, 3, 4, 5)) == "2024-01-02T03:04:05+00:00"
+    assert to_utc(datetime(2024, 1, 1, 1, tzinfo=timezone(timedelta(hours=1)))).hour == 0
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_parsed_dates_round_trip_through_storage(backend, tmp_path):
+    handler = make_handler(backend, tmp_path)
+    run(handler.setup())
+    parser = DateParser()
+    texts = ["Fri, 01 Nov 2024 10:00:00 -0500", "03/04/2024", "2 hours ago"]
+    parsed = [parser.parse(texts[0]), parser.parse(texts[1], hint="%d/%m/%Y"), parser.parse(texts[2], now=NOW)]
+    ids = [run(handler.save_article(scraped(n, published_date=value))) for n, value in enumerate(parsed)]
+    for article_id, value in zip(ids, parsed):
+        assert run(handler.get_article(article_id))['date'] == format_iso(value)
+    since = datetime(2024, 11, 1, tzinfo=timezone.utc)
+    assert {a['id'] for a in run(handler.get_articles(since=since))} == {ids[0], ids[2]}
@@ -0,0 +1,47 @@
+from app.utils.dedup import StoryDeduplicator, estimate_similarity, lsh_bands, minhash_signature
+
+from .conftest import run, scraped
+
+STORY = ("Attackers exploited a critical remote code execution flaw in a popular VPN appliance "
+         "to deploy ransomware across hospital networks, according to the vendor advisory published "
+         "on Tuesday, which urges administrators to patch immediately and rotate credentials.")
+
+
+def test_signature_is_deterministic_and_similarity_tracks_overlap():
+    assert minhash_signature(STORY) == minhash_signature(STORY)
+    near = estimate_similarity(minhash_signature(STORY), minhash_signature(STORY + " Update: patch now."))
+    far = estimate_similarity(minhash_signature(STORY), minhash_signature("Quarterly earnings beat estimates."))
+    assert near > 0.8
+    assert far < 0.2
+
+
+def test_identical_signatures_share_every_band():
+    bands = lsh_bands(minhash_signature(STORY))
+    assert bands == lsh_bands(minhash_signature(STORY))
+    assert len(set(bands)) == len(bands)
+
+
+async def _save(handler, deduplicator, article):
+    await deduplicator.assign_story(article)
+    return await handler.save_article(article)
+
+
+def test_assign_story_round_trip(handler):
+    deduplicator = StoryDeduplicator(handler)
+    first = scraped(1, title="VPN flaw exploited", content=STORY)
+    copy = scraped(2, title="VPN flaw exploited", content=STORY + " Updated with vendor comment.")
+    other = scraped(3, title="Earnings", content="Quarterly earnings beat analyst estimates. " * 10)
+
+    first_id = run(_save(handler, deduplicator, first))
+    run(_save(handler, deduplicator, copy))
+    run(_save(handler, deduplicator, other))
+
+    assert first['is_duplicate'] is False
+    assert copy['story_id'] == first['story_id'] and copy['is_duplicate'] is True
+    assert other['story_id'] != first['story_id'] and other['is_duplicate'] is False
+
+    story = run(handler.get_story(first['story_id']))
+    assert sorted(a['url'] for a in story) == [first['url'], copy['url']]
+    # The signature and band keys never leave the backend
+    assert all('minhash' not in a and 'lsh_bands' not in a for a in story)
+    assert 'minhash' not in run(handler.get_article(first_id))
@@ -0,0 +1,186 @@
+import asyncio
+from datetime import timedelta
+
+from bson import ObjectId
+
+from app.utils.events import ArticleHub, Subscription, tail_articles
+from .conftest import make_mongo_handler, run, scraped
+
+INTERVAL = 0.01
+
+
+async def tail_while(db_handler, action, hub=None):
+    """Run tail_articles around `action`; returns the titles it published"""
+    hub = hub or ArticleHub()
+    published = []
+    original = hub.publish
+    hub.publish = lambda article: published.append(article['title']) or original(article)
+    task = asyncio.create_task(tail_articles(db_handler, hub, INTERVAL))
+    try:
+        await asyncio.sleep(INTERVAL * 5)
+        await action()
+        await asyncio.sleep(INTERVAL * 10)
+    finally:
+        task.cancel()
+    return published
+
+
+def test_publishes_only_articles_saved_after_start(handler):
+    async def scenario():
+        await handler.save_article(scraped(1, title="before"))
+
+        async def save():
+            await handler.save_article(scraped(2, title="after 1"))
+            await handler.save_article(scraped(3, title="after 2"))
+        return await tail_while(handler, save)
+
+    assert run(scenario()) == ["after 1", "after 2"]
+
+
+def test_checkpoint_is_retried_when_the_database_is_down(handler):
+    calls = []
+    get_latest_checkpoint = handler.get_latest_checkpoint
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("not yet")
+        return await get_latest_checkpoint()
+    handler.get_latest_checkpoint = flaky
+
+    async def scenario():
+        await handler.save_article(scraped(1, title="old"))
+        return await tail_while(handler, lambda: handler.save_article(scraped(2, title="new")))
+
+    assert run(scenario()) == ["new"]
+    assert len(calls) == 2
+
+
+def test_mongo_insert_below_the_checkpoint_is_not_skipped():
+    handler = make_mongo_handler()
+
+    async def scenario():
+        await handler.setup()
+        await handler.save_article(scraped(1, title="seen"))
+
+        async def late_insert():
+            # Another node's clock runs 10s behind, so its _id sorts first
+            latest = ObjectId(await handler.get_latest_checkpoint())
+            await handler.save_article(scraped(2, title="ahead"))
+            behind = ObjectId.from_datetime(latest.generation_time - timedelta(seconds=10))
+            await handler.collection.insert_one({**scraped(3, title="behind"), '_id': behind,
+                                                 'date': scraped(3)['published_date']})
+        return await tail_while(handler, late_insert)
+
+    assert sorted(run(scenario())) == ["ahead", "behind"]
+
+
+def event(title, source="example", category="General", snippet=""):
+    return {'title': title, 'source': source, 'category': category, 'snippet': snippet}
+
+
+def drain(subscription):
+    items = []
+    while not subscription.queue.empty():
+        items.append(subscription.queue.get_nowait())
+    return items
+
+
+def titles(subscription):
+    return [item[1]['title'] for item in drain(subscription)]
+
+
+def test_subscription_filters():
+    assert Subscription().matches(event("anything"))
+    by_source = Subscription(source=["bbc", "cnn"])
+    assert by_source.matches(event("a", source="cnn"))
+    assert not by_source.matches(event("a", source="example"))
+    by_category = Subscription(category=["Tech"])
+    assert by_category.matches(event("a", category="Tech"))
+    assert not by_category.matches(event("a", category="Sport"))
+    # Case-insensitive, over the title and snippet
+    by_keyword = Subscription(q="Election")
+    assert by_keyword.matches(event("Local election results"))
+    assert by_keyword.matches(event("Results", snippet="after the ELECTION"))
+    assert not by_keyword.matches(event("Weather"))
+    combined = Subscription(source=["bbc"], category=["Tech"], q="chip")
+    assert combined.matches(event("New chip", source="bbc", category="Tech"))
+    assert not combined.matches(event("New chip", source="bbc", category="Sport"))
+    assert not combined.matches(event("New phone", source="bbc", category="Tech"))
+
+
+def test_hub_delivers_only_matching_events():
+    async def scenario():
+        hub = ArticleHub()
+        tech = hub.subscribe(category=["Tech"])
+        everything = hub.subscribe()
+        hub.publish(event("one", category="Tech"))
+        hub.publish({**event("two", category="Sport"), 'content': "full text", 'minhash': [1, 2]})
+        assert titles(tech) == ["one"]
+        delivered = drain(everything)
+        assert [article['title'] for _, article in delivered] == ["one", "two"]
+        assert 'content' not in delivered[1][1] and 'minhash' not in delivered[1][1]
+
+    run(scenario())
+
+
+def test_slow_client_is_disconnected_when_its_queue_fills():
+    async def scenario():
+        hub = ArticleHub(queue_size=3)
+        slow = hub.subscribe()
+        fast = hub.subscribe()
+        for n in range(3):
+            hub.publish(event(f"event {n}"))
+            drain(fast)
+        assert hub.subscriber_count == 2
+        last_delivered = f"{hub.instance}-3"
+        hub.publish(event("overflow"))
+        assert slow.closed
+        assert hub.subscriber_count == 1
+        # Everything queued is still sent, then the stream ends
+        frames = [frame async for frame in slow.stream(keepalive=1)]
+        assert len(frames) == 3
+        assert frames[-1].startswith(f"id: {last_delivered}\n")
+        hub.publish(event("later"))
+        assert slow.queue.empty()
+        assert titles(fast) == ["overflow", "later"]
+        # Reconnecting with the last id it saw replays what it missed
+        assert titles(hub.subscribe(last_event_id=last_delivered)) == ["overflow", "later"]
+
+    run(scenario())
+
+
+def test_last_event_id_replays_matching_events_from_the_buffer():
+    async def scenario():
+        hub = ArticleHub()
+        ids = [hub.publish(event(f"event {n}", source="bbc" if n % 2 else "cnn")) for n in range(5)]
+        resumed = hub.subscribe(last_event_id=ids[1])
+        assert not resumed.reset
+        assert titles(resumed) == ["event 2", "event 3", "event 4"]
+        assert titles(hub.subscribe(last_event_id=ids[0], source=["bbc"])) == ["event 1", "event 3"]
+        up_to_date = hub.subscribe(last_event_id=ids[-1])
+        assert not up_to_date.reset and up_to_date.queue.empty()
+        # Replayed clients also receive live events
+        hub.publish(event("event 5"))
+        assert titles(resumed) == ["event 5"]
+
+    run(scenario())
+
+
+def test_last_event_id_outside_the_buffer_resets():
+    async def scenario():
+        hub = ArticleHub(buffer_size=3)
+        ids = [hub.publish(event(f"event {n}")) for n in range(6)]
+        # The oldest buffered event follows ids[2], so that one can still resume
+        assert titles(hub.subscribe(last_event_id=ids[2])) == ["event 3", "event 4", "event 5"]
+        too_old = hub.subscribe(last_event_id=ids[1])
+        assert too_old.reset and too_old.queue.empty()
+        other_process = hub.subscribe(last_event_id=f"{ArticleHub().instance}-5")
+        assert other_process.reset
+        assert hub.subscribe(last_event_id="garbage").reset
+        frames = too_old.stream(keepalive=1)
+        assert (await frames.__anext__()).startswith("event: reset\n")
+        hub.publish(event("live"))
+        assert (await frames.__anext__()).startswith(f"id: {hub.instance}-7\nevent: article\n")
+
+    run(scenario())
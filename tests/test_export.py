@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from .conftest import api_client, make_handler, run, scraped
+
+
+def save(handler, count, start=0):
+    return [run(handler.save_article(scraped(n, source_website=f"site{n % 2}"))) for n in range(start, start + count)]
+
+
+async def export(handler, **kwargs):
+    return [(checkpoint, article) async for checkpoint, article in handler.iter_articles(**kwargs)]
+
+
+def test_export_in_storage_order(handler):
+    save(handler, 6)
+    rows = run(export(handler))
+    assert [article['title'] for _, article in rows] == [f"Article {n}" for n in range(6)]
+    assert len({checkpoint for checkpoint, _ in rows}) == 6
+    for _, article in rows:
+        assert not {'minhash', 'lsh_bands', 'content_z', 'content_hash'} & set(article)
+
+
+def test_export_filters(handler):
+    save(handler, 6)
+    assert [a['title'] for _, a in run(export(handler, source="site1"))] == ["Article 1", "Article 3", "Article 5"]
+    since = datetime(2024, 11, 1, 12, 3, tzinfo=timezone.utc)
+    until = datetime(2024, 11, 1, 12, 5, tzinfo=timezone.utc)
+    assert [a['title'] for _, a in run(export(handler, since=since, until=until))] == ["Article 3", "Article 4"]
+
+
+def test_resume_from_checkpoint(handler):
+    save(handler, 5)
+    rows = run(export(handler))
+    resumed = run(export(handler, after=rows[1][0]))
+    assert resumed == rows[2:]
+    assert run(export(handler, after=rows[-1][0])) == []
+    # Articles saved after the export ended are picked up on resume
+    save(handler, 2, start=5)
+    assert [a['title'] for _, a in run(export(handler, after=rows[-1][0]))] == ["Article 5", "Article 6"]
+    assert run(handler.get_latest_checkpoint()) == run(export(handler))[-1][0]
+
+
+def test_invalid_checkpoint_is_rejected(handler):
+    save(handler, 1)
+    with pytest.raises(ValueError):
+        run(export(handler, after="not-a-checkpoint"))
+
+
+def test_csv_export_is_consistent_while_articles_are_saved(tmp_path):
+    handler = make_handler("csv", tmp_path)
+    save(handler, 50)
+
+    async def export_with_concurrent_save():
+        titles = []
+        async for _, article in handler.iter_articles():
+            titles.append(article['title'])
+            if len(titles) == 10:
+                # Rewrites the CSV while the export still has it open
+                await handler.save_article(scraped(99))
+        return titles
+
+    assert run(export_with_concurrent_save()) == [f"Article {n}" for n in range(50)]
+    assert len(run(export(handler))) == 51
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith(".tmp")]
+
+
+def test_export_route(handler):
+    save(handler, 3)
+
+    async def scenario():
+        async with api_client(handler) as client:
+            ndjson = await client.get("/api/v1/articles/export")
+            lines = [json.loads(line) for line in ndjson.text.splitlines()]
+            resumed = await client.get("/api/v1/articles/export", params={"after": lines[0]['checkpoint']})
+            as_csv = await client.get("/api/v1/articles/export", params={"format": "csv"})
+            bad = await client.get("/api/v1/articles/export", params={"after": "nope"})
+        return ndjson, lines, resumed, as_csv, bad
+
+    ndjson, lines, resumed, as_csv, bad = run(scenario())
+    assert ndjson.headers['content-type'].startswith("application/x-ndjson")
+    assert [line['title'] for line in lines] == ["Article 0", "Article 1", "Article 2"]
+    assert [json.loads(line)['title'] for line in resumed.text.splitlines()] == ["Article 1", "Article 2"]
+    rows = list(csv.DictReader(io.StringIO(as_csv.text)))
+    assert [row['title'] for row in rows] == ["Article 0", "Article 1", "Article 2"]
+    assert [row['checkpoint'] for row in rows] == [line['checkpoint'] for line in lines]
+    assert bad.status_code == 400
@@ -0,0 +1,24 @@
+from app.database.csv_handler import CSVHandler
+
+from .conftest import run, scraped
+
+
+def test_facet_counts_track_saves(handler):
+    run(handler.save_article(scraped(1)))
+    run(handler.save_article(scraped(2)))
+    counts = run(handler.get_facet_counts())
+    assert counts['total'] == 2
+    assert counts['facets']['source'] == {'example': 2}
+    assert counts['facets']['day'] == {'2024-11-01': 2}
+
+
+def test_csv_facets_see_rows_written_by_another_process(tmp_path):
+    path = str(tmp_path / "articles.csv")
+    api, worker = CSVHandler(path), CSVHandler(path)
+    run(api.save_article(scraped(1)))
+    assert run(api.get_facet_counts())['total'] == 1
+    run(worker.save_article(scraped(2)))
+    run(worker.save_article(scraped(3)))
+    assert run(api.get_facet_counts())['total'] == 3
+    run(api.save_article(scraped(4)))
+    assert run(api.get_facet_counts())['total'] == 4
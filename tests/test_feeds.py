@@ -0,0 +1,133 @@
+from datetime import datetime, timezone
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from app.scrapers.feeds import FeedParser
+from app.utils.dates import parse_date
+
+from .conftest import make_handler, run
+
+RSS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/"
+     xmlns:content="http://purl.org/rss/1.0/modules/content/">
+<channel><title>Site</title><link>https://news.example/</link>
+<item>
+  <title>Patch now</title>
+  <link>https://news.example/patch-now</link>
+  <pubDate>Fri, 01 Nov 2024 10:00:00 +0000</pubDate>
+  <dc:creator>Alice</dc:creator>
+  <category>Vulnerabilities</category>
+  <description>Short summary</description>
+  <content:encoded><![CDATA[<p>Full <b>body</b> of the post</p>]]></content:encoded>
+</item>
+<item><title>No link, dropped</title></item>
+<item>
+  <title>Second</title>
+  <link>https://news.example/second</link>
+  <pubDate>Sat, 02 Nov 2024 08:30:00 GMT</pubDate>
+</item>
+</channel></rss>"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<title>Site</title>
+<link rel="self" href="https://news.example/atom.xml"/>
+<entry>
+  <title>Atom entry</title>
+  <link rel="self" href="https://news.example/api/1"/>
+  <link rel="alternate" href="https://news.example/atom-entry"/>
+  <published>2024-11-03T09:15:00Z</published>
+  <updated>2024-11-04T00:00:00Z</updated>
+  <author><name>Bob</name></author>
+  <category term="Malware"/>
+  <content type="html">&lt;p&gt;Atom body&lt;/p&gt;</content>
+</entry>
+</feed>"""
+
+SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"
+        xmlns:news="http://www.google.com/schemas/sitemap-news/0.9">
+<url>
+  <loc>https://news.example/sitemap-story</loc>
+  <news:news>
+    <news:publication><news:name>Site</news:name><news:language>en</news:language></news:publication>
+    <news:publication_date>2024-11-05T12:00:00+01:00</news:publication_date>
+    <news:title>Sitemap story</news:title>
+  </news:news>
+</url>
+</urlset>"""
+
+
+def parse(document: bytes, chunk: int = 0):
+    parser = FeedParser()
+    chunk = chunk or len(document)
+    for start in range(0, len(document), chunk):
+        parser.feed(document[start:start + chunk])
+    return parser.close()
+
+
+def test_rss_items():
+    entries = parse(RSS)
+    assert [e['url'] for e in entries] == ["https://news.example/patch-now", "https://news.example/second"]
+    first = entries[0]
+    assert first['title'] == "Patch now"
+    assert first['author'] == "Alice"
+    assert first['category'] == "Vulnerabilities"
+    assert first['content'] == "<p>Full <b>body</b> of the post</p>"
+    assert parse_date(first['published']) == datetime(2024, 11, 1, 10, 0, tzinfo=timezone.utc)
+    assert 'content' not in entries[1]
+
+
+def test_atom_prefers_the_alternate_link():
+    [entry] = parse(ATOM)
+    assert entry == {
+        'url': "https://news.example/atom-entry",
+        'title': "Atom entry",
+        'published': "2024-11-03T09:15:00Z",
+        'author': "Bob",
+        'category': "Malware",
+        'content': "<p>Atom body</p>",
+    }
+
+
+def test_news_sitemap():
+    [entry] = parse(SITEMAP)
+    assert entry['url'] == "https://news.example/sitemap-story"
+    assert entry['title'] == "Sitemap story"
+    assert parse_date(entry['published']) == datetime(2024, 11, 5, 11, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("document", [RSS, ATOM, SITEMAP])
+def test_byte_at_a_time_matches_whole_document(document):
+    assert parse(document, chunk=1) == parse(document)
+
+
+def test_malformed_feed_raises():
+    parser = FeedParser()
+    parser.feed(b"<rss><channel><item><title>cut")
+    with pytest.raises(ET.ParseError):
+        parser.close()
+
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_feed_entries_round_trip_through_storage(backend, tmp_path):
+    handler = make_handler(backend, tmp_path)
+    run(handler.setup())
+    saved = {}
+    for entry in parse(RSS) + parse(ATOM) + parse(SITEMAP):
+        article_id = run(handler.save_article({
+            'title': entry['title'],
+            'content': entry.get('content') or entry['title'],
+            'url': entry['url'],
+            'published_date': parse_date(entry['published']),
+            'source_website': "example",
+        }))
+        saved[article_id] = entry
+
+    for article_id, entry in saved.items():
+        article = run(handler.get_article(article_id))
+        assert article['url'] == entry['url']
+        assert article['title'] == entry['title']
+        assert article['date'] == parse_date(entry['published']).isoformat()
+        assert run(handler.url_exists(entry['url']))
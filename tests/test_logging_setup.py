@@ -0,0 +1,26 @@
+import logging
+import os
+import socket
+
+from app.utils.logging_setup import RoutineSampler, process_log_file
+
+
+def test_process_log_file_is_unique_per_process():
+    expected = f"logs/scraper.{socket.gethostname()}-{os.getpid()}.log"
+    assert process_log_file("logs/scraper.log") == expected
+    assert process_log_file("scraper") == f"scraper.{socket.gethostname()}-{os.getpid()}"
+
+
+def record(level=logging.INFO, **extra):
+    entry = logging.LogRecord("test", level, __file__, 1, "Saved %s", ("x",), None)
+    entry.__dict__.update(extra)
+    return entry
+
+
+def test_routine_records_are_sampled_per_source():
+    sampler = RoutineSampler(every=3)
+    kept = [sampler.filter(record(routine=True, source="a")) for _ in range(6)]
+    assert kept == [True, False, False, True, False, False]
+    assert sampler.filter(record(routine=True, source="b"))
+    assert all(sampler.filter(record()) for _ in range(3))
+    assert all(sampler.filter(record(logging.WARNING, routine=True, source="a")) for _ in range(3))
@@ -0,0 +1,48 @@
+from app.scrapers.partial_html import FragmentExtractor, sniff_charset
+
+SELECTORS = {"title": "h1.headline", "content": "div.article-body", "image": "img.lead"}
+FILLER = "".join(f"<div><p>paragraph {i}\n</p><script>var s = '<div>';</script></div>\n" for i in range(200))
+PAGE = (
+    f"<html><body>{FILLER}<h1 class='headline'>Hello <b>world</b></h1>{FILLER}"
+    "<img class='lead' src='a.png'><div class='article-body'><div><p>one</p></div>\n<p>two</p></div>"
+    f"{FILLER}</body></html>"
+)
+
+
+def feed(extractor, text, size):
+    for start in range(0, len(text), size):
+        extractor.feed(text[start:start + size])
+
+
+def test_fragments_match_across_chunk_boundaries():
+    for size in (1, 7, 100, len(PAGE)):
+        extractor = FragmentExtractor(SELECTORS)
+        feed(extractor, PAGE, size)
+        found = {field: str(element) for field, element in extractor.elements().items()}
+        assert found == {
+            "title": '<h1 class="headline">Hello <b>world</b></h1>',
+            "content": '<div class="article-body"><div><p>one</p></div>\n<p>two</p></div>',
+            "image": '<img class="lead" src="a.png"/>',
+        }
+        assert extractor.done
+
+
+def test_only_open_fragments_are_buffered():
+    extractor = FragmentExtractor(SELECTORS)
+    feed(extractor, PAGE, 512)
+    assert len(extractor._buffer) < 1024
+
+
+def test_unclosed_fragment_runs_to_end_of_input():
+    extractor = FragmentExtractor({"content": "div.article-body"})
+    feed(extractor, "<div class='article-body'><p>cut off", 5)
+    assert extractor.elements()["content"].get_text() == "cut off"
+    assert not extractor.done
+
+
+def test_sniff_charset():
+    assert sniff_charset(b'<html><head><meta charset="windows-1251">') == "windows-1251"
+    assert sniff_charset(b'<meta http-equiv="Content-Type" content="text/html; charset=ISO-8859-2">') == "ISO-8859-2"
+    assert sniff_charset(b"\xef\xbb\xbf<html>") == "utf-8-sig"
+    assert sniff_charset(b"<meta charset=no-such-codec>") is None
+    assert sniff_charset(b"<html><head></head>") is None
@@ -0,0 +1,54 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.database.queries import supported_queries
+from benchmarks.corpus import generate_corpus
+from benchmarks.query_plans import check_mongo, check_sqlite
+
+from .conftest import run, scraped
+
+MONGODB_URI = os.environ.get("MONGODB_URI", "mongodb://localhost:27017")
+
+
+async def failures(checks):
+    return [(filters, sort_by, order, since, include_duplicates, plan)
+            async for filters, sort_by, order, since, include_duplicates, plan, ok in checks if not ok]
+
+
+def test_every_supported_sqlite_query_walks_an_index():
+    corpus = list(generate_corpus(300))
+    assert run(failures(check_sqlite(corpus))) == []
+
+
+def test_every_supported_mongo_query_walks_an_index():
+    pymongo = pytest.importorskip("pymongo")
+    try:
+        pymongo.MongoClient(MONGODB_URI, serverSelectionTimeoutMS=500).admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip(f"no mongod at {MONGODB_URI}")
+    corpus = list(generate_corpus(300))
+    assert run(failures(check_mongo(corpus, MONGODB_URI))) == []
+
+
+def test_supported_queries_cover_multi_value_filters():
+    assert any(len(values) > 1 for filters, _, _ in supported_queries() for values in filters.values())
+
+
+def test_multi_value_filters_page_like_a_single_sorted_list(handler):
+    start = datetime(2024, 11, 1, tzinfo=timezone.utc)
+    for n in range(30):
+        run(handler.save_article(scraped(n, source_website=f"site{n % 3}",
+                                         published_date=start + timedelta(hours=n))))
+    everything = run(handler.get_articles(skip=0, limit=100))
+    for sort_by in ("date", "sentimentScore"):
+        for order in ("desc", "asc"):
+            for skip in (0, 4, 15):
+                page = run(handler.get_articles(skip=skip, limit=5, filters={'source': ["site0", "site2"]},
+                                                sort_by=sort_by, order=order))
+                wanted = sorted((a for a in everything if a['source'] in ("site0", "site2")),
+                                key=lambda a: a[sort_by], reverse=order == "desc")
+                assert all(a['source'] in ("site0", "site2") for a in page)
+                # Ties in sentimentScore may come back in either order
+                assert [a[sort_by] for a in page] == [a[sort_by] for a in wanted[skip:skip + 5]]
@@ -0,0 +1,126 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from app.scrapers.news_scraper import NewsScraper
+from app.utils.dedup import StoryDeduplicator
+from app.utils.revalidation import content_fingerprint, revalidation_due
+
+from .conftest import run, scraped
+
+NOW = datetime(2024, 11, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def test_content_fingerprint_ignores_whitespace_only():
+    assert content_fingerprint("Title", "Some  body\n text") == content_fingerprint(" Title", "Some body text ")
+    assert content_fingerprint("Title", "Some body text") != content_fingerprint("Title", "Some body text!")
+    assert content_fingerprint(None, None) == content_fingerprint("", "")
+
+
+def test_revalidation_schedule():
+    hours_ago = lambda n: NOW - timedelta(hours=n)
+    # Under a day old: hourly
+    assert revalidation_due(hours_ago(5), None, NOW)
+    assert revalidation_due(hours_ago(5), hours_ago(1), NOW)
+    assert not revalidation_due(hours_ago(5), hours_ago(0.5), NOW)
+    # Under a week: every 6 hours; under 30 days: daily
+    assert not revalidation_due(hours_ago(48), hours_ago(5), NOW)
+    assert revalidation_due(hours_ago(48), hours_ago(6), NOW)
+    assert not revalidation_due(hours_ago(24 * 10), hours_ago(23), NOW)
+    # Older articles are left alone, as are ones without a usable date
+    assert not revalidation_due(hours_ago(24 * 31), None, NOW)
+    assert not revalidation_due(None, None, NOW)
+    assert not revalidation_due("not a date", None, NOW)
+    assert revalidation_due(hours_ago(5).isoformat(), hours_ago(2).isoformat(), NOW)
+
+
+def crawled(number: int, **extra):
+    article = scraped(number, **extra)
+    article.update(content_hash=content_fingerprint(article['title'], article['content']),
+                   etag='"v1"', last_modified="Fri, 01 Nov 2024 12:00:00 GMT", fetched_at=NOW)
+    return article
+
+
+def test_crawl_state_update_and_touch(handler):
+    article = crawled(1)
+    article_id = run(handler.save_article(article))
+
+    state = run(handler.get_crawl_state(article['url']))
+    assert state['id'] == article_id
+    assert state['content_hash'] == article['content_hash']
+    assert state['etag'] == '"v1"'
+    assert not state.get('is_duplicate')
+    assert run(handler.get_crawl_state("https://news.example/unknown")) is None
+
+    later = NOW + timedelta(hours=2)
+    assert run(handler.touch_crawl_state(article_id, '"v2"', None, later))
+    state = run(handler.get_crawl_state(article['url']))
+    assert state['etag'] == '"v2"' and not state['last_modified']
+    assert revalidation_due(NOW - timedelta(hours=3), state['fetched_at'], later + timedelta(minutes=30)) is False
+    assert state['content_hash'] == article['content_hash']
+    assert run(handler.get_article(article_id))['content'] == article['content']
+
+    revised = crawled(1, title="Article 1 (updated)", content="Rewritten body " * 20)
+    assert run(handler.update_article(article_id, revised))
+    stored = run(handler.get_article(article_id))
+    assert stored['title'] == "Article 1 (updated)"
+    assert stored['content'] == revised['content']
+    assert run(handler.get_crawl_state(article['url']))['content_hash'] == revised['content_hash']
+    for field in ('content_hash', 'etag', 'last_modified', 'fetched_at'):
+        assert field not in stored
+
+    unknown = "000000000000000000000000"
+    assert not run(handler.update_article(unknown, revised))
+    assert not run(handler.touch_crawl_state(unknown, None, None, later))
+
+
+def make_scraper(handler, tmp_path):
+    config = tmp_path / "scraper_config.json"
+    config.write_text(json.dumps({}))
+    return NewsScraper(str(config), handler)
+
+
+def test_unchanged_article_only_touches_crawl_state(handler, tmp_path):
+    scraper = make_scraper(handler, tmp_path)
+    published = datetime.now(timezone.utc) - timedelta(hours=3)
+    original = crawled(1, published_date=published)
+    original['fetched_at'] = published
+    article_id = run(handler.save_article(original))
+
+    async def scrape_article(session, url, selectors, site_name, site_config, entry, validators):
+        validators['etag'] = '"v2"'
+        return {**crawled(1), 'etag': '"v2"', 'fetched_at': datetime.now(timezone.utc)}
+    scraper._scrape_article = scrape_article
+    updates = []
+    handler.update_article = lambda *args: updates.append(args)
+
+    state = run(handler.get_crawl_state(original['url']))
+    run(scraper._revalidate(None, {'url': original['url']}, state, {}, "example", {}))
+
+    assert updates == []
+    state = run(handler.get_crawl_state(original['url']))
+    assert state['id'] == article_id and state['etag'] == '"v2"'
+    assert not revalidation_due(published, state['fetched_at'])
+
+
+def test_changed_article_is_updated(handler, tmp_path):
+    scraper = make_scraper(handler, tmp_path)
+    scraper.deduplicator = StoryDeduplicator(handler)
+    published = datetime.now(timezone.utc) - timedelta(hours=3)
+    original = crawled(1, published_date=published)
+    original['fetched_at'] = published
+    article_id = run(handler.save_article(original))
+
+    async def scrape_article(session, url, selectors, site_name, site_config, entry, validators):
+        return crawled(1, content="A corrected body " * 20)
+    scraper._scrape_article = scrape_article
+
+    run(scraper._revalidate(None, {'url': original['url']}, run(handler.get_crawl_state(original['url'])),
+                            {}, "example", {}))
+    assert run(handler.get_article(article_id))['content'] == "A corrected body " * 20
+
+
+def test_checked_urls_are_pruned_after_the_schedule_ends(tmp_path):
+    scraper = make_scraper(None, tmp_path)
+    scraper._checked = {"old": NOW - timedelta(days=31), "recent": NOW - timedelta(days=2)}
+    scraper._prune_checked(NOW)
+    assert scraper._checked == {"recent": NOW - timedelta(days=2)}
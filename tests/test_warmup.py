@@ -0,0 +1,45 @@
+import json
+
+from app.api.warmup import WarmCache
+
+from .conftest import run, scraped
+
+
+def test_warmed_list_is_served_until_it_expires(handler):
+    async def scenario():
+        await handler.save_article(scraped(1, title="original"))
+        cache = WarmCache(handler, list_pages=1, top_searches=0, ttl_seconds=60)
+        await cache.warm()
+        key = WarmCache.list_key(0, cache.page_size, False)
+
+        hit = cache.response(key, "articles")
+        assert [a['title'] for a in json.loads(hit.body)['articles']] == ["original"]
+
+        # An in-place update does not announce itself the way a new article does
+        [article] = (await handler.get_articles(limit=1))
+        article_id = article.get('_id') or article['id']
+        await handler.update_article(article_id, scraped(1, title="revised"))
+        assert cache.response(key, "articles") is not None
+
+        cache.warmed_at -= 61
+        assert cache.response(key, "articles") is None
+        await cache._refresh
+        refreshed = cache.response(key, "articles")
+        assert [a['title'] for a in json.loads(refreshed.body)['articles']] == ["revised"]
+
+    run(scenario())
+
+
+def test_one_refresh_at_a_time(handler):
+    async def scenario():
+        cache = WarmCache(handler, list_pages=1, top_searches=0, ttl_seconds=0)
+        await cache.warm()
+        key = WarmCache.list_key(0, cache.page_size, False)
+        assert cache.response(key, "articles") is None
+        refresh = cache._refresh
+        for _ in range(5):
+            assert cache.response(key, "articles") is None
+        assert cache._refresh is refresh and not refresh.done()
+        await refresh
+
+    run(scenario())
@@ -0,0 +1,95 @@
+import asyncio
+
+from app import worker
+from app.worker import LEASE_NAME, run_leader
+
+from .conftest import run
+
+CONFIG = {'scraping_interval_minutes': 0, 'lease_ttl_seconds': 0.3}
+
+
+class BlockingScraper:
+    """Each scrape waits until it is cancelled"""
+
+    def __init__(self):
+        self.started = 0
+        self.cancelled = 0
+
+    async def run_scraper(self):
+        self.started += 1
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+async def eventually(predicate, timeout=3.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition never became true"
+        await asyncio.sleep(0.02)
+
+
+def start_leader(monkeypatch, handler, owner, scraper):
+    monkeypatch.setattr(worker, "worker_id", lambda: owner)
+    return asyncio.create_task(run_leader(scraper, handler, CONFIG))
+
+
+async def stop(task):
+    task.cancel()
+    await asyncio.wait({task}, timeout=2)
+    stopped = task.done()
+    while not task.done():
+        # Keep cancelling a worker that swallowed it, so the loop can still close
+        task.cancel()
+        await asyncio.wait({task}, timeout=0.05)
+    assert stopped, "worker ignored the cancellation"
+    assert task.cancelled()
+
+
+def test_shutdown_mid_scrape_releases_the_lease(handler, monkeypatch):
+    async def scenario():
+        scraper = BlockingScraper()
+        task = start_leader(monkeypatch, handler, "worker-a", scraper)
+        await eventually(lambda: scraper.started == 1)
+        await stop(task)
+        assert scraper.cancelled == 1
+        assert await handler.acquire_lease(LEASE_NAME, "worker-b", 60)
+
+    run(scenario())
+
+
+def test_follower_takes_over_after_shutdown(handler, monkeypatch):
+    async def scenario():
+        first, second = BlockingScraper(), BlockingScraper()
+        leader = start_leader(monkeypatch, handler, "worker-a", first)
+        await eventually(lambda: first.started == 1)
+        follower = start_leader(monkeypatch, handler, "worker-b", second)
+        await asyncio.sleep(0.3)
+        assert second.started == 0
+        await stop(leader)
+        await eventually(lambda: second.started == 1)
+        assert not await handler.acquire_lease(LEASE_NAME, "worker-a", 60)
+        await stop(follower)
+
+    run(scenario())
+
+
+def test_lost_lease_stops_the_scrape_but_not_the_worker(handler, monkeypatch):
+    async def scenario():
+        scraper = BlockingScraper()
+        task = start_leader(monkeypatch, handler, "worker-a", scraper)
+        await eventually(lambda: scraper.started == 1)
+        # Another worker grabs the lease, as if ours had expired during a stall
+        await handler.release_lease(LEASE_NAME, "worker-a")
+        assert await handler.acquire_lease(LEASE_NAME, "worker-b", 60)
+        await eventually(lambda: scraper.cancelled == 1)
+        await asyncio.sleep(0.3)
+        assert not task.done()
+        assert scraper.started == 1
+        await stop(task)
+        # Shutting down as a follower leaves the new leader's lease alone
+        assert not await handler.acquire_lease(LEASE_NAME, "worker-c", 60)
+
+    run(scenario())